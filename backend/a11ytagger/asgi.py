@@ -11,6 +11,9 @@ import os
 
 from django.core.asgi import get_asgi_application
 
+from server.uploads import RequestBodyLimit
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'a11ytagger.settings')
 
-application = get_asgi_application()
+# Oversized request bodies are refused before Django's handler spools them.
+application = RequestBodyLimit(get_asgi_application())
@@ -143,3 +143,86 @@ CACHES = {
         }
     }
 }
+
+# Open pikepdf handles kept alive per document, shared by all /api/<pdf_id>/ views.
+# MAX_BYTES is measured against the on-disk size of each open PDF.
+PDF_SESSION_CACHE = {
+    'MAX_ENTRIES': int(os.environ.get('PDF_SESSION_MAX_ENTRIES', 16)),
+    'MAX_BYTES': int(os.environ.get('PDF_SESSION_MAX_BYTES', 256 * 1024 * 1024)),
+}
+
+# Content-addressed store for rendered (PNG) image bytes, evicted LRU once MAX_BYTES is exceeded. The budget
+# covers the whole directory, shared by every process using it.
+RENDERED_IMAGE_CACHE = {
+    'LOCATION': os.environ.get('RENDERED_IMAGE_CACHE_DIR', '/tmp/a11ytagger/rendered-images'),
+    'MAX_BYTES': int(os.environ.get('RENDERED_IMAGE_CACHE_MAX_BYTES', 128 * 1024 * 1024)),
+}
+
+# Uploaded PDFs are streamed to PDF_UPLOAD_DIR in chunks (hashed and size-checked on the fly)
+# instead of being buffered in memory. Under ASGI the body is read before the upload handlers run, so
+# server.uploads.RequestBodyLimit refuses oversized requests first; keep the ingress proxy-body-size in step.
+PDF_UPLOAD_DIR = os.environ.get('PDF_UPLOAD_DIR', '/tmp')
+PDF_UPLOAD_MAX_BYTES = int(os.environ.get('PDF_UPLOAD_MAX_BYTES', 100 * 1024 * 1024))
+
+FILE_UPLOAD_HANDLERS = [
+    'server.uploads.StreamingPDFUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
+# Serialized accessibility_metadata results, keyed by document id, extractor version and edit version.
+# Entries expire at ExtractionResult.expires_at; each process sweeps the directory every PURGE_INTERVAL_SECONDS.
+EXTRACTION_RESULT_CACHE = {
+    'LOCATION': os.environ.get('EXTRACTION_RESULT_CACHE_DIR', '/tmp/a11ytagger/extraction-results'),
+    'PURGE_INTERVAL_SECONDS': 300,
+}
+
+# Maps pdf_id -> stored path/filename for every worker; point LOCATION at shared storage when running several pods.
+DOCUMENT_REGISTRY = {
+    'BACKEND': 'server.registry.SQLiteDocumentRegistry',
+    'LOCATION': os.environ.get('DOCUMENT_REGISTRY_PATH', '/tmp/a11ytagger/documents.sqlite3'),
+    'TIMEOUT': 3600,
+}
+
+# Bounded pool for blocking pikepdf work (extraction, decoding, saving) run from the async API views.
+# Requests beyond MAX_WORKERS + MAX_QUEUED get a 503 instead of piling up.
+PDF_WORK_POOL = {
+    'MAX_WORKERS': int(os.environ.get('PDF_WORK_MAX_WORKERS', 4)),
+    'MAX_QUEUED': int(os.environ.get('PDF_WORK_MAX_QUEUED', 32)),
+}
+
+# Every PDF is opened through one opener. ACCESS_MODE 'auto' memory-maps files of at least MMAP_THRESHOLD_BYTES
+# and streams smaller ones; 'mmap' or 'stream' forces one mode. OPTIONS are passed to every pikepdf.Pdf.open.
+PDF_OPENER = {
+    'ACCESS_MODE': os.environ.get('PDF_ACCESS_MODE', 'auto'),
+    'MMAP_THRESHOLD_BYTES': int(os.environ.get('PDF_MMAP_THRESHOLD_BYTES', 16 * 1024 * 1024)),
+    'OPTIONS': {},
+}
+
+# Extraction and image decoding run in separate worker processes with a wall-clock deadline and an
+# address-space limit per job; a worker that overruns is killed and replaced. PROCESSES=0 runs jobs inline.
+# Without MEMORY_LIMIT_BYTES the limit is derived from the container's cgroup memory limit: every web process
+# (WEB_CONCURRENCY of them) and each of its workers get an equal share, so the workers together stay under it.
+EXTRACTION_WORKERS = {
+    'PROCESSES': int(os.environ.get('EXTRACTION_WORKER_PROCESSES', 2)),
+    'TIMEOUT': int(os.environ.get('EXTRACTION_TIMEOUT_SECONDS', 60)),
+    'MEMORY_LIMIT_BYTES': int(os.environ.get('EXTRACTION_MEMORY_LIMIT_BYTES') or 0) or None,
+    'WEB_PROCESSES': int(os.environ.get('WEB_CONCURRENCY', 1)),
+    'MAX_JOBS_PER_WORKER': 200,
+}
+
+# Uploads are analysed in the background (extraction, image index, rendered image cache) so the viewer
+# starts warm. The queue lives in SQLite; every worker process runs WORKERS consumer threads.
+INGEST_QUEUE = {
+    'LOCATION': os.environ.get('INGEST_QUEUE_PATH', '/tmp/a11ytagger/ingest.sqlite3'),
+    'WORKERS': int(os.environ.get('INGEST_WORKERS', 1)),
+    'MAX_RENDERED_IMAGES': 200,
+}
+
+# Downloads and raw PDF bytes can be handed to a fronting nginx (HEADER='X-Accel-Redirect', PREFIX=its internal
+# location for ROOT) or Apache/lighttpd (HEADER='X-Sendfile') to send with sendfile. Off unless HEADER is set.
+FILE_OFFLOAD = {
+    'HEADER': os.environ.get('FILE_OFFLOAD_HEADER') or None,
+    'ROOT': PDF_UPLOAD_DIR,
+    'PREFIX': os.environ.get('FILE_OFFLOAD_PREFIX') or None,
+}
@@ -1,7 +1,15 @@
+import os
+
 import uvicorn
 
 def main():
-    uvicorn.run("a11ytagger.asgi:application", host="0.0.0.0", port=3000)
+    # Document state lives in the shared registry, so several worker processes are safe.
+    uvicorn.run(
+        "a11ytagger.asgi:application",
+        host="0.0.0.0",
+        port=3000,
+        workers=int(os.environ.get("WEB_CONCURRENCY", 1)),
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,142 @@
+from typing import Dict, List, Optional, Tuple
+
+import pikepdf
+
+from .images import make_image_key, page_images
+
+
+ObjGen = Tuple[int, int]
+
+
+def _objgen(obj) -> Optional[ObjGen]:
+    objgen = getattr(obj, 'objgen', None)
+    if not objgen or tuple(objgen) == (0, 0):
+        return None
+    return tuple(objgen)
+
+
+class ContentIndex:
+    """Links structure elements, pages and image XObjects of one document, in both directions.
+
+    Built once from the /ParentTree, which maps each page's marked-content ids (MCIDs) and every object with a
+    /StructParent back to its structure element, and from the marked content around each image drawn in the
+    page content streams; only pages whose resources hold images are parsed. Elements are identified by objgen
+    and images by the per-page keys ImageIndex uses.
+    """
+
+    def __init__(self, page_numbers: Dict[ObjGen, int]):
+        self.page_numbers = page_numbers
+        self.element_pages: Dict[ObjGen, int] = {}
+        # Per page, the elements with content on it in content order (dicts used as ordered sets).
+        self.page_elements: Dict[int, Dict[ObjGen, None]] = {}
+        self.images_by_element: Dict[ObjGen, List[str]] = {}
+        self.elements_by_image: Dict[str, List[ObjGen]] = {}
+
+    @classmethod
+    def build(cls, pdf):
+        index = cls({_objgen(page.obj): number for number, page in enumerate(pdf.pages, start=1)})
+        struct_tree_root = pdf.Root.get('/StructTreeRoot')
+        parent_tree = struct_tree_root.get('/ParentTree') if struct_tree_root is not None else None
+        if parent_tree is None:
+            return index
+
+        try:
+            # Without auto_repair a damaged tree raises instead of being rewritten inside the document.
+            parents = pikepdf.NumberTree(parent_tree, auto_repair=False)
+        except Exception as e:
+            return index
+        for page_number, page in enumerate(pdf.pages, start=1):
+            try:
+                index._add_page(parents, page_number, page)
+            except Exception as e:
+                # A damaged content stream or parent tree entry only loses the links on its own page.
+                continue
+        return index
+
+    def page_of(self, element) -> Optional[int]:
+        page = element.get('/Pg')
+        if page is not None:
+            page_number = self.page_numbers.get(_objgen(page))
+            if page_number is not None:
+                return page_number
+        return self.element_pages.get(_objgen(element))
+
+    def images_of(self, element) -> List[str]:
+        return self.images_by_element.get(_objgen(element), [])
+
+    def elements_of(self, image_key) -> List[ObjGen]:
+        return self.elements_by_image.get(image_key, [])
+
+    def elements_on(self, page_number) -> List[ObjGen]:
+        return list(self.page_elements.get(page_number, ()))
+
+    def add(self, element, page_number, image_key=None):
+        """Record an element added to the document after the index was built, so the index stays current."""
+        objgen = _objgen(element)
+        self._place(objgen, page_number)
+        if image_key is not None:
+            self._link(objgen, image_key)
+
+    def _add_page(self, parents, page_number, page):
+        marked = {}
+        struct_parents = page.obj.get('/StructParents')
+        elements = parents.get(int(struct_parents)) if struct_parents is not None else None
+        if isinstance(elements, pikepdf.Array):
+            for mcid, element in enumerate(elements):
+                objgen = _objgen(element)
+                if objgen is not None:
+                    marked[mcid] = objgen
+                    self._place(objgen, page_number)
+
+        images = {}
+        for name, obj in page_images(page):
+            if obj.get('/Subtype') != '/Image':
+                continue
+            images[str(name)] = obj
+            # Images referenced from an element by an /OBJR carry their own /StructParent.
+            struct_parent = obj.get('/StructParent')
+            objgen = _objgen(parents.get(int(struct_parent))) if struct_parent is not None else None
+            if objgen is not None:
+                self._place(objgen, page_number)
+                self._link(objgen, make_image_key(page_number, _objgen(obj)))
+        if not images or not marked:
+            return
+
+        # Marked content nests; an image belongs to the innermost sequence that has an MCID.
+        stack = []
+        for operands, operator in pikepdf.parse_content_stream(page, 'BDC BMC EMC Do'):
+            operator = str(operator)
+            if operator == 'BDC':
+                stack.append(self._mcid(page, operands[1]) if len(operands) > 1 else None)
+            elif operator == 'BMC':
+                stack.append(None)
+            elif operator == 'EMC':
+                if stack:
+                    stack.pop()
+            elif operands and str(operands[0]) in images:
+                mcid = next((mcid for mcid in reversed(stack) if mcid is not None), None)
+                objgen = marked.get(mcid)
+                if objgen is not None:
+                    self._link(objgen, make_image_key(page_number, _objgen(images[str(operands[0])])))
+
+    @staticmethod
+    def _mcid(page, properties):
+        if isinstance(properties, pikepdf.Name):
+            # Property lists can also be named entries of the page's /Properties resource.
+            resources = page.obj.get('/Resources')
+            named = resources.get('/Properties') if resources is not None else None
+            properties = named.get(properties) if named is not None else None
+        mcid = properties.get('/MCID') if isinstance(properties, pikepdf.Dictionary) else None
+        return int(mcid) if mcid is not None else None
+
+    def _place(self, element, page_number):
+        self.element_pages.setdefault(element, page_number)
+        self.page_elements.setdefault(page_number, {})[element] = None
+
+    def _link(self, element, image_key):
+        images = self.images_by_element.setdefault(element, [])
+        if image_key not in images:
+            images.append(image_key)
+        elements = self.elements_by_image.setdefault(image_key, [])
+        if element not in elements:
+            elements.append(element)
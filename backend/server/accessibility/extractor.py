@@ -1,102 +1,191 @@
 import os
 import io
+import tempfile
+from dataclasses import dataclass
 from datetime import datetime, timedelta
+from typing import Optional
 
 import pikepdf
 from pikepdf import PdfError, PasswordError
 
-from .models import ExtractionResult, ImageReference, StructureElement
+from .content import ContentIndex
+from .images import ImageIndex, make_image_key, page_images, parse_image_key
+from .models import FIGURE_TYPES, ExtractionResult, StructureAccumulator, StructureElement
+from .opener import pdf_opener
+from .structure import StructureTable
 
 
-def extract_structure_tree(pdf, struct_tree_root):
-    if not struct_tree_root:
-        return None
+# Bump whenever the shape or content of ExtractionResult output changes, so cached results are not reused.
+EXTRACTOR_VERSION = 4
 
-    children = struct_tree_root.get('/K')
-    if not children:
-        return None
 
-    elements = traverse_element(children, depth=0, reading_order=[0])
+@dataclass
+class TraversalPolicy:
+    # None disables a limit. Elements nested deeper than max_depth are re-attached to their ancestor at
+    # max_depth ('flatten') or dropped together with their subtree ('truncate').
+    max_depth: Optional[int] = 100
+    on_max_depth: str = 'flatten'
+    max_elements: Optional[int] = None
 
-    if not elements:
-        return None
 
-    if len(elements) == 1:
-        return elements[0]
+@dataclass
+class TraversalStats:
+    elements: int = 0
+    revisits: int = 0
+    flattened: int = 0
+    truncated: int = 0
+    stopped_early: bool = False
 
-    root = StructureElement(
-        element_type='Root',
-        depth=0,
-        reading_order_index=0,
-        children=elements
-    )
-    return root
 
+def _indirect_objgen(obj):
+    objgen = getattr(obj, 'objgen', None)
+    # Direct objects report (0, 0) and are reachable from one place only; cycles need indirect references.
+    if not objgen or tuple(objgen) == (0, 0):
+        return None
+    return tuple(objgen)
+
+
+def walk_structure(node, policy=None, stats=None, depth=0):
+    """Yield (obj, element_type, depth, parent_index) for each structure element below node, in reading order.
+
+    Elements are numbered from 0 in the order they are yielded and parent_index refers to that numbering
+    (-1 for top-level elements). Uses an explicit stack, so tree depth is bounded by the policy rather than
+    the interpreter's recursion limit, and skips any indirect object it has already visited, so /K cycles
+    cannot loop forever.
+    """
+    policy = policy or TraversalPolicy()
+    stats = stats if stats is not None else TraversalStats()
+    limit = policy.max_depth
+    visited = set()
+    stack = [(node, depth, -1, False)]
+    index = -1
+
+    while stack:
+        obj, depth, parent, collapsed = stack.pop()
+
+        if isinstance(obj, (list, tuple, pikepdf.Array)):
+            stack.extend((item, depth, parent, collapsed) for item in reversed(list(obj)))
+            continue
+        if not hasattr(obj, 'get'):
+            continue
+
+        objgen = _indirect_objgen(obj)
+        if objgen is not None:
+            if objgen in visited:
+                stats.revisits += 1
+                continue
+            visited.add(objgen)
+
+        element_type = obj.get('/S')
+        children = obj.get('/K')
+        if not element_type:
+            if children:
+                stack.append((children, depth, parent, collapsed))
+            continue
+
+        if policy.max_elements is not None and stats.elements >= policy.max_elements:
+            stats.stopped_early = True
+            return
+
+        index += 1
+        stats.elements += 1
+        if collapsed:
+            stats.flattened += 1
+        yield obj, str(element_type), depth, parent
+
+        if not children:
+            continue
+        if limit is None or depth < limit:
+            stack.append((children, depth + 1, index, False))
+        elif policy.on_max_depth == 'flatten':
+            # Deeper descendants stay in reading order, but hang off the element at max_depth.
+            anchor = index if depth == limit else parent
+            stack.append((children, limit + 1, anchor, depth > limit))
+        else:
+            stats.truncated += 1
 
-def traverse_element(elem, depth, reading_order, max_depth=20):
-    if depth > max_depth:
-        return []
-
-    if isinstance(elem, list) or (hasattr(elem, '__iter__') and not hasattr(elem, 'get')):
-        results = []
-        for item in elem:
-            results.extend(traverse_element(item, depth, reading_order, max_depth))
-        return results
-
-    if not hasattr(elem, 'get'):
-        return []
 
-    element_type = elem.get('/S')
-    if not element_type:
-        children = elem.get('/K')
-        if children:
-            return traverse_element(children, depth, reading_order, max_depth)
-        return []
+def _text_attribute(obj, key):
+    value = obj.get(key)
+    return str(value) if value else None
 
-    reading_order[0] += 1
-    current_index = reading_order[0]
-
-    structure_elem = StructureElement(
-        element_type=str(element_type),
-        depth=depth,
-        reading_order_index=current_index,
-        alt_text=str(elem.get('/Alt')) if elem.get('/Alt') else None,
-        actual_text=str(elem.get('/ActualText')) if elem.get('/ActualText') else None,
-        title=str(elem.get('/T')) if elem.get('/T') else None,
-        lang=str(elem.get('/Lang')) if elem.get('/Lang') else None,
-        children=[]
-    )
 
-    children = elem.get('/K')
-    if children:
-        structure_elem.children = traverse_element(children, depth + 1, reading_order, max_depth)
-        for child in structure_elem.children:
-            child.parent_type = structure_elem.element_type
+def build_structure_table(struct_tree_root, policy=None, stats=None, accumulator=None, content=None):
+    if not struct_tree_root or not struct_tree_root.get('/K'):
+        return None
 
-    return [structure_elem]
+    table = StructureTable()
+    # Walking from the root itself puts its objgen in the visited set, so a /K pointing back at it is a no-op.
+    for obj, element_type, depth, parent in walk_structure(struct_tree_root, policy, stats):
+        alt_text = _text_attribute(obj, '/Alt')
+        actual_text = _text_attribute(obj, '/ActualText')
+        table.append(
+            element_type,
+            depth,
+            parent,
+            len(table) + 1,
+            alt_text=alt_text,
+            actual_text=actual_text,
+            title=_text_attribute(obj, '/T'),
+            lang=_text_attribute(obj, '/Lang'),
+        )
+        if accumulator is not None:
+            page_number = image_key = None
+            if content is not None and element_type in FIGURE_TYPES:
+                page_number = content.page_of(obj)
+                image_key = next(iter(content.images_of(obj)), None)
+            accumulator.add(element_type, alt_text, actual_text, page_number, image_key)
+
+    if not len(table):
+        return None
+    if accumulator is not None and table.top_level_count > 1:
+        accumulator.add('Root')
+    return table.finish()
+
+
+def build_structure_index(pdf, policy=None, content=None):
+    """Structure table of an open document plus the statistics gathered while building it."""
+    accumulator = StructureAccumulator()
+    if content is None:
+        content = ContentIndex.build(pdf)
+    table = build_structure_table(pdf.Root.get('/StructTreeRoot'), policy, TraversalStats(), accumulator, content)
+    return table, accumulator
+
+
+def extract_structure_tree(pdf, struct_tree_root, policy=None, stats=None):
+    table = build_structure_table(struct_tree_root, policy, stats)
+    return table.to_element() if table is not None else None
+
+
+def traverse_element(elem, depth, reading_order, max_depth=None):
+    policy = TraversalPolicy(max_depth=max_depth, on_max_depth='truncate')
+    elements = []
+    results = []
+    for obj, element_type, element_depth, parent in walk_structure(elem, policy, depth=depth):
+        reading_order[0] += 1
+        element = StructureElement(
+            element_type=element_type,
+            depth=element_depth,
+            reading_order_index=reading_order[0],
+            alt_text=_text_attribute(obj, '/Alt'),
+            actual_text=_text_attribute(obj, '/ActualText'),
+            title=_text_attribute(obj, '/T'),
+            lang=_text_attribute(obj, '/Lang'),
+            children=[],
+            parent_type=elements[parent].element_type if parent >= 0 else None,
+        )
+        elements.append(element)
+        (elements[parent].children if parent >= 0 else results).append(element)
+    return results
 
 
 def extract_images_from_tree(structure_tree):
     if not structure_tree:
         return []
 
-    images = []
-    _collect_images_recursive(structure_tree, images, page_number=1)
-    return images
-
-
-def _collect_images_recursive(element, images, page_number):
-    if element.element_type == 'Figure' or element.element_type == '/Figure':
-        image = ImageReference(
-            page_number=page_number,
-            alt_text=element.alt_text,
-            actual_text=element.actual_text,
-            has_alt_text=bool(element.alt_text and element.alt_text.strip())
-        )
-        images.append(image)
-
-    for child in element.children:
-        _collect_images_recursive(child, images, page_number)
+    accumulator = StructureAccumulator()
+    accumulator.add_tree(structure_tree)
+    return accumulator.images
 
 
 def get_metadata(pdf):
@@ -111,39 +200,45 @@ def get_metadata(pdf):
     return metadata
 
 
-def extract_all_images(pdf_path):
+def render_image(image_obj):
+    pil_image = pikepdf.PdfImage(image_obj).as_pil_image()
+
+    img_buffer = io.BytesIO()
+    pil_image.save(img_buffer, format='PNG')
+
+    return {
+        'width': pil_image.width,
+        'height': pil_image.height,
+        'format': pil_image.format or 'PNG',
+        'data': img_buffer.getvalue()
+    }
+
+
+def extract_all_images(pdf_path, pdf=None):
     images = []
+    owns_pdf = pdf is None
     
     try:
-        pdf = pikepdf.Pdf.open(pdf_path)
+        if owns_pdf:
+            pdf = pdf_opener.open(pdf_path)
         
         image_id = 0
         for page_num, page in enumerate(pdf.pages, start=1):
-            for obj_name, obj in page.images.items():
+            for obj_name, obj in page_images(page):
                 try:
                     raw_image = obj
                     
                     if raw_image.Subtype == '/Image':
-                        pil_image = pikepdf.PdfImage(raw_image).as_pil_image()
-                        
-                        img_buffer = io.BytesIO()
-                        pil_image.save(img_buffer, format='PNG')
-                        img_data = img_buffer.getvalue()
-                        
-                        images.append({
-                            'id': image_id,
-                            'page_number': page_num,
-                            'width': pil_image.width,
-                            'height': pil_image.height,
-                            'format': pil_image.format or 'PNG',
-                            'data': img_data
-                        })
+                        image = {'id': image_id, 'page_number': page_num}
+                        image.update(render_image(raw_image))
+                        images.append(image)
                         image_id += 1
                         
                 except Exception as e:
                     continue
         
-        pdf.close()
+        if owns_pdf:
+            pdf.close()
         
     except Exception as e:
         pass
@@ -151,106 +246,374 @@ def extract_all_images(pdf_path):
     return images
 
 
-def get_image_by_id(pdf_path, image_id):
-    images = extract_all_images(pdf_path)
-    
-    for img in images:
-        if img['id'] == image_id:
-            return img
-    
+def _pdf_name(value):
+    return str(value).lstrip('/')
+
+
+def _describe_filters(filters):
+    if filters is None:
+        return []
+    if isinstance(filters, (pikepdf.Array, list)):
+        return [_pdf_name(f) for f in filters]
+    return [_pdf_name(filters)]
+
+
+def _describe_color_space(color_space):
+    if color_space is None:
+        return None
+    if isinstance(color_space, (pikepdf.Array, list)):
+        return _pdf_name(color_space[0]) if len(color_space) else None
+    return _pdf_name(color_space)
+
+
+def get_image_metadata(image_obj):
+    bits_per_component = image_obj.get('/BitsPerComponent')
+    return {
+        'width': int(image_obj.get('/Width', 0)),
+        'height': int(image_obj.get('/Height', 0)),
+        'filter': _describe_filters(image_obj.get('/Filter')),
+        'bits_per_component': int(bits_per_component) if bits_per_component is not None else None,
+        'color_space': _describe_color_space(image_obj.get('/ColorSpace')),
+    }
+
+
+def list_image_metadata(pdf_path, pdf=None, index=None):
+    images = []
+    owns_pdf = pdf is None and index is None
+
+    try:
+        if owns_pdf:
+            pdf = pdf_opener.open(pdf_path)
+        if index is None:
+            index = ImageIndex.build(pdf)
+
+        for entry in index:
+            try:
+                image = {'id': entry.id, 'key': entry.key, 'page_number': entry.page_number, 'format': 'PNG'}
+                image.update(get_image_metadata(entry.obj))
+                images.append(image)
+            except Exception as e:
+                continue
+
+        if owns_pdf:
+            pdf.close()
+
+    except Exception as e:
+        pass
+
+    return images
+
+
+def get_image_by_id(pdf_path, image_id, pdf=None, index=None):
+    owns_pdf = pdf is None and index is None
+    image = None
+
+    try:
+        if owns_pdf:
+            pdf = pdf_opener.open(pdf_path)
+        if index is None:
+            index = ImageIndex.build(pdf)
+
+        entry = index.get(image_id)
+        if entry is not None:
+            image = {'id': entry.id, 'key': entry.key, 'page_number': entry.page_number}
+            image.update(render_image(entry.obj))
+
+        if owns_pdf:
+            pdf.close()
+
+    except Exception as e:
+        pass
+
+    return image
+
+
+def _find_image_by_key(pdf, image_key):
+    page_num, objgen = parse_image_key(image_key)
+    if not 1 <= page_num <= len(pdf.pages):
+        return None, None
+    page = pdf.pages[page_num - 1]
+    # Object numbers are reassigned when a file is saved, so the object must still be one of the page's images.
+    for _, obj in page_images(page):
+        if tuple(obj.objgen) == objgen and obj.get('/Subtype') == '/Image':
+            return obj, page
+    return None, None
+
+
+def _find_image_by_name(pdf, page_num, image_name):
+    if not 1 <= page_num <= len(pdf.pages):
+        return None, None
+    page = pdf.pages[page_num - 1]
+    for obj_name, obj in page_images(page):
+        if str(obj_name) == image_name and obj.get('/Subtype') == '/Image':
+            return obj, page
+    return None, None
+
+
+def _find_image_by_id(pdf, image_id):
+    current_id = 0
+    for page_num, page in enumerate(pdf.pages, start=1):
+        for obj_name, obj in page_images(page):
+            try:
+                if obj.Subtype == '/Image':
+                    if current_id == image_id:
+                        print(f"[DEBUG] Found target image on page {page_num}, object: {obj_name}")
+                        return obj, page
+                    current_id += 1
+            except Exception as e:
+                print(f"[DEBUG] Error checking image on page {page_num}: {e}")
+                continue
+
+    print(f"[ERROR] Image with ID {image_id} not found (total images found: {current_id})")
+    return None, None
+
+
+# Elements a new figure can be filed under; anything else (a paragraph, a span) is climbed out of.
+GROUPING_TYPES = ('/Document', '/Part', '/Art', '/Sect', '/Div')
+
+
+def _find_figure(pdf, content, image_key):
+    for objgen in content.elements_of(image_key):
+        element = pdf.get_object(objgen)
+        if str(element.get('/S')) in FIGURE_TYPES:
+            return element
     return None
 
 
-def tag_image_with_alt_text(pdf_path, image_id, alt_text):
+def _figure_parent(pdf, content, struct_tree_root, image_key, page_number):
+    # The section around the image's own marked content, else the section the page's content belongs to.
+    for objgen in content.elements_of(image_key) or content.elements_on(page_number):
+        element = pdf.get_object(objgen)
+        visited = set()
+        while element is not None and element.objgen not in visited:
+            if str(element.get('/S')) in GROUPING_TYPES:
+                return element
+            visited.add(element.objgen)
+            element = element.get('/P')
+
+    # Nothing tagged on this page yet; a lone /Document (or similar) wrapper still holds the whole document.
+    kids = struct_tree_root.get('/K')
+    if isinstance(kids, pikepdf.Array) and len(kids) == 1:
+        kids = kids[0]
+    if isinstance(kids, pikepdf.Dictionary) and str(kids.get('/S')) in GROUPING_TYPES:
+        return kids
+    return struct_tree_root
+
+
+def _parent_tree(pdf, struct_tree_root):
+    parent_tree = struct_tree_root.get('/ParentTree')
+    if parent_tree is None:
+        parent_tree = pdf.make_indirect(pikepdf.Dictionary(Nums=pikepdf.Array([])))
+        struct_tree_root.ParentTree = parent_tree
+    return pikepdf.NumberTree(parent_tree)
+
+
+def _struct_parent_owner(parents, image_obj):
+    # The element the parent tree already files the image under, if any.
+    key = image_obj.get('/StructParent')
+    owner = parents.get(int(key)) if key is not None else None
+    return owner if isinstance(owner, pikepdf.Dictionary) else None
+
+
+def _drop_object_reference(element, obj):
+    # Removes the element's /OBJR entries for obj, so the object has a single parent again.
+    def refers_to_obj(kid):
+        return (isinstance(kid, pikepdf.Dictionary) and kid.get('/Type') == '/OBJR'
+                and kid.get('/Obj') is not None and kid.Obj.objgen == obj.objgen)
+
+    kids = element.get('/K')
+    if isinstance(kids, pikepdf.Array):
+        element.K = pikepdf.Array([kid for kid in kids if not refers_to_obj(kid)])
+    elif refers_to_obj(kids):
+        del element.K
+
+
+def _register_struct_parent(parents, struct_tree_root, image_obj, figure_elem):
+    # Points the image back at its figure through the parent tree, the way content-to-structure lookups expect.
+    key = image_obj.get('/StructParent')
+    if key is None:
+        next_key = struct_tree_root.get('/ParentTreeNextKey')
+        key = int(next_key) if next_key is not None else max(parents.keys(), default=-1) + 1
+        while key in parents:
+            key += 1
+        image_obj.StructParent = key
+        struct_tree_root.ParentTreeNextKey = key + 1
+    else:
+        previous = _struct_parent_owner(parents, image_obj)
+        if previous is not None and previous.objgen != figure_elem.objgen:
+            # The key moves to the new figure; the element it named must not keep claiming the image.
+            _drop_object_reference(previous, image_obj)
+    parents[int(key)] = figure_elem
+
+
+def _add_figure(pdf, content, image_obj, page, image_key, alt_text):
+    struct_tree_root = pdf.Root.get('/StructTreeRoot')
+    if not struct_tree_root:
+        print(f"[DEBUG] Creating new structure tree root")
+        struct_tree_root = pdf.make_indirect(pikepdf.Dictionary(
+            Type=pikepdf.Name('/StructTreeRoot'),
+            K=pikepdf.Array([])
+        ))
+        pdf.Root.StructTreeRoot = struct_tree_root
+
+    if '/K' not in struct_tree_root:
+        print(f"[DEBUG] Adding /K array to structure tree root")
+        struct_tree_root.K = pikepdf.Array([])
+
+    page_number, _ = parse_image_key(image_key)
+    parents = _parent_tree(pdf, struct_tree_root)
+    owner = _struct_parent_owner(parents, image_obj)
+    if owner is not None and str(owner.get('/S')) in FIGURE_TYPES:
+        # Already a figure's content, only missing from the index: label that figure instead of adding another.
+        print(f"[DEBUG] Reusing figure {tuple(owner.objgen)} registered for the image")
+        owner.Alt = alt_text
+        content.add(owner, page_number, image_key)
+        return owner
+
+    parent = _figure_parent(pdf, content, struct_tree_root, image_key, page_number)
+
+    print(f"[DEBUG] Creating figure element with alt text: {alt_text}")
+    figure_elem = pdf.make_indirect(pikepdf.Dictionary(
+        Type=pikepdf.Name('/StructElem'),
+        S=pikepdf.Name('/Figure'),
+        P=parent,
+        Pg=page.obj,
+        Alt=alt_text,
+        K=pikepdf.Dictionary(Type=pikepdf.Name('/OBJR'), Obj=image_obj, Pg=page.obj),
+    ))
+
+    if '/K' not in parent:
+        parent.K = pikepdf.Array([figure_elem])
+    elif isinstance(parent.K, (pikepdf.Array, list)):
+        parent.K.append(figure_elem)
+    else:
+        parent.K = pikepdf.Array([parent.K, figure_elem])
+
+    _register_struct_parent(parents, struct_tree_root, image_obj, figure_elem)
+    content.add(figure_elem, page_number, image_key)
+
+    mark_info = pdf.Root.get('/MarkInfo')
+    if not mark_info:
+        pdf.Root.MarkInfo = pikepdf.Dictionary(Marked=True)
+    else:
+        mark_info.Marked = True
+
+    return figure_elem
+
+
+def apply_alt_text(pdf, items, content=None):
+    """Set the alt text of each item's image, updating its existing Figure or adding one.
+
+    `content` is the document's ContentIndex; it is built when not given and kept current as figures are added.
+    """
+    results = []
+    if content is None:
+        content = ContentIndex.build(pdf)
+
+    for item in items:
+        result = {'image_id': item.get('image_id'), 'success': False, 'error': None}
+        results.append(result)
+        try:
+            image_key = item.get('image_key')
+            if item.get('image_name') is not None:
+                # Staged edits are replayed after saves, which keep page order and resource names but not objects.
+                page_number = item['page_number']
+                print(f"[DEBUG] Looking up image {item['image_name']} on page {page_number}")
+                target_image_obj, target_page = _find_image_by_name(pdf, page_number, item['image_name'])
+                if target_image_obj is not None:
+                    image_key = make_image_key(page_number, tuple(target_image_obj.objgen))
+            elif image_key is not None:
+                print(f"[DEBUG] Looking up image with key: {image_key}")
+                target_image_obj, target_page = _find_image_by_key(pdf, image_key)
+            else:
+                print(f"[DEBUG] Searching for image with ID: {item.get('image_id')}")
+                target_image_obj, target_page = _find_image_by_id(pdf, item.get('image_id'))
+                if target_image_obj is not None:
+                    page_number = content.page_numbers[tuple(target_page.obj.objgen)]
+                    image_key = make_image_key(page_number, tuple(target_image_obj.objgen))
+
+            if target_image_obj is None:
+                result['error'] = "Image not found"
+                result['image_missing'] = True
+                continue
+
+            figure = _find_figure(pdf, content, image_key)
+            if figure is not None:
+                print(f"[DEBUG] Updating alt text of existing figure {tuple(figure.objgen)}: {item['alt_text']}")
+                figure.Alt = item['alt_text']
+            else:
+                _add_figure(pdf, content, target_image_obj, target_page, image_key, item['alt_text'])
+            result['success'] = True
+
+        except Exception as e:
+            result['error'] = f"{type(e).__name__}: {str(e)}"
+            print(f"[ERROR] Failed to tag image {item.get('image_id')}: {result['error']}")
+
+    return results
+
+
+def _save_over(pdf, pdf_path):
+    # Written beside the original and renamed over it, so the open Pdf keeps reading the old file while saving;
+    # allow_overwriting_input would have copied the whole input into memory first instead.
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(pdf_path) or '.', prefix='.tmp-', suffix='.pdf')
+    os.close(fd)
+    try:
+        pdf.save(tmp_path)
+        os.replace(tmp_path, pdf_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def tag_images_with_alt_text(pdf_path, items):
     import traceback
-    
+
     try:
         print(f"[DEBUG] Opening PDF: {pdf_path}")
-        pdf = pikepdf.Pdf.open(pdf_path, allow_overwriting_input=True)
-        
-        current_id = 0
-        target_image_obj = None
-        target_page = None
-        target_obj_name = None
-        
-        print(f"[DEBUG] Searching for image with ID: {image_id}")
-        for page_num, page in enumerate(pdf.pages, start=1):
-            for obj_name, obj in page.images.items():
-                try:
-                    if obj.Subtype == '/Image':
-                        if current_id == image_id:
-                            target_image_obj = obj
-                            target_page = page
-                            target_obj_name = obj_name
-                            print(f"[DEBUG] Found target image on page {page_num}, object: {obj_name}")
-                            break
-                        current_id += 1
-                except Exception as e:
-                    print(f"[DEBUG] Error checking image on page {page_num}: {e}")
-                    continue
-            if target_image_obj:
-                break
-        
-        if not target_image_obj:
-            print(f"[ERROR] Image with ID {image_id} not found (total images found: {current_id})")
-            pdf.close()
-            return False
-        
-        print(f"[DEBUG] Getting/creating structure tree root")
-        struct_tree_root = pdf.Root.get('/StructTreeRoot')
-        if not struct_tree_root:
-            print(f"[DEBUG] Creating new structure tree root")
-            struct_tree_root = pdf.make_indirect(pikepdf.Dictionary(
-                Type=pikepdf.Name('/StructTreeRoot'),
-                K=pikepdf.Array([])
-            ))
-            pdf.Root.StructTreeRoot = struct_tree_root
-        
-        if '/K' not in struct_tree_root:
-            print(f"[DEBUG] Adding /K array to structure tree root")
-            struct_tree_root.K = pikepdf.Array([])
-        
-        print(f"[DEBUG] Creating figure element with alt text: {alt_text}")
-        figure_elem = pdf.make_indirect(pikepdf.Dictionary(
-            Type=pikepdf.Name('/StructElem'),
-            S=pikepdf.Name('/Figure'),
-            P=struct_tree_root,
-            Alt=alt_text
-        ))
-        
-        print(f"[DEBUG] Adding figure element to structure tree")
-        if isinstance(struct_tree_root.K, list):
-            struct_tree_root.K.append(figure_elem)
-        else:
-            struct_tree_root.K = pikepdf.Array([struct_tree_root.K, figure_elem])
-        
-        print(f"[DEBUG] Setting MarkInfo")
-        mark_info = pdf.Root.get('/MarkInfo')
-        if not mark_info:
-            pdf.Root.MarkInfo = pikepdf.Dictionary(Marked=True)
-        else:
-            mark_info.Marked = True
-        
-        print(f"[DEBUG] Saving PDF to: {pdf_path}")
-        pdf.save(pdf_path)
-        pdf.close()
-        
-        print(f"[DEBUG] Successfully tagged image {image_id}")
-        return True
-        
+        pdf = pdf_opener.open(pdf_path)
     except Exception as e:
         error_msg = f"{type(e).__name__}: {str(e)}"
-        traceback_str = traceback.format_exc()
-        print(f"[ERROR] Exception in tag_image_with_alt_text: {error_msg}")
-        print(f"[ERROR] Traceback:\n{traceback_str}")
-        return False
+        print(f"[ERROR] Failed to open {pdf_path} for tagging: {error_msg}")
+        return [{'image_id': item.get('image_id'), 'success': False, 'error': error_msg} for item in items]
+
+    try:
+        results = apply_alt_text(pdf, items)
 
+        tagged = sum(1 for result in results if result['success'])
+        if tagged:
+            print(f"[DEBUG] Saving PDF with {tagged} tagged figure(s) to: {pdf_path}")
+            _save_over(pdf, pdf_path)
 
-def extract_accessibility_info(pdf_path, filename):
-    result = ExtractionResult(
+    except Exception as e:
+        error_msg = f"{type(e).__name__}: {str(e)}"
+        print(f"[ERROR] Exception in tag_images_with_alt_text: {error_msg}")
+        print(f"[ERROR] Traceback:\n{traceback.format_exc()}")
+        results = [{'image_id': item.get('image_id'), 'success': False, 'error': error_msg} for item in items]
+
+    finally:
+        pdf.close()
+
+    return results
+
+
+def tag_image_with_alt_text(pdf_path, image_id, alt_text, image_key=None):
+    results = tag_images_with_alt_text(pdf_path, [{
+        'image_id': image_id,
+        'image_key': image_key,
+        'alt_text': alt_text,
+    }])
+
+    if results[0]['success']:
+        print(f"[DEBUG] Successfully tagged image {image_id}")
+    return results[0]['success']
+
+
+def new_extraction_result(pdf_path, filename, cache_key=""):
+    return ExtractionResult(
         pdf_filename=filename,
         extraction_timestamp=datetime.now(),
-        cache_key="",
+        cache_key=cache_key,
         expires_at=datetime.now() + timedelta(hours=1),
         page_count=0,
         file_size_bytes=os.path.getsize(pdf_path),
@@ -260,8 +623,29 @@ def extract_accessibility_info(pdf_path, filename):
         is_tagged=False
     )
 
+
+def _traversal_warnings(policy, stats):
+    warnings = []
+    if stats.revisits:
+        warnings.append(f"Structure tree references {stats.revisits} element(s) more than once (cycles or shared nodes); repeats were skipped")
+    if stats.flattened:
+        warnings.append(f"Structure tree is deeper than {policy.max_depth} levels; {stats.flattened} deeper element(s) were attached at that depth")
+    if stats.truncated:
+        warnings.append(f"Structure tree is deeper than {policy.max_depth} levels; {stats.truncated} subtree(s) were not extracted")
+    if stats.stopped_early:
+        warnings.append(f"Structure tree has more than {policy.max_elements} elements; extraction stopped there")
+    return warnings
+
+
+def extract_accessibility_info(pdf_path, filename, pdf=None, cache_key="", progress=None, policy=None, content=None,
+                               accumulator=None):
+    result = new_extraction_result(pdf_path, filename, cache_key)
+
+    owns_pdf = pdf is None
+
     try:
-        pdf = pikepdf.Pdf.open(pdf_path)
+        if owns_pdf:
+            pdf = pdf_opener.open(pdf_path)
 
         result.page_count = len(pdf.pages)
         result.pdf_version = pdf.pdf_version
@@ -269,7 +653,8 @@ def extract_accessibility_info(pdf_path, filename):
         if pdf.is_encrypted:
             result.is_encrypted = True
             result.errors.append("PDF is encrypted")
-            pdf.close()
+            if owns_pdf:
+                pdf.close()
             return result
 
         struct_tree_root = pdf.Root.get('/StructTreeRoot')
@@ -282,15 +667,29 @@ def extract_accessibility_info(pdf_path, filename):
         result.document_language = metadata.get('language')
         result.document_title = metadata.get('title')
 
+        if progress is not None:
+            # Document-level fields are cheap; report them before the potentially slow structure tree walk.
+            progress(result)
+
         if struct_tree_root:
             try:
-                result.structure_tree = extract_structure_tree(pdf, struct_tree_root)
-                result.images = extract_images_from_tree(result.structure_tree)
+                policy = policy or TraversalPolicy()
+                stats = TraversalStats()
+                # Callers that keep result.structure as an index pass an accumulator to keep its statistics too.
+                accumulator = accumulator if accumulator is not None else StructureAccumulator()
+                if content is None:
+                    content = ContentIndex.build(pdf)
+                result.structure = build_structure_table(struct_tree_root, policy, stats, accumulator, content)
+                result.structure_tree = result.structure.root if result.structure is not None else None
+                # Counts, types, heading level and image references all come from the pass that built the table.
+                result.apply_structure_stats(accumulator)
+                result.warnings.extend(_traversal_warnings(policy, stats))
             except Exception as e:
                 result.warnings.append(f"Partial extraction - corrupted tags: {str(e)}")
 
         result.success = True
-        pdf.close()
+        if owns_pdf:
+            pdf.close()
 
     except PasswordError:
         result.is_encrypted = True
@@ -0,0 +1,78 @@
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+
+@dataclass
+class IndexedImage:
+    id: int
+    key: str
+    page_number: int
+    name: str
+    objgen: Tuple[int, int]
+    obj: Any = None
+    content_hash: Optional[str] = None
+
+
+def make_image_key(page_number, objgen):
+    return f"p{page_number}-{objgen[0]}-{objgen[1]}"
+
+
+def parse_image_key(image_key):
+    try:
+        page, num, gen = image_key.split('-')
+        if not page.startswith('p'):
+            raise ValueError(image_key)
+        return int(page[1:]), (int(num), int(gen))
+    except (AttributeError, ValueError):
+        raise ValueError(f"Invalid image key: {image_key!r}")
+
+
+def page_images(page):
+    """(name, XObject) pairs from the page's own /Resources, which is what the deprecated Page.images read.
+
+    Its replacement, Page.get_images(), needs pikepdf 10.9 and by default also reports images inside form
+    XObjects, which would renumber the image ids clients already hold. Inherited resources need no lookup here:
+    pikepdf copies them onto each page when it opens a document. Callers still check each object's /Subtype.
+    """
+    resources = page.obj.get('/Resources')
+    xobjects = resources.get('/XObject') if resources is not None else None
+    return list(xobjects.items()) if xobjects is not None else []
+
+
+class ImageIndex:
+    def __init__(self, entries: List[IndexedImage]):
+        self.entries = entries
+        self._by_key: Dict[str, IndexedImage] = {entry.key: entry for entry in entries}
+
+    @classmethod
+    def build(cls, pdf):
+        entries = []
+        for page_num, page in enumerate(pdf.pages, start=1):
+            for obj_name, obj in page_images(page):
+                try:
+                    if obj.Subtype == '/Image':
+                        objgen = tuple(obj.objgen)
+                        entries.append(IndexedImage(
+                            id=len(entries),
+                            key=make_image_key(page_num, objgen),
+                            page_number=page_num,
+                            name=str(obj_name),
+                            objgen=objgen,
+                            obj=obj,
+                        ))
+                except Exception as e:
+                    continue
+        return cls(entries)
+
+    def get(self, image_id) -> Optional[IndexedImage]:
+        if isinstance(image_id, str):
+            return self._by_key.get(image_id)
+        if 0 <= image_id < len(self.entries):
+            return self.entries[image_id]
+        return None
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __len__(self):
+        return len(self.entries)
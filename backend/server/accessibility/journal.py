@@ -0,0 +1,117 @@
+import fcntl
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime
+
+
+def _target(entry):
+    if entry.get('image_name') is not None:
+        return (entry['page_number'], entry['image_name'])
+    return entry.get('image_key')
+
+
+class EditJournal:
+    def __init__(self, pdf_path):
+        self.pdf_path = pdf_path
+        self.path = f"{pdf_path}.journal.json"
+        self.lock_path = f"{pdf_path}.journal.lock"
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return {'version': 0, 'entries': []}
+        except (OSError, ValueError) as e:
+            print(f"[ERROR] Ignoring unreadable edit journal {self.path}: {e}")
+            return {'version': 0, 'entries': []}
+        state.setdefault('version', 0)
+        state.setdefault('entries', [])
+        return state
+
+    def entries(self):
+        return self.load()['entries']
+
+    @property
+    def version(self):
+        return self.load()['version']
+
+    def record(self, items):
+        with self._locked():
+            state = self.load()
+            # Only the latest alt text per image is pending; older edits to the same image are dropped.
+            pending = {_target(entry): entry for entry in state['entries']}
+            now = datetime.now().isoformat()
+            for item in items:
+                entry = {
+                    'op': 'set_figure_alt',
+                    'image_id': item.get('image_id'),
+                    'alt_text': item['alt_text'],
+                    'recorded_at': now,
+                }
+                if item.get('image_name') is not None:
+                    # Entries outlive flushes, which renumber objects; image keys are built from object numbers.
+                    entry['page_number'] = item['page_number']
+                    entry['image_name'] = item['image_name']
+                else:
+                    entry['image_key'] = item['image_key']
+                pending.pop(_target(entry), None)
+                pending[_target(entry)] = entry
+            state['version'] += len(items)
+            state['entries'] = list(pending.values())
+            self._write(state)
+            return state
+
+    def flush(self, write):
+        # Held across the write so concurrent flushes never apply the same entries twice.
+        with self._locked():
+            state = self.load()
+            entries = state['entries']
+            if not entries:
+                return []
+            results = write(entries)
+            # Entries that failed to apply stay pending so the next flush can retry them. One whose image is no longer
+            # in the file would fail every time, so it is dropped; its result is still returned to the caller.
+            state['entries'] = [
+                entry for entry, result in zip(entries, results)
+                if not result['success'] and not result.get('image_missing')
+            ]
+            self._write(state)
+            return results
+
+    def delete(self):
+        for path in (self.path, self.lock_path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def stat_key(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    @contextmanager
+    def _locked(self):
+        with open(self.lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _write(self, state):
+        directory = os.path.dirname(self.path) or '.'
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.journal-')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
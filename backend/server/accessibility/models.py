@@ -1,11 +1,15 @@
-from dataclasses import dataclass, field
-from typing import List, Optional
+from dataclasses import asdict, dataclass, field, fields
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
 from datetime import datetime
 
+if TYPE_CHECKING:
+    from .structure import StructureTable
+
 
 @dataclass
 class ImageReference:
-    page_number: int
+    # None when the document does not say which page the figure is on.
+    page_number: Optional[int]
     alt_text: Optional[str]
     actual_text: Optional[str]
     has_alt_text: bool
@@ -13,6 +17,8 @@ class ImageReference:
     position_y: Optional[float] = None
     width: Optional[float] = None
     height: Optional[float] = None
+    # Key (as in the image list) of the first image XObject the figure's content draws.
+    image_key: Optional[str] = None
 
 
 @dataclass
@@ -28,6 +34,62 @@ class StructureElement:
     parent_type: Optional[str] = None
 
 
+FIGURE_TYPES = ('Figure', '/Figure')
+
+
+def heading_level(element_type: str) -> Optional[int]:
+    name = element_type.lstrip('/')
+    if not name.startswith('H'):
+        return None
+    try:
+        return int(name[1:]) if len(name) > 1 else 1
+    except ValueError:
+        return None
+
+
+class StructureAccumulator:
+    """Collects document statistics one element at a time, while the structure tree is being built."""
+
+    def __init__(self):
+        self.type_counts: Dict[str, int] = {}
+        self.max_heading_level: Optional[int] = None
+        self.images: List[ImageReference] = []
+        self.images_with_alt_text = 0
+
+    def add(self, element_type: str, alt_text: Optional[str] = None, actual_text: Optional[str] = None,
+            page_number: Optional[int] = None, image_key: Optional[str] = None):
+        count = self.type_counts.get(element_type)
+        if count is None:
+            # Type names repeat across the whole tree, so each one is parsed for a heading level only once.
+            level = heading_level(element_type)
+            if level is not None and (self.max_heading_level is None or level > self.max_heading_level):
+                self.max_heading_level = level
+            count = 0
+        self.type_counts[element_type] = count + 1
+
+        if element_type in FIGURE_TYPES:
+            has_alt_text = bool(alt_text and alt_text.strip())
+            if has_alt_text:
+                self.images_with_alt_text += 1
+            self.images.append(ImageReference(
+                page_number=page_number,
+                alt_text=alt_text,
+                actual_text=actual_text,
+                has_alt_text=has_alt_text,
+                image_key=image_key,
+            ))
+
+    def add_tree(self, root):
+        stack = [root]
+        while stack:
+            element = stack.pop()
+            self.add(element.element_type, element.alt_text, element.actual_text)
+            stack.extend(reversed(element.children))
+
+    def types_found(self) -> List[str]:
+        return sorted(self.type_counts)
+
+
 @dataclass
 class ExtractionResult:
     pdf_filename: str
@@ -50,41 +112,68 @@ class ExtractionResult:
     images_with_alt_text: int = 0
     images_without_alt_text: int = 0
     structure_types_found: List[str] = field(default_factory=list)
+    structure_type_counts: Dict[str, int] = field(default_factory=dict)
     max_heading_level: Optional[int] = None
     errors: List[str] = field(default_factory=list)
     warnings: List[str] = field(default_factory=list)
+    # Columnar form of structure_tree; when set, structure_tree is a lazy view onto it.
+    structure: Optional['StructureTable'] = field(default=None, repr=False, compare=False)
 
     def __post_init__(self):
+        if self.structure is not None and self.structure_tree is None:
+            self.structure_tree = self.structure.root
+
         self.total_images = len(self.images)
         self.images_with_alt_text = sum(1 for img in self.images if img.has_alt_text)
         self.images_without_alt_text = self.total_images - self.images_with_alt_text
 
-        if self.structure_tree:
-            self.structure_types_found = self._collect_unique_types(self.structure_tree)
-            self.max_heading_level = self._find_max_heading_level(self.structure_tree)
-
-    def _collect_unique_types(self, element: StructureElement) -> List[str]:
-        types = {element.element_type}
-        for child in element.children:
-            types.update(self._collect_unique_types(child))
-        return sorted(list(types))
+        if self.structure_tree and not self.structure_type_counts:
+            # Results built from an existing tree; the extractor fills these while building the tree instead.
+            accumulator = StructureAccumulator()
+            accumulator.add_tree(self.structure_tree)
+            self.structure_type_counts = accumulator.type_counts
+            self.structure_types_found = accumulator.types_found()
+            self.max_heading_level = accumulator.max_heading_level
 
-    def _find_max_heading_level(self, element: StructureElement) -> Optional[int]:
-        max_level = None
+    def apply_structure_stats(self, accumulator: 'StructureAccumulator'):
+        self.images = accumulator.images
+        self.total_images = len(accumulator.images)
+        self.images_with_alt_text = accumulator.images_with_alt_text
+        self.images_without_alt_text = self.total_images - self.images_with_alt_text
+        self.structure_type_counts = accumulator.type_counts
+        self.structure_types_found = accumulator.types_found()
+        self.max_heading_level = accumulator.max_heading_level
 
-        if element.element_type.startswith('H'):
-            try:
-                level = int(element.element_type[1:]) if len(element.element_type) > 1 else 1
-                max_level = level
-            except ValueError:
-                pass
+    def to_dict(self) -> Dict[str, Any]:
+        # Used instead of asdict(): asdict would deep-copy the structure table and could not serialise its views.
+        data = {f.name: getattr(self, f.name) for f in fields(self) if f.name != 'structure'}
+        data['images'] = [asdict(image) for image in self.images]
+        if self.structure is not None:
+            data['structure_tree'] = self.structure.to_dict()
+        elif self.structure_tree is not None:
+            data['structure_tree'] = asdict(self.structure_tree)
+        return data
 
-        for child in element.children:
-            child_max = self._find_max_heading_level(child)
-            if child_max is not None:
-                max_level = max(max_level or 0, child_max)
+    def iter_json(self, encoder, extra=None):
+        """The JSON document json.dumps(to_dict() | extra) would produce, yielded piece by piece.
 
-        return max_level
+        The structure tree is streamed straight from the table, so memory use does not grow with the tree.
+        """
+        members = [(f.name, getattr(self, f.name)) for f in fields(self) if f.name != 'structure']
+        members.extend((extra or {}).items())
+        separator = '{'
+        for name, value in members:
+            yield f'{separator}{encoder.encode(name)}: '
+            separator = ', '
+            if name == 'images':
+                yield encoder.encode([asdict(image) for image in value])
+            elif name == 'structure_tree' and self.structure is not None:
+                yield from self.structure.iter_json(encoder.encode)
+            elif name == 'structure_tree' and value is not None:
+                yield encoder.encode(asdict(value))
+            else:
+                yield encoder.encode(value)
+        yield '}'
 
 
 @dataclass
@@ -96,3 +185,4 @@ class ValidationResult:
     is_encrypted: bool
     errors: List[str] = field(default_factory=list)
     warnings: List[str] = field(default_factory=list)
+    pdf_version: Optional[str] = None
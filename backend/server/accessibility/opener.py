@@ -0,0 +1,87 @@
+import os
+import threading
+import time
+
+import pikepdf
+
+
+STREAM = 'stream'
+MMAP = 'mmap'
+AUTO = 'auto'
+
+
+class PDFOpener:
+    """Opens every PDF the server reads, so the access mode and open options are decided in one place.
+
+    qpdf reads objects lazily for as long as a Pdf stays open. Streamed access pulls each read through a Python
+    file object, holding the GIL; mapped access reads straight from the page cache, whose clean pages the kernel
+    can drop again under memory pressure instead of counting them against the heap. In 'auto' mode files of at
+    least `mmap_threshold` bytes are mapped and smaller ones, where the difference is noise, are streamed.
+    """
+
+    def __init__(self, access_mode=AUTO, mmap_threshold=16 * 1024 * 1024, options=None):
+        self.access_mode = access_mode
+        self.mmap_threshold = mmap_threshold
+        self.options = dict(options or {})
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def configure(self, access_mode=None, mmap_threshold=None, options=None):
+        with self._lock:
+            if access_mode is not None:
+                if access_mode not in (AUTO, STREAM, MMAP):
+                    raise ValueError(f"Unknown PDF access mode: {access_mode!r}")
+                self.access_mode = access_mode
+            if mmap_threshold is not None:
+                self.mmap_threshold = mmap_threshold
+            if options is not None:
+                self.options = dict(options)
+
+    def settings(self):
+        # Handed to worker processes, which do not run the app's ready() hook.
+        with self._lock:
+            return {'access_mode': self.access_mode, 'mmap_threshold': self.mmap_threshold, 'options': self.options}
+
+    def mode_for(self, size):
+        if self.access_mode != AUTO:
+            return self.access_mode
+        return MMAP if size >= self.mmap_threshold else STREAM
+
+    def open(self, pdf_path):
+        try:
+            size = os.stat(pdf_path).st_size
+        except OSError:
+            # pikepdf reports a missing or unreadable file itself.
+            size = 0
+        mode = self.mode_for(size)
+        options = dict(self.options)
+        if mode == MMAP:
+            # pikepdf falls back to streaming where the file cannot be mapped.
+            options['access_mode'] = pikepdf.AccessMode.mmap
+
+        started = time.perf_counter()
+        try:
+            pdf = pikepdf.Pdf.open(pdf_path, **options)
+        except Exception:
+            self._record(mode, size, time.perf_counter() - started, failed=True)
+            raise
+        self._record(mode, size, time.perf_counter() - started)
+        return pdf
+
+    def stats(self):
+        with self._lock:
+            return {mode: dict(counts) for mode, counts in self._stats.items()}
+
+    def _record(self, mode, size, seconds, failed=False):
+        with self._lock:
+            counts = self._stats.setdefault(mode, {'opens': 0, 'failures': 0, 'bytes': 0, 'seconds': 0.0, 'max_seconds': 0.0})
+            if failed:
+                counts['failures'] += 1
+                return
+            counts['opens'] += 1
+            counts['bytes'] += size
+            counts['seconds'] += seconds
+            counts['max_seconds'] = max(counts['max_seconds'], seconds)
+
+
+pdf_opener = PDFOpener()
@@ -0,0 +1,81 @@
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from pikepdf import PasswordError, PdfError
+
+from .content import ContentIndex
+from .extractor import apply_alt_text, extract_accessibility_info, list_image_metadata, new_extraction_result
+from .images import ImageIndex
+from .journal import EditJournal
+from .models import ExtractionResult, StructureAccumulator, ValidationResult
+from .opener import pdf_opener
+from .result_cache import make_cache_key, make_image_list_key
+from .validators import check_opened_pdf, new_validation_result, record_open_error, sniff_pdf
+
+
+@dataclass
+class IngestResult:
+    validation: ValidationResult
+    extraction: ExtractionResult
+    images: Optional[List[Dict[str, Any]]] = None
+    image_list_key: str = ""
+    # With extraction.structure, the structure index at edit_version; set once extraction succeeds.
+    structure_stats: Optional[StructureAccumulator] = None
+    edit_version: int = 0
+
+
+def run_ingest_pipeline(pdf_path, filename, content_hash, document_id=None, progress=None):
+    """Validate, extract and index (structure and images) a document from a single open.
+
+    Results are keyed on the upload's `content_hash`, and once it has edits on `document_id` too (see
+    content_scope). Each stage reports the outcome so far through `progress`, so a job killed at its deadline still has the
+    validation and whatever the extraction got through.
+    """
+    validation = new_validation_result(pdf_path)
+    state = EditJournal(pdf_path).load()
+    extraction = new_extraction_result(pdf_path, filename, make_cache_key(content_hash, state['version'], document_id))
+    outcome = IngestResult(
+        validation, extraction,
+        image_list_key=make_image_list_key(content_hash, pdf_path), edit_version=state['version'],
+    )
+
+    if not sniff_pdf(pdf_path, validation).can_proceed:
+        return _rejected(outcome)
+    try:
+        pdf = pdf_opener.open(pdf_path)
+    except (PasswordError, PdfError) as e:
+        record_open_error(validation, e)
+        return _rejected(outcome)
+
+    with pdf:
+        check_opened_pdf(pdf, validation)
+        if not validation.can_proceed:
+            return _rejected(outcome)
+        if progress is not None:
+            progress(outcome)
+
+        def report(partial):
+            progress(IngestResult(
+                validation, partial, image_list_key=outcome.image_list_key, edit_version=outcome.edit_version,
+            ))
+
+        # Staged alt text lives in the journal until download, so a fresh open has to replay it like a session does.
+        content = ContentIndex.build(pdf)
+        if state['entries']:
+            apply_alt_text(pdf, state['entries'], content)
+        stats = StructureAccumulator()
+        outcome.extraction = extract_accessibility_info(
+            pdf_path, filename, pdf=pdf, cache_key=extraction.cache_key, content=content,
+            progress=report if progress is not None else None, accumulator=stats,
+        )
+        if outcome.extraction.success:
+            outcome.structure_stats = stats
+            outcome.images = list_image_metadata(pdf_path, pdf=pdf, index=ImageIndex.build(pdf))
+
+    return outcome
+
+
+def _rejected(outcome):
+    outcome.extraction.is_encrypted = outcome.validation.is_encrypted
+    outcome.extraction.errors.extend(outcome.validation.errors)
+    return outcome
@@ -0,0 +1,135 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+
+import pikepdf
+
+
+# Dictionary entries that change the decoded pixels; everything else (e.g. /Metadata) does not.
+DECODE_KEYS = ('/Width', '/Height', '/BitsPerComponent', '/ColorSpace', '/Filter', '/DecodeParms', '/Decode', '/ImageMask')
+
+
+def image_content_hash(image_obj):
+    digest = hashlib.sha256()
+    for key in DECODE_KEYS:
+        value = image_obj.get(key)
+        digest.update(key.encode())
+        if isinstance(value, pikepdf.Object):
+            digest.update(value.unparse())
+        else:
+            digest.update(repr(value).encode())
+    digest.update(image_obj.read_raw_bytes())
+    return digest.hexdigest()
+
+
+class RenderedImageCache:
+    """Rendered images on disk, shared by every process that points at the same location.
+
+    The byte budget covers the directory, not one process: eviction scans the files and drops the least
+    recently used, by mtime, which get() bumps. A process rescans once it has written a slice of the budget
+    since its last scan, so with N processes writing the directory it overshoots by less than N slices.
+    """
+
+    scan_slices = 16
+
+    def __init__(self, location=None, max_bytes=128 * 1024 * 1024):
+        self.location = location or os.path.join(tempfile.gettempdir(), 'a11ytagger', 'rendered-images')
+        self.max_bytes = max_bytes
+        # Directory totals as of this process's last scan, plus what it has written since.
+        self._entries = 0
+        self._total_bytes = 0
+        self._written_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def configure(self, location=None, max_bytes=None):
+        with self._lock:
+            if location is not None and location != self.location:
+                self.location = location
+                self._entries = self._total_bytes = self._written_bytes = 0
+            if max_bytes is not None:
+                self.max_bytes = max_bytes
+
+    def get(self, content_hash, output_format='png'):
+        path = os.path.join(self.location, self._name(content_hash, output_format))
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            # The mtime is the LRU order, so it survives restarts and is shared with other processes.
+            self._touch(path)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def has(self, content_hash, output_format='png'):
+        return os.path.exists(os.path.join(self.location, self._name(content_hash, output_format)))
+
+    def put(self, content_hash, data, output_format='png'):
+        os.makedirs(self.location, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.location, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            self._touch(tmp_path)
+            os.replace(tmp_path, os.path.join(self.location, self._name(content_hash, output_format)))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        with self._lock:
+            self._written_bytes += len(data)
+            if self._written_bytes < self.max_bytes // self.scan_slices:
+                return
+            self._evict()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': self._entries,
+                'total_bytes': self._total_bytes + self._written_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+    def _name(self, content_hash, output_format):
+        return f"{content_hash}.{output_format.lower()}"
+
+    @staticmethod
+    def _touch(path):
+        # An explicit timestamp: filesystem clocks can be too coarse to order entries written back to back.
+        now = time.time_ns()
+        os.utime(path, ns=(now, now))
+
+    def _evict(self):
+        try:
+            with os.scandir(self.location) as it:
+                files = [
+                    (entry.path, entry.stat()) for entry in it if entry.is_file() and not entry.name.startswith('.')
+                ]
+        except FileNotFoundError:
+            files = []
+        files.sort(key=lambda item: item[1].st_mtime_ns)
+        total_bytes = sum(stat.st_size for _, stat in files)
+        while len(files) > 1 and total_bytes > self.max_bytes:
+            path, stat = files.pop(0)
+            total_bytes -= stat.st_size
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        self._entries = len(files)
+        self._total_bytes = total_bytes
+        self._written_bytes = 0
+
+
+rendered_images = RenderedImageCache()
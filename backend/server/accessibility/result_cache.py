@@ -0,0 +1,128 @@
+import os
+import tempfile
+import time
+
+from .extractor import EXTRACTOR_VERSION
+
+
+def content_scope(content_hash, edit_version=0, document_id=None):
+    """What a document's derived results are shared across.
+
+    Every upload of the same bytes (the same content hash) has the same unedited results. Edits are staged per
+    upload, so two uploads at the same edit version can hold different alt text: edited versions are scoped to
+    `document_id` as well.
+    """
+    if not edit_version or document_id is None:
+        return content_hash
+    return f"{content_hash}.{document_id}"
+
+
+def make_cache_key(content_hash, edit_version=0, document_id=None):
+    return f"{content_scope(content_hash, edit_version, document_id)}-x{EXTRACTOR_VERSION}-e{edit_version}"
+
+
+def make_image_list_key(content_hash, pdf_path):
+    # Image keys are built from object numbers, which change whenever the file is saved, so the listing is
+    # tied to the file itself rather than to the edit version. Working copies that still share the uploaded
+    # bytes are hard links to one inode; a flush replaces the copy and gives it its own.
+    stat = os.stat(pdf_path)
+    return f"{content_hash}-x{EXTRACTOR_VERSION}-images-{stat.st_ino:x}-{stat.st_size:x}-{stat.st_mtime_ns:x}"
+
+
+class ExtractionResultCache:
+    def __init__(self, location=None, purge_interval=300):
+        self.location = location or os.path.join(tempfile.gettempdir(), 'a11ytagger', 'extraction-results')
+        # Expired entries are also dropped by get(); the periodic sweep only catches the ones nobody asks for.
+        self.purge_interval = purge_interval
+        self._next_purge = 0.0
+        self.hits = 0
+        self.misses = 0
+
+    def configure(self, location=None, purge_interval=None):
+        if location is not None:
+            self.location = location
+        if purge_interval is not None:
+            self.purge_interval = purge_interval
+
+    def get(self, cache_key):
+        path = self._path(cache_key)
+        try:
+            expires_at = os.stat(path).st_mtime
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+
+        if expires_at <= time.time():
+            self._remove(path)
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return path
+
+    def put(self, cache_key, json_text, expires_at):
+        for _ in self.write_through(cache_key, [json_text] if isinstance(json_text, str) else json_text, expires_at):
+            pass
+
+    def write_through(self, cache_key, chunks, expires_at):
+        """Yield chunks unchanged while saving them; the entry appears only once the last chunk is written."""
+        os.makedirs(self.location, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.location, prefix='.tmp-')
+        published = False
+        try:
+            with os.fdopen(fd, 'w') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    yield chunk
+            # The entry's mtime *is* its expiry time, so any worker can check TTLs with a single stat().
+            expiry = expires_at.timestamp()
+            os.utime(tmp_path, (expiry, expiry))
+            os.replace(tmp_path, self._path(cache_key))
+            published = True
+        finally:
+            # Also reached when a client disconnects mid-stream and the generator is closed.
+            if not published:
+                self._remove(tmp_path)
+        self._purge_if_due()
+
+    def invalidate(self, *cache_keys):
+        # By name, so no directory listing; keys a document can no longer produce just expire.
+        return sum(self._remove(self._path(cache_key)) for cache_key in cache_keys)
+
+    def purge_expired(self):
+        now = time.time()
+        removed = 0
+        for name in self._names():
+            path = os.path.join(self.location, name)
+            try:
+                if os.stat(path).st_mtime <= now:
+                    removed += self._remove(path)
+            except FileNotFoundError:
+                continue
+        return removed
+
+    def _purge_if_due(self):
+        now = time.monotonic()
+        if now < self._next_purge:
+            return
+        self._next_purge = now + self.purge_interval
+        self.purge_expired()
+
+    def _path(self, cache_key):
+        return os.path.join(self.location, f"{cache_key}.json")
+
+    def _names(self):
+        try:
+            return [name for name in os.listdir(self.location) if name.endswith('.json')]
+        except FileNotFoundError:
+            return []
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+            return 1
+        except FileNotFoundError:
+            return 0
+
+
+extraction_results = ExtractionResultCache()
@@ -0,0 +1,214 @@
+import os
+import threading
+from collections import OrderedDict
+
+from .content import ContentIndex
+from .extractor import apply_alt_text, tag_images_with_alt_text
+from .journal import EditJournal
+from .opener import pdf_opener
+
+
+class DocumentSession:
+    # Indexes that include alt text or figure elements, and so go stale when edits are staged. None of the
+    # session's own do: the structure index is built per edit version by the worker pool, and apply_alt_text
+    # records the figures it adds in the content index.
+    edit_dependent_indexes = ()
+
+    def __init__(self, pdf_id, pdf_path):
+        self.pdf_id = pdf_id
+        self.pdf_path = pdf_path
+        stat = os.stat(pdf_path)
+        self.size_bytes = stat.st_size
+        self.mtime_ns = stat.st_mtime_ns
+        self.pdf = pdf_opener.open(pdf_path)
+        self.indexes = {}
+        self.lock = threading.RLock()
+        self.journal = EditJournal(pdf_path)
+        self.journal_stat = self.journal.stat_key()
+        self.edit_version = self._replay_journal()
+
+    def _replay_journal(self):
+        state = self.journal.load()
+        if state['entries']:
+            apply_alt_text(self.pdf, state['entries'], self.get_index('content', ContentIndex.build))
+        return state['version']
+
+    def stage_alt_text(self, items):
+        with self.lock:
+            results = apply_alt_text(self.pdf, items, self.get_index('content', ContentIndex.build))
+        staged = [item for item, result in zip(items, results) if result['success']]
+        if not staged:
+            return results
+
+        # Recorded outside self.lock: a concurrent flush holds the journal lock while closing sessions. Items that
+        # name their image by page and resource name are still found if that flush rewrote the file meanwhile.
+        state = self.journal.record(staged)
+        with self.lock:
+            self.edit_version = state['version']
+            self.journal_stat = self.journal.stat_key()
+            for name in self.edit_dependent_indexes:
+                self.indexes.pop(name, None)
+        return results
+
+    def get_index(self, name, builder):
+        with self.lock:
+            index = self.indexes.get(name)
+            if index is None:
+                index = builder(self.pdf)
+                self.indexes[name] = index
+            return index
+
+    def cached_index(self, name):
+        # Lock-free read for the event loop; returns None rather than waiting on a build in progress.
+        return self.indexes.get(name)
+
+    def is_stale(self):
+        try:
+            stat = os.stat(self.pdf_path)
+        except OSError:
+            return True
+        if stat.st_mtime_ns != self.mtime_ns or stat.st_size != self.size_bytes:
+            return True
+        # Edits staged by another worker only show up in the journal.
+        return self.journal.stat_key() != self.journal_stat
+
+    def close(self):
+        with self.lock:
+            self.indexes.clear()
+            self.pdf.close()
+
+
+class DocumentSessionCache:
+    def __init__(self, max_entries=16, max_bytes=256 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._sessions = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def configure(self, max_entries=None, max_bytes=None):
+        with self._lock:
+            if max_entries is not None:
+                self.max_entries = max_entries
+            if max_bytes is not None:
+                self.max_bytes = max_bytes
+            evicted = self._evict()
+        self._close_all(evicted)
+
+    def get(self, pdf_id, pdf_path):
+        stale = []
+        with self._lock:
+            session = self._sessions.get(pdf_id)
+            if session is not None:
+                if session.pdf_path == pdf_path and not session.is_stale():
+                    self._sessions.move_to_end(pdf_id)
+                    self.hits += 1
+                    return session
+                stale.append(self._pop(pdf_id))
+            self.misses += 1
+        self._close_all(stale)
+
+        session = DocumentSession(pdf_id, pdf_path)
+
+        with self._lock:
+            existing = self._sessions.get(pdf_id)
+            if existing is not None and existing.pdf_path == pdf_path:
+                # Another request opened the same document while we were parsing it.
+                self._sessions.move_to_end(pdf_id)
+                duplicate, session = session, existing
+                evicted = [duplicate]
+            else:
+                evicted = [self._pop(pdf_id)] if existing is not None else []
+                self._sessions[pdf_id] = session
+                self._total_bytes += session.size_bytes
+                evicted.extend(self._evict())
+        self._close_all(evicted)
+        return session
+
+    def peek(self, pdf_id, pdf_path):
+        # Like get(), but never opens a document, so it is cheap enough to call from async views.
+        with self._lock:
+            session = self._sessions.get(pdf_id)
+            if session is None or session.pdf_path != pdf_path or session.is_stale():
+                return None
+            self._sessions.move_to_end(pdf_id)
+            return session
+
+    def flush(self, pdf_id, pdf_path):
+        def write(entries):
+            print(f"[DEBUG] Flushing {len(entries)} staged edit(s) to {pdf_path}")
+            # The rewrite replaces the file that an open session is reading from.
+            self.invalidate(pdf_id)
+            return tag_images_with_alt_text(pdf_path, entries)
+
+        return EditJournal(pdf_path).flush(write)
+
+    def invalidate(self, pdf_id):
+        with self._lock:
+            if pdf_id not in self._sessions:
+                return False
+            session = self._pop(pdf_id)
+            self.invalidations += 1
+        self._close_all([session])
+        return True
+
+    def clear(self):
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+            self._total_bytes = 0
+        self._close_all(sessions)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._sessions),
+                'total_bytes': self._total_bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
+
+    def __contains__(self, pdf_id):
+        with self._lock:
+            return pdf_id in self._sessions
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
+
+    def _pop(self, pdf_id):
+        session = self._sessions.pop(pdf_id)
+        self._total_bytes -= session.size_bytes
+        return session
+
+    def _evict(self):
+        evicted = []
+        # The most recently used session is always kept, even if it alone exceeds the budget.
+        while len(self._sessions) > 1 and (
+            len(self._sessions) > self.max_entries or self._total_bytes > self.max_bytes
+        ):
+            pdf_id = next(iter(self._sessions))
+            evicted.append(self._pop(pdf_id))
+            self.evictions += 1
+        return evicted
+
+    def _close_all(self, sessions):
+        # Closing waits on each session's lock, so it must happen outside self._lock.
+        for session in sessions:
+            try:
+                session.close()
+            except Exception as e:
+                print(f"[ERROR] Failed to close session for {session.pdf_id}: {e}")
+
+
+document_sessions = DocumentSessionCache()
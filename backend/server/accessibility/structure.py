@@ -0,0 +1,370 @@
+from array import array
+from collections import deque
+from typing import Dict, List, Optional
+
+from .models import StructureElement
+
+
+NO_STRING = -1
+
+
+class StringTable:
+    """Deduplicated strings packed into one buffer and addressed by id."""
+
+    def __init__(self):
+        self._ids: Optional[Dict[str, int]] = {}
+        self._chunks: List[str] = []
+        self._offsets = array('I', [0])
+        self._text: Optional[str] = None
+
+    def add(self, value) -> int:
+        if value is None:
+            return NO_STRING
+        value = str(value)
+        if self._ids is None:
+            self._ids = {self.get(i): i for i in range(len(self))}
+        string_id = self._ids.get(value)
+        if string_id is not None:
+            return string_id
+        if self._text is not None:
+            self._chunks = [self._text]
+            self._text = None
+        string_id = len(self._offsets) - 1
+        self._chunks.append(value)
+        self._offsets.append(self._offsets[-1] + len(value))
+        self._ids[value] = string_id
+        return string_id
+
+    def get(self, string_id) -> Optional[str]:
+        if string_id == NO_STRING:
+            return None
+        if self._text is None:
+            self.freeze()
+        return self._text[self._offsets[string_id]:self._offsets[string_id + 1]]
+
+    def freeze(self):
+        if self._text is None:
+            self._text = ''.join(self._chunks)
+            self._chunks = []
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getstate__(self):
+        # The lookup dict only speeds up building; it is rebuilt on demand rather than shipped between processes.
+        self.freeze()
+        return {'_offsets': self._offsets, '_text': self._text}
+
+    def __setstate__(self, state):
+        self._offsets = state['_offsets']
+        self._text = state['_text']
+        self._chunks = []
+        self._ids = None
+
+
+class StructureTable:
+    """Structure tree stored as parallel arrays, one row per element in reading order.
+
+    Element types and text attributes are ids into shared string tables, and children are linked through
+    first_child/next_sibling columns, so a row costs a few dozen bytes instead of a dataclass, a dict and a list.
+    """
+
+    def __init__(self):
+        self.type_names = StringTable()
+        self.strings = StringTable()
+        self.types = array('I')
+        self.depths = array('I')
+        self.parents = array('i')
+        self.reading_order = array('I')
+        self.first_child = array('i')
+        self.next_sibling = array('i')
+        self.child_counts = array('I')
+        self.alt_text = array('i')
+        self.actual_text = array('i')
+        self.title = array('i')
+        self.lang = array('i')
+        self._last_child = array('i')
+        self._first_top = -1
+        self._last_top = -1
+        self.top_level_count = 0
+
+    def append(self, element_type, depth, parent, reading_order_index, alt_text=None, actual_text=None,
+               title=None, lang=None) -> int:
+        index = len(self.types)
+        self.types.append(self.type_names.add(element_type))
+        self.depths.append(depth)
+        self.parents.append(parent)
+        self.reading_order.append(reading_order_index)
+        self.first_child.append(-1)
+        self.next_sibling.append(-1)
+        self.child_counts.append(0)
+        self._last_child.append(-1)
+        self.alt_text.append(self.strings.add(alt_text))
+        self.actual_text.append(self.strings.add(actual_text))
+        self.title.append(self.strings.add(title))
+        self.lang.append(self.strings.add(lang))
+
+        if parent < 0:
+            if self._last_top < 0:
+                self._first_top = index
+            else:
+                self.next_sibling[self._last_top] = index
+            self._last_top = index
+            self.top_level_count += 1
+        else:
+            if self._last_child[parent] < 0:
+                self.first_child[parent] = index
+            else:
+                self.next_sibling[self._last_child[parent]] = index
+            self._last_child[parent] = index
+            self.child_counts[parent] += 1
+        return index
+
+    def finish(self):
+        # Rows can no longer be appended after this; the bookkeeping column is only needed while building.
+        self._last_child = array('i')
+        self.type_names.freeze()
+        self.strings.freeze()
+        return self
+
+    def __len__(self):
+        return len(self.types)
+
+    def type_name(self, index) -> str:
+        return self.type_names.get(self.types[index])
+
+    def children_of(self, index):
+        child = self._first_top if index < 0 else self.first_child[index]
+        while child >= 0:
+            yield child
+            child = self.next_sibling[child]
+
+    def child_count(self, index) -> int:
+        return self.top_level_count if index < 0 else self.child_counts[index]
+
+    def parent_of(self, index) -> Optional[int]:
+        if index < 0:
+            return None
+        parent = self.parents[index]
+        if parent < 0:
+            # Only the synthetic root (-1) is a real parent; a lone top-level element is the root itself.
+            return -1 if self.top_level_count > 1 else None
+        return parent
+
+    def find_reading_order(self, reading_order_index) -> Optional[int]:
+        # Rows are appended in reading order starting at 1, so the row is the index minus one.
+        row = reading_order_index - 1
+        if 0 <= row < len(self.types) and self.reading_order[row] == reading_order_index:
+            return row
+        return None
+
+    def node_dict(self, index):
+        """One element without its children, addressed by row index (-1 for the synthetic root)."""
+        view = StructureElementView(self, index)
+        return {
+            'id': index,
+            'element_type': view.element_type,
+            'depth': view.depth,
+            'reading_order_index': view.reading_order_index,
+            'alt_text': view.alt_text,
+            'actual_text': view.actual_text,
+            'title': view.title,
+            'lang': view.lang,
+            'parent_id': self.parent_of(index),
+            'parent_type': view.parent_type,
+            'child_count': self.child_count(index),
+        }
+
+    def subtree(self, index, depth=1, limit=100, offset=0, max_nodes=2000):
+        """Element `index` with up to `depth` levels of descendants, for serving the tree a piece at a time.
+
+        Every children list is cut at `limit`, with `next_cursor` giving the offset to continue from; `offset`
+        applies to the top element's children. Levels are expanded breadth-first until `max_nodes` elements
+        have been included, and elements left unexpanded have no 'children' key at all.
+        """
+        top = self.node_dict(index)
+        budget = max_nodes - 1
+        queue = deque([(index, top, depth, offset)])
+        while queue and budget > 0:
+            i, node, remaining, start = queue.popleft()
+            if remaining <= 0 or not self.child_count(i):
+                continue
+            children = []
+            node['next_cursor'] = None
+            for position, child in enumerate(self.children_of(i)):
+                if position < start:
+                    continue
+                if len(children) >= min(limit, budget):
+                    node['next_cursor'] = position
+                    break
+                children.append(self.node_dict(child))
+                queue.append((child, children[-1], remaining - 1, 0))
+            node['children'] = children
+            budget -= len(children)
+        return top
+
+    @property
+    def root(self):
+        if not self.top_level_count:
+            return None
+        # Several top-level elements hang off a synthetic 'Root', as extract_structure_tree always did.
+        return StructureElementView(self, self._first_top if self.top_level_count == 1 else -1)
+
+    def element(self, index):
+        return StructureElementView(self, index)
+
+    def unique_types(self) -> List[str]:
+        types = {self.type_names.get(type_id) for type_id in set(self.types)}
+        if self.top_level_count > 1:
+            types.add('Root')
+        return sorted(types)
+
+    def to_dict(self, index=None):
+        """Nested dict in the shape asdict(StructureElement) produces, built without recursion."""
+        if index is None:
+            root = self.root
+            if root is None:
+                return None
+            index = root.index
+
+        def row(i):
+            view = StructureElementView(self, i)
+            return {
+                'element_type': view.element_type,
+                'depth': view.depth,
+                'reading_order_index': view.reading_order_index,
+                'alt_text': view.alt_text,
+                'actual_text': view.actual_text,
+                'title': view.title,
+                'lang': view.lang,
+                'children': [],
+                'parent_type': view.parent_type,
+            }
+
+        top = row(index)
+        stack = [(index, top)]
+        while stack:
+            i, node = stack.pop()
+            for child in self.children_of(i):
+                child_node = row(child)
+                node['children'].append(child_node)
+                stack.append((child, child_node))
+        return top
+
+    def iter_json(self, encode, index=None):
+        """JSON text for to_dict(index), yielded a fragment per element so no nested dicts are ever built."""
+        if index is None:
+            root = self.root
+            if root is None:
+                yield 'null'
+                return
+            index = root.index
+
+        # Plain strings on the stack are literal text: element suffixes and the separators between siblings.
+        stack = [index]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, str):
+                yield item
+                continue
+
+            view = StructureElementView(self, item)
+            yield (
+                f'{{"element_type": {encode(view.element_type)}, "depth": {view.depth}, '
+                f'"reading_order_index": {view.reading_order_index}, "alt_text": {encode(view.alt_text)}, '
+                f'"actual_text": {encode(view.actual_text)}, "title": {encode(view.title)}, '
+                f'"lang": {encode(view.lang)}, "children": ['
+            )
+            stack.append(f'], "parent_type": {encode(view.parent_type)}}}')
+            children = list(self.children_of(item))
+            for position in range(len(children) - 1, -1, -1):
+                stack.append(children[position])
+                if position:
+                    stack.append(', ')
+
+    def to_element(self, index=None) -> Optional[StructureElement]:
+        """Materialise (part of) the tree as plain StructureElement dataclasses."""
+        if index is None:
+            root = self.root
+            if root is None:
+                return None
+            index = root.index
+
+        def make(i):
+            view = StructureElementView(self, i)
+            return StructureElement(
+                element_type=view.element_type,
+                depth=view.depth,
+                reading_order_index=view.reading_order_index,
+                alt_text=view.alt_text,
+                actual_text=view.actual_text,
+                title=view.title,
+                lang=view.lang,
+                children=[],
+                parent_type=view.parent_type,
+            )
+
+        top = make(index)
+        stack = [(index, top)]
+        while stack:
+            i, element = stack.pop()
+            for child in self.children_of(i):
+                child_element = make(child)
+                element.children.append(child_element)
+                stack.append((child, child_element))
+        return top
+
+
+class StructureElementView:
+    """Read-only StructureElement look-alike backed by a StructureTable row; index -1 is the synthetic root."""
+
+    __slots__ = ('table', 'index')
+
+    def __init__(self, table, index):
+        self.table = table
+        self.index = index
+
+    @property
+    def element_type(self):
+        return 'Root' if self.index < 0 else self.table.type_name(self.index)
+
+    @property
+    def depth(self):
+        return 0 if self.index < 0 else self.table.depths[self.index]
+
+    @property
+    def reading_order_index(self):
+        return 0 if self.index < 0 else self.table.reading_order[self.index]
+
+    @property
+    def alt_text(self):
+        return self._string(self.table.alt_text)
+
+    @property
+    def actual_text(self):
+        return self._string(self.table.actual_text)
+
+    @property
+    def title(self):
+        return self._string(self.table.title)
+
+    @property
+    def lang(self):
+        return self._string(self.table.lang)
+
+    @property
+    def children(self):
+        return [StructureElementView(self.table, child) for child in self.table.children_of(self.index)]
+
+    @property
+    def parent_type(self):
+        if self.index < 0:
+            return None
+        parent = self.table.parents[self.index]
+        return None if parent < 0 else self.table.type_name(parent)
+
+    def _string(self, column):
+        return None if self.index < 0 else self.table.strings.get(column[self.index])
+
+    def __repr__(self):
+        return f"StructureElementView({self.element_type!r}, index={self.index})"
@@ -1,10 +1,23 @@
+import mmap
 import os
+import re
 from enum import Enum
 
 import pikepdf
 from pikepdf import PdfError, PasswordError
 
 from .models import ValidationResult
+from .opener import pdf_opener
+
+
+# Readers accept the header anywhere in the first 1024 bytes, and startxref/%%EOF within the last few KB.
+HEADER_WINDOW = 1024
+TRAILER_WINDOW = 4096
+
+_VERSION = re.compile(rb'%PDF-(\d\.\d)')
+_STARTXREF = re.compile(rb'startxref\s+(\d+)')
+# A name ends at whitespace or a delimiter; '/EncryptMetadata' belongs to the encryption dictionary, not the trailer.
+_ENCRYPT = re.compile(rb'/Encrypt[\s<]')
 
 
 class ValidationStatus(Enum):
@@ -14,7 +27,7 @@ class ValidationStatus(Enum):
     WARNING = "warning"
 
 
-def validate_pdf_file(file_path):
+def new_validation_result(file_path):
     result = ValidationResult(
         status=ValidationStatus.VALID.value,
         can_proceed=True,
@@ -32,28 +45,98 @@ def validate_pdf_file(file_path):
     if result.file_size_bytes > 50 * 1024 * 1024:
         result.warnings.append("Very large file - extraction may timeout")
 
-    try:
-        pdf = pikepdf.Pdf.open(file_path)
-        result.is_valid_pdf = True
+    return result
+
+
+def sniff_pdf(file_path, result):
+    """Pre-parse check of the raw bytes, so garbage and encrypted files are rejected without parsing them.
 
-        if pdf.is_encrypted:
-            result.is_encrypted = True
-            result.status = ValidationStatus.ENCRYPTED.value
+    Only definite failures reject the file: a missing header, or /Encrypt in the last trailer (or, for
+    PDF 1.5+ files, the cross-reference stream dictionary startxref points at). A damaged trailer is left to
+    the full parse, which can often reconstruct it.
+    """
+    with open(file_path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if not size:
+            result.status = ValidationStatus.INVALID.value
             result.can_proceed = False
-            result.errors.append("PDF is encrypted. Please decrypt before uploading.")
+            result.errors.append("Invalid PDF: the file is empty")
+            return result
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            version = _VERSION.search(data, 0, HEADER_WINDOW + 8)
+            if version is None or version.start() >= HEADER_WINDOW:
+                result.status = ValidationStatus.INVALID.value
+                result.can_proceed = False
+                result.errors.append("Invalid PDF: no %PDF- header found; this is not a PDF file")
+                return result
+            result.pdf_version = version.group(1).decode()
 
-        pdf.close()
+            tail_start = max(0, size - TRAILER_WINDOW)
+            startxref = None
+            for startxref in _STARTXREF.finditer(data, tail_start):
+                pass
+            if startxref is None:
+                result.warnings.append("No startxref found near the end of the file; the PDF may be damaged")
+                return result
+
+            trailer_start = data.rfind(b'trailer', tail_start, startxref.start())
+            if trailer_start >= 0:
+                trailer = data[trailer_start:startxref.start()]
+            else:
+                offset = int(startxref.group(1))
+                end = data.find(b'stream', offset, offset + TRAILER_WINDOW) if offset < size else -1
+                trailer = data[offset:end] if end >= 0 else b''
+
+            if _ENCRYPT.search(trailer):
+                result.is_valid_pdf = True
+                result.is_encrypted = True
+                result.status = ValidationStatus.ENCRYPTED.value
+                result.can_proceed = False
+                result.errors.append("PDF is encrypted. Please decrypt before uploading.")
+    return result
 
-    except PasswordError:
+
+def check_opened_pdf(pdf, result):
+    result.is_valid_pdf = True
+
+    if pdf.is_encrypted:
         result.is_encrypted = True
         result.status = ValidationStatus.ENCRYPTED.value
         result.can_proceed = False
-        result.errors.append("PDF is password-protected. Please decrypt before uploading.")
+        result.errors.append("PDF is encrypted. Please decrypt before uploading.")
 
-    except PdfError as e:
+    return result
+
+
+def record_open_error(result, error):
+    if isinstance(error, PasswordError):
+        result.is_encrypted = True
+        result.status = ValidationStatus.ENCRYPTED.value
+        result.can_proceed = False
+        result.errors.append("PDF is password-protected. Please decrypt before uploading.")
+    else:
         result.is_valid_pdf = False
         result.status = ValidationStatus.INVALID.value
         result.can_proceed = False
-        result.errors.append(f"Invalid PDF: {str(e)}")
+        result.errors.append(f"Invalid PDF: {str(error)}")
+    return result
+
+
+def validate_pdf_file(file_path):
+    # A standalone check that opens the file. Uploads are only sniffed; the queued ingest pipeline opens them once,
+    # in a worker process, and rejects what this would.
+    result = sniff_pdf(file_path, new_validation_result(file_path))
+    if not result.can_proceed:
+        return result
+
+    try:
+        pdf = pdf_opener.open(file_path)
+    except (PasswordError, PdfError) as e:
+        return record_open_error(result, e)
+
+    try:
+        check_opened_pdf(pdf, result)
+    finally:
+        pdf.close()
 
     return result
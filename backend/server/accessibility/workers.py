@@ -0,0 +1,329 @@
+import atexit
+import multiprocessing
+import resource
+import threading
+import time
+
+from .content import ContentIndex
+from .extractor import _find_image_by_key, apply_alt_text, build_structure_index, new_extraction_result, render_image
+from .images import ImageIndex
+from .journal import EditJournal
+from .opener import pdf_opener
+from .pipeline import IngestResult, run_ingest_pipeline
+from .render_cache import RenderedImageCache, image_content_hash, rendered_images
+from .result_cache import make_cache_key, make_image_list_key
+from .validators import ValidationStatus, new_validation_result
+
+
+CGROUP_MEMORY_LIMITS = ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes')
+
+
+def container_memory_limit():
+    """The cgroup memory limit this process runs under, or None when there is none."""
+    for path in CGROUP_MEMORY_LIMITS:
+        try:
+            with open(path) as f:
+                value = f.read().strip()
+        except OSError:
+            continue
+        if value == 'max':
+            return None
+        limit = int(value)
+        # cgroup v1 reports "no limit" as a huge page-aligned number.
+        return limit if limit < 1 << 60 else None
+    return None
+
+
+def default_memory_limit(processes, web_processes=1, fallback=1024 * 1024 * 1024):
+    """Per-worker address-space limit that keeps every web process and its workers inside the container."""
+    budget = container_memory_limit()
+    if budget is None:
+        return fallback
+    return budget // (max(web_processes, 1) * (max(processes, 0) + 1))
+
+
+class WorkerJobError(Exception):
+    def __init__(self, message, timed_out=False, partial=None):
+        super().__init__(message)
+        self.timed_out = timed_out
+        self.partial = partial
+
+
+class WorkerPoolClosed(WorkerJobError):
+    """The pool shut down (the process is exiting) before or while running the job; the job itself did not fail."""
+
+
+def _render_job(pdf_path, image_key, progress=None):
+    with pdf_opener.open(pdf_path) as pdf:
+        image_obj, _ = _find_image_by_key(pdf, image_key)
+        if image_obj is None:
+            return None
+        return render_image(image_obj)['data']
+
+
+def _render_batch_job(pdf_path, max_images, cache_location, cache_max_bytes, progress=None):
+    # Each render is written to the shared cache as it finishes, so a batch cut short keeps what it did.
+    cache = RenderedImageCache(location=cache_location, max_bytes=cache_max_bytes)
+    rendered = 0
+    with pdf_opener.open(pdf_path) as pdf:
+        entries = list(ImageIndex.build(pdf))[:max_images]
+        for done, entry in enumerate(entries):
+            if progress is not None:
+                progress((done, len(entries)))
+            try:
+                content_hash = image_content_hash(entry.obj)
+                if cache.has(content_hash, 'png'):
+                    continue
+                cache.put(content_hash, render_image(entry.obj)['data'], 'png')
+                rendered += 1
+            except Exception as e:
+                # One undecodable image should not keep the rest of the document cold.
+                print(f"[ERROR] Rendering image {entry.key} of {pdf_path} failed: {e}")
+    return rendered
+
+
+def _structure_job(pdf_path, progress=None):
+    with pdf_opener.open(pdf_path) as pdf:
+        # Staged alt text lives in the journal until download, so it is replayed like a session does.
+        state = EditJournal(pdf_path).load()
+        content = ContentIndex.build(pdf)
+        if state['entries']:
+            apply_alt_text(pdf, state['entries'], content)
+        table, stats = build_structure_index(pdf, content=content)
+    return state['version'], table, stats
+
+
+def _worker_main(conn, memory_limit, opener_settings):
+    pdf_opener.configure(**opener_settings)
+    if memory_limit:
+        # Address-space cap: a runaway decode raises MemoryError here instead of swapping the host.
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+
+    def progress(partial):
+        conn.send(('progress', partial))
+
+    while True:
+        try:
+            func, args = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            return
+        try:
+            conn.send(('done', func(*args, progress=progress)))
+        except Exception as e:
+            conn.send(('error', f"{type(e).__name__}: {e}"))
+
+
+class _Worker:
+    def __init__(self, context, memory_limit):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main, args=(child_conn, memory_limit, pdf_opener.settings()), daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+        self.jobs = 0
+        self.broken = False
+
+    def run(self, func, args, deadline):
+        self.jobs += 1
+        try:
+            self.conn.send((func, args))
+        except OSError as e:
+            self.broken = True
+            raise WorkerJobError(f"Worker is gone: {e}")
+        partial = None
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not self.conn.poll(remaining):
+                self.broken = True
+                raise WorkerJobError("Job exceeded its deadline", timed_out=True, partial=partial)
+            try:
+                kind, payload = self.conn.recv()
+            except (EOFError, OSError):
+                # Killed by the kernel (e.g. out of memory) or crashed inside a native library.
+                self.broken = True
+                raise WorkerJobError(f"Worker exited with code {self.process.exitcode}", partial=partial)
+            if kind == 'progress':
+                partial = payload
+            elif kind == 'done':
+                return payload
+            else:
+                raise WorkerJobError(payload, partial=partial)
+
+    def stop(self):
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class ExtractionWorkerPool:
+    def __init__(self, processes=2, timeout=60, memory_limit=1024 * 1024 * 1024, max_jobs_per_worker=200):
+        self.processes = processes
+        self.timeout = timeout
+        self.memory_limit = memory_limit
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self._context = None
+        self._idle = []
+        self._busy = 0
+        self._condition = threading.Condition()
+        self._closed = False
+        self._starting = 0
+        self.jobs = 0
+        self.timeouts = 0
+        self.failures = 0
+        self.recycled = 0
+
+    def configure(self, processes=None, timeout=None, memory_limit=None, max_jobs_per_worker=None):
+        with self._condition:
+            if processes is not None:
+                self.processes = processes
+            if timeout is not None:
+                self.timeout = timeout
+            if memory_limit is not None:
+                self.memory_limit = memory_limit
+            if max_jobs_per_worker is not None:
+                self.max_jobs_per_worker = max_jobs_per_worker
+            retired, self._idle = self._idle, []
+            self._condition.notify_all()
+        for worker in retired:
+            worker.stop()
+
+    def run(self, func, *args, timeout=None):
+        if not self.processes:
+            # Isolation disabled (e.g. in development); no deadline can be enforced in-process.
+            return func(*args)
+
+        worker = self._acquire()
+        try:
+            return worker.run(func, args, time.monotonic() + (timeout or self.timeout))
+        except WorkerJobError as e:
+            with self._condition:
+                if self._closed:
+                    # Terminated by the exit handlers along with every other child, not by its document.
+                    raise WorkerPoolClosed(f"Worker pool shut down during the job: {e}") from e
+                if e.timed_out:
+                    self.timeouts += 1
+                else:
+                    self.failures += 1
+            raise
+        finally:
+            self._release(worker)
+
+    def shutdown(self, timeout=10):
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+            # A worker mid-start would otherwise outlive the interpreter: it is forked after multiprocessing's own
+            # exit handler has reaped the children it knew about.
+            self._condition.wait_for(lambda: not self._starting, timeout)
+            retired, self._idle = self._idle, []
+        for worker in retired:
+            worker.stop()
+
+    def stats(self):
+        with self._condition:
+            return {
+                'processes': self.processes,
+                'idle': len(self._idle),
+                'busy': self._busy,
+                'jobs': self.jobs,
+                'timeouts': self.timeouts,
+                'failures': self.failures,
+                'recycled': self.recycled,
+            }
+
+    def _acquire(self):
+        with self._condition:
+            while self._busy >= self.processes and not self._closed:
+                self._condition.wait()
+            if self._closed:
+                # A worker started after interpreter shutdown began would never be reaped.
+                raise WorkerPoolClosed("Worker pool is shut down")
+            self._busy += 1
+            self.jobs += 1
+            if self._idle:
+                return self._idle.pop()
+            if self._context is None:
+                methods = multiprocessing.get_all_start_methods()
+                # Forking a process that is running threads can copy held locks into the child.
+                self._context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+            context, memory_limit = self._context, self.memory_limit
+            self._starting += 1
+        worker = None
+        try:
+            worker = _Worker(context, memory_limit)
+        finally:
+            with self._condition:
+                self._starting -= 1
+                closed = self._closed
+                if worker is None or closed:
+                    self._busy -= 1
+                self._condition.notify_all()
+        if closed:
+            worker.stop()
+            raise WorkerPoolClosed("Worker pool is shut down")
+        return worker
+
+    def _release(self, worker):
+        with self._condition:
+            self._busy -= 1
+            recycle = worker.broken or worker.jobs >= self.max_jobs_per_worker or len(self._idle) >= self.processes
+            if not recycle:
+                self._idle.append(worker)
+            else:
+                self.recycled += 1
+            self._condition.notify()
+        if recycle:
+            worker.stop()
+
+
+extraction_workers = ExtractionWorkerPool()
+# Registered after multiprocessing's own exit handler, so it runs first and background ingest threads stop
+# acquiring workers before the running ones are terminated.
+atexit.register(extraction_workers.shutdown)
+
+
+def ingest_with_deadline(pdf_path, filename, content_hash, document_id=None):
+    try:
+        return extraction_workers.run(run_ingest_pipeline, pdf_path, filename, content_hash, document_id)
+    except WorkerPoolClosed:
+        raise
+    except WorkerJobError as e:
+        outcome = e.partial
+        if outcome is None:
+            # Killed before the document had even been opened, so it never passed validation.
+            validation = new_validation_result(pdf_path)
+            validation.status = ValidationStatus.INVALID.value
+            validation.can_proceed = False
+            validation.errors.append(f"PDF could not be opened: {e}")
+            state_version = EditJournal(pdf_path).version
+            outcome = IngestResult(
+                validation,
+                new_extraction_result(pdf_path, filename, make_cache_key(content_hash, state_version, document_id)),
+                image_list_key=make_image_list_key(content_hash, pdf_path),
+            )
+        result = outcome.extraction
+        result.success = False
+        result.timed_out = e.timed_out
+        if e.timed_out:
+            result.errors.append(f"Extraction exceeded the {extraction_workers.timeout}s deadline; results are partial")
+        else:
+            result.errors.append(f"Extraction failed: {e}")
+        return outcome
+
+
+def render_with_deadline(pdf_path, image_key):
+    return extraction_workers.run(_render_job, pdf_path, image_key)
+
+
+def render_all_with_deadline(pdf_path, max_images):
+    """Render a document's first `max_images` images into the render cache from one open; returns how many."""
+    return extraction_workers.run(
+        _render_batch_job, pdf_path, max_images, rendered_images.location, rendered_images.max_bytes,
+    )
+
+
+def structure_with_deadline(pdf_path):
+    """Build (edit_version, table, stats) for a document in a worker process; the table pickles compactly."""
+    return extraction_workers.run(_structure_job, pdf_path)
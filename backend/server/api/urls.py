@@ -1,13 +1,19 @@
 from django.urls import path
 
-from server.api.views import PDFUploadView, PDFDataView, MetadataView, ImageListView, ImageDetailView, DownloadView, CleanupView
+from server.api.views import PDFUploadView, PDFDataView, PDFFileView, MetadataView, StructureView, StructureSummaryView, ImageListView, ImageDetailView, ImageBatchTagView, IngestStatusView, DownloadView, FlushView, CleanupView
 
 urlpatterns = [
     path('upload/', PDFUploadView.as_view()),
     path('<str:pdf_id>/data/', PDFDataView.as_view()),
+    path('<str:pdf_id>/file/', PDFFileView.as_view()),
+    path('<str:pdf_id>/status/', IngestStatusView.as_view()),
     path('<str:pdf_id>/accessibility_metadata/', MetadataView.as_view()),
+    path('<str:pdf_id>/structure/', StructureView.as_view()),
+    path('<str:pdf_id>/structure/summary/', StructureSummaryView.as_view()),
     path('<str:pdf_id>/images/', ImageListView.as_view()),
     path('<str:pdf_id>/images/<int:image_id>/', ImageDetailView.as_view()),
+    path('<str:pdf_id>/images/tag/', ImageBatchTagView.as_view()),
     path('<str:pdf_id>/download/', DownloadView.as_view()),
+    path('<str:pdf_id>/flush/', FlushView.as_view()),
     path('<str:pdf_id>/cleanup/', CleanupView.as_view()),
 ]
\ No newline at end of file
@@ -1,118 +1,346 @@
-import base64
+import asyncio
 import os
 import json
-from dataclasses import asdict
+from django.conf import settings
 from django.views import View
-from django.http import JsonResponse, HttpResponse, FileResponse
-from django.core.cache import cache
+from django.http import JsonResponse, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 
-from server.accessibility.extractor import extract_accessibility_info, extract_all_images, get_image_by_id, tag_image_with_alt_text
-from server.accessibility.validators import validate_pdf_file
+from server.accessibility.images import ImageIndex
+from server.accessibility.journal import EditJournal
+from server.accessibility.render_cache import image_content_hash, rendered_images
+from server.accessibility.result_cache import content_scope, extraction_results, make_cache_key, make_image_list_key
+from server.accessibility.session import document_sessions
+from server.accessibility.validators import new_validation_result, sniff_pdf
+from server.accessibility.workers import WorkerJobError, render_with_deadline
+from server.executor import WorkPoolBusy, pdf_work
+from server.ingest import (
+    DONE, extract_metadata, ingest_queue, list_images, structure_index, structure_indexes,
+)
+from server.registry import get_document_registry
+from server.responses import AsyncFileResponse, AsyncIteratorResponse, ranged_file_response
+from server.uploads import UploadError, get_upload_error, release_document, save_upload
+
+
+class AsyncPDFView(View):
+    # Handlers stay on the event loop only to await: registry, journal and cache lookups (SQLite reads and
+    # stat calls) go through asyncio.to_thread, and anything touching pikepdf goes through pdf_work.
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            return await super().dispatch(request, *args, **kwargs)
+        except WorkPoolBusy as e:
+            print(f"[ERROR] Rejecting {request.path}: {e}")
+            response = JsonResponse({"error": "Server is busy, please retry shortly"}, status=503)
+            response['Retry-After'] = '1'
+            return response
+
+
+async def _get_document(pdf_id):
+    return await asyncio.to_thread(get_document_registry().get, pdf_id)
 
 
 @method_decorator(csrf_exempt, name='dispatch')
-class PDFUploadView(View):
-    def post(self, request):
+class PDFUploadView(AsyncPDFView):
+    async def post(self, request):
+        # Multipart parsing streams and hashes the file to disk and the sniff reads it, so the whole upload is offloaded.
+        return await pdf_work.run(self._store, request)
+
+    def _store(self, request):
         pdf_file = request.FILES.get("pdf_file")
+        upload_error = get_upload_error(request)
+        if upload_error:
+            return JsonResponse({"error": upload_error}, status=400)
         if not pdf_file:
             return JsonResponse({"error": "No file uploaded"}, status=400)
 
-        pdf_data = pdf_file.read()
-        pdf_id = base64.urlsafe_b64encode(pdf_file.name.encode()).decode()[:16]
-
-        temp_path = f"/tmp/{pdf_file.name}_{pdf_id}"
-        with open(temp_path, "wb") as f:
-            f.write(pdf_data)
+        try:
+            saved = save_upload(pdf_file, settings.PDF_UPLOAD_DIR)
+        except UploadError as e:
+            return JsonResponse({"error": str(e)}, status=400)
         
-        cache.set(f"pdf_temp_path_{pdf_id}", temp_path, timeout=3600)
-
-        validation = validate_pdf_file(temp_path)
+        pdf_id = saved.pdf_id
+        temp_path = saved.path
+        print(f"[DEBUG] Stored upload {pdf_file.name} ({saved.size_bytes} bytes) as {pdf_id} at {temp_path}")
+        
+        # Every upload is its own document; identical bytes only share the read-only blob on disk.
+        registry = get_document_registry()
+        registry.set(pdf_id, temp_path, pdf_file.name, saved.sha256)
+        
+        # Only the byte-level sniff here: the one open happens in the queued job's worker, under its deadline and
+        # memory limit, and a file pikepdf cannot use is reported as failed through the status endpoint.
+        validation = sniff_pdf(temp_path, new_validation_result(temp_path))
         if not validation.can_proceed:
-            os.remove(temp_path)
+            release_document(temp_path)
+            registry.delete(pdf_id)
             return JsonResponse({
                 "error": validation.errors[0] if validation.errors else "Invalid PDF",
                 "warnings": validation.warnings
             }, status=400)
 
-        return JsonResponse({"pdf_id": pdf_id, "success": True}, status=201)
+        ingest_queue.enqueue(pdf_id, temp_path, pdf_file.name, saved.sha256)
+        return JsonResponse({"pdf_id": pdf_id, "success": True, "deduplicated": saved.existing}, status=201)
 
 
-class PDFDataView(View):
-    def get(self, request, pdf_id):
-        temp_path = cache.get(f"pdf_temp_path_{pdf_id}")
-        if not temp_path or not os.path.exists(temp_path):
+class PDFDataView(AsyncPDFView):
+    async def get(self, request, pdf_id):
+        document = await _get_document(pdf_id)
+        temp_path = document.path if document else None
+        if not temp_path or not await asyncio.to_thread(os.path.exists, temp_path):
             return JsonResponse({"error": "PDF not found"}, status=404)
-
-        with open(temp_path, "rb") as f:
-            pdf_data = f.read()
-        
-        pdf_base64 = base64.b64encode(pdf_data).decode()
         
+        # The bytes themselves come from PDFFileView, which pdf.js can read progressively with range requests.
         return JsonResponse({
-            "pdf_data_url": f"data:application/pdf;base64,{pdf_base64}",
+            "pdf_url": f"/api/{pdf_id}/file/",
             "pdf_id": pdf_id
         })
 
 
-class MetadataView(View):
-    def get(self, request, pdf_id):
-        temp_path = cache.get(f"pdf_temp_path_{pdf_id}")
+class PDFFileView(AsyncPDFView):
+    async def get(self, request, pdf_id):
+        document = await _get_document(pdf_id)
+        temp_path = document.path if document else None
         if not temp_path:
             return JsonResponse({"error": "PDF not found"}, status=404)
         
-        pdf_filename = temp_path.split("/")[-1].rsplit("_", 1)[0]
+        try:
+            response = await asyncio.to_thread(ranged_file_response, request, temp_path, 'application/pdf')
+        except FileNotFoundError:
+            return JsonResponse({"error": "PDF file not found on disk"}, status=404)
+        # Staged edits are flushed into this file in place, so clients must revalidate; the ETag makes that cheap.
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+class MetadataView(AsyncPDFView):
+    async def get(self, request, pdf_id):
+        document = await _get_document(pdf_id)
+        temp_path = document.path if document else None
+        if not temp_path:
+            return JsonResponse({"error": "PDF not found"}, status=404)
         
-        result = extract_accessibility_info(temp_path, pdf_filename)
-        result_dict = asdict(result)
+        cached_path = await asyncio.to_thread(self._cached, pdf_id, temp_path, document.content_hash)
+        if cached_path:
+            return AsyncFileResponse(cached_path, content_type='application/json')
         
-        images = extract_all_images(temp_path)
-        result_dict['actual_image_count'] = len(images)
+        # Extraction runs in a worker process so a pathological document is killed at the deadline instead of
+        # pinning a core; the JSON is then streamed from the compact result instead of being built up front.
+        _, chunks = await pdf_work.run(extract_metadata, pdf_id, temp_path, document.filename, document.content_hash)
+        return AsyncIteratorResponse(chunks, content_type='application/json')
+
+    def _cached(self, pdf_id, temp_path, content_hash):
+        # The journal version is what a session would report as its edit_version, without opening the PDF.
+        return extraction_results.get(make_cache_key(content_hash, EditJournal(temp_path).version, pdf_id))
+
+
+def _upload_scoped_keys(pdf_id, temp_path, content_hash):
+    # The structure index scope and result keys only this upload can hit: those for its edits, and the image list of
+    # its own copy. Unedited results are keyed on the content and stay cached for other uploads of the same bytes.
+    edit_version = EditJournal(temp_path).version
+    scope = content_scope(content_hash, edit_version, pdf_id)
+    if scope == content_hash:
+        scope, keys = None, []
+    else:
+        keys = [make_cache_key(content_hash, edit_version, pdf_id)]
+    try:
+        # A working copy still linked to the blob shares its image list with every other copy.
+        if os.stat(temp_path).st_nlink == 1:
+            keys.append(make_image_list_key(content_hash, temp_path))
+    except FileNotFoundError:
+        pass
+    return scope, keys
+
+
+def _int_param(request, name, default, minimum=0, maximum=None):
+    value = request.GET.get(name)
+    if value is None or value == '':
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer")
+    if number < minimum or (maximum is not None and number > maximum):
+        raise ValueError(f"{name} must be between {minimum} and {maximum}" if maximum is not None
+                         else f"{name} must be at least {minimum}")
+    return number
+
+
+async def _structure_index(pdf_id, document):
+    """Return ((table, stats), None), or (None, an error response) when the worker could not build the index."""
+    try:
+        return await pdf_work.run(structure_index, pdf_id, document.path, document.content_hash), None
+    except WorkerJobError as e:
+        print(f"[ERROR] Building the structure index of {pdf_id} failed: {e}")
+        if e.timed_out:
+            return None, JsonResponse({"error": "Structure extraction timed out"}, status=504)
+        return None, JsonResponse({"error": f"Structure extraction failed: {e}"}, status=500)
+
+
+class StructureView(AsyncPDFView):
+    # One node and a few levels below it, so the sidebar never has to download the whole tree.
+    max_depth = 10
+    max_limit = 1000
+
+    async def get(self, request, pdf_id):
+        document = await _get_document(pdf_id)
+        temp_path = document.path if document else None
+        if not temp_path:
+            return JsonResponse({"error": "PDF not found"}, status=404)
         
-        return JsonResponse(result_dict, safe=False, json_dumps_params={'default': str})
+        try:
+            depth = _int_param(request, 'depth', 1, maximum=self.max_depth)
+            limit = _int_param(request, 'limit', 100, minimum=1, maximum=self.max_limit)
+            cursor = _int_param(request, 'cursor', 0)
+            node = _int_param(request, 'node', None, minimum=-1)
+            reading_order = _int_param(request, 'reading_order', None, minimum=1)
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+        
+        index, error = await _structure_index(pdf_id, document)
+        if error is not None:
+            return error
+        table, _ = index
+        if table is None:
+            return JsonResponse({"error": "PDF has no structure tree"}, status=404)
+        
+        if reading_order is not None:
+            node = table.find_reading_order(reading_order)
+        elif node is None:
+            node = table.root.index
+        if node is None or node >= len(table) or (node < 0 and table.top_level_count < 2):
+            return JsonResponse({"error": "Structure element not found"}, status=404)
+        
+        return JsonResponse({
+            "pdf_id": pdf_id,
+            "element_count": len(table),
+            "node": table.subtree(node, depth=depth, limit=limit, offset=cursor),
+        })
 
 
-class ImageListView(View):
-    def get(self, request, pdf_id):
-        temp_path = cache.get(f"pdf_temp_path_{pdf_id}")
+class StructureSummaryView(AsyncPDFView):
+    async def get(self, request, pdf_id):
+        document = await _get_document(pdf_id)
+        temp_path = document.path if document else None
         if not temp_path:
             return JsonResponse({"error": "PDF not found"}, status=404)
         
-        images = extract_all_images(temp_path)
+        index, error = await _structure_index(pdf_id, document)
+        if error is not None:
+            return error
+        table, stats = index
+        total_images = len(stats.images)
+        return JsonResponse({
+            "pdf_id": pdf_id,
+            "has_structure_tree": table is not None,
+            "element_count": len(table) if table is not None else 0,
+            "root_id": table.root.index if table is not None else None,
+            "structure_type_counts": stats.type_counts,
+            "structure_types_found": stats.types_found(),
+            "max_heading_level": stats.max_heading_level,
+            "total_images": total_images,
+            "images_with_alt_text": stats.images_with_alt_text,
+            "images_without_alt_text": total_images - stats.images_with_alt_text,
+        })
+
+
+class ImageListView(AsyncPDFView):
+    async def get(self, request, pdf_id):
+        document = await _get_document(pdf_id)
+        temp_path = document.path if document else None
+        if not temp_path:
+            return JsonResponse({"error": "PDF not found"}, status=404)
         
-        image_list = []
-        for img in images:
-            image_list.append({
-                'id': img['id'],
-                'page_number': img['page_number'],
-                'width': img['width'],
-                'height': img['height'],
-                'format': img['format']
-            })
+        try:
+            images, cached_path = await asyncio.to_thread(self._cached, pdf_id, temp_path, document.content_hash)
+        except FileNotFoundError:
+            return JsonResponse({"error": "PDF file not found on disk"}, status=404)
+        if cached_path:
+            return AsyncFileResponse(cached_path, content_type='application/json')
+        if images is None:
+            images = await pdf_work.run(list_images, pdf_id, temp_path)
         
-        return JsonResponse({'images': image_list})
+        return JsonResponse({'images': images})
+
+    def _cached(self, pdf_id, temp_path, content_hash):
+        session = document_sessions.peek(pdf_id, temp_path)
+        images = session.cached_index('image_metadata') if session else None
+        if images is not None:
+            return images, None
+        return None, extraction_results.get(make_image_list_key(content_hash, temp_path))
+
+
+class IngestStatusView(AsyncPDFView):
+    async def get(self, request, pdf_id):
+        document = await _get_document(pdf_id)
+        if not document:
+            return JsonResponse({"error": "PDF not found"}, status=404)
+        
+        status = await asyncio.to_thread(ingest_queue.status, pdf_id)
+        if status is None:
+            return JsonResponse({"pdf_id": pdf_id, "status": "not_queued", "ready": False})
+        
+        status['ready'] = status['status'] == DONE
+        return JsonResponse(status)
 
 
 @method_decorator(csrf_exempt, name='dispatch')
-class ImageDetailView(View):
-    def get(self, request, pdf_id, image_id):
-        temp_path = cache.get(f"pdf_temp_path_{pdf_id}")
+class ImageDetailView(AsyncPDFView):
+    async def get(self, request, pdf_id, image_id):
+        document = await _get_document(pdf_id)
+        temp_path = document.path if document else None
         if not temp_path:
             return JsonResponse({"error": "PDF not found"}, status=404)
         
-        image = get_image_by_id(temp_path, image_id)
+        session = await asyncio.to_thread(document_sessions.peek, pdf_id, temp_path)
+        image_index = session.cached_index('images') if session else None
+        entry = image_index.get(image_id) if image_index is not None else None
+        if entry is None or entry.content_hash is None:
+            entry = await pdf_work.run(self._lookup, pdf_id, temp_path, image_id)
         
-        if not image:
+        if not entry:
             return JsonResponse({"error": "Image not found"}, status=404)
         
-        response = HttpResponse(image['data'], content_type='image/png')
+        etag = f'"{entry.content_hash}-png"'
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            data = await asyncio.to_thread(rendered_images.get, entry.content_hash, 'png')
+            if data is None:
+                try:
+                    data = await pdf_work.run(self._render, temp_path, entry.key, entry.content_hash)
+                except WorkerJobError as e:
+                    print(f"[ERROR] Decoding image {image_id} of {pdf_id} failed: {e}")
+                    if e.timed_out:
+                        return JsonResponse({"error": "Image decoding timed out"}, status=504)
+                    return JsonResponse({"error": f"Image decoding failed: {e}"}, status=500)
+            if data is None:
+                return JsonResponse({"error": "Image not found"}, status=404)
+            response = HttpResponse(data, content_type='image/png')
+        
+        response['ETag'] = etag
+        # Document ids are never reused and tagging never touches pixels, so the bytes behind this URL are fixed.
+        patch_cache_control(response, private=True, max_age=86400)
         return response
+
+    def _lookup(self, pdf_id, temp_path, image_id):
+        session = document_sessions.get(pdf_id, temp_path)
+        with session.lock:
+            entry = session.get_index('images', ImageIndex.build).get(image_id)
+            if entry is not None and entry.content_hash is None:
+                entry.content_hash = image_content_hash(entry.obj)
+        return entry
+
+    def _render(self, temp_path, image_key, content_hash):
+        data = render_with_deadline(temp_path, image_key)
+        if data is not None:
+            rendered_images.put(content_hash, data, 'png')
+        return data
     
-    def post(self, request, pdf_id, image_id):
+    async def post(self, request, pdf_id, image_id):
         import traceback
         
-        temp_path = cache.get(f"pdf_temp_path_{pdf_id}")
+        document = await _get_document(pdf_id)
+        temp_path = document.path if document else None
         if not temp_path:
             return JsonResponse({"error": "PDF not found"}, status=404)
         
@@ -125,7 +353,10 @@ class ImageDetailView(View):
             
             print(f"[DEBUG] Attempting to tag image {image_id} in {temp_path} with alt text: {alt_text}")
             
-            success = tag_image_with_alt_text(temp_path, image_id, alt_text)
+            results = await pdf_work.run(self._stage, pdf_id, temp_path, image_id, alt_text)
+            if results is None:
+                return JsonResponse({"error": "Image not found"}, status=404)
+            success = results[0]['success']
             
             if success:
                 print(f"[DEBUG] Successfully tagged image {image_id}")
@@ -138,6 +369,8 @@ class ImageDetailView(View):
             error_msg = f"Invalid JSON: {str(e)}"
             print(f"[ERROR] {error_msg}")
             return JsonResponse({"error": error_msg}, status=400)
+        except WorkPoolBusy:
+            raise
         except Exception as e:
             error_msg = f"{type(e).__name__}: {str(e)}"
             traceback_str = traceback.format_exc()
@@ -145,37 +378,160 @@ class ImageDetailView(View):
             print(f"[ERROR] Traceback:\n{traceback_str}")
             return JsonResponse({"error": error_msg, "traceback": traceback_str}, status=500)
 
+    def _stage(self, pdf_id, temp_path, image_id, alt_text):
+        session = document_sessions.get(pdf_id, temp_path)
+        with session.lock:
+            entry = session.get_index('images', ImageIndex.build).get(image_id)
+        if entry is None:
+            return None
+        
+        # Staging bumps the edit version, so metadata cached under the old one is no longer looked up.
+        return session.stage_alt_text([{
+            "image_id": image_id, "image_key": entry.key, "page_number": entry.page_number, "image_name": entry.name,
+            "alt_text": alt_text,
+        }])
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class ImageBatchTagView(AsyncPDFView):
+    async def post(self, request, pdf_id):
+        document = await _get_document(pdf_id)
+        temp_path = document.path if document else None
+        if not temp_path:
+            return JsonResponse({"error": "PDF not found"}, status=404)
+        
+        try:
+            data = json.loads(request.body)
+        except json.JSONDecodeError as e:
+            return JsonResponse({"error": f"Invalid JSON: {str(e)}"}, status=400)
+        
+        items = data.get('items') if isinstance(data, dict) else data
+        if not isinstance(items, list) or not items:
+            return JsonResponse({"error": "items must be a non-empty list of {image_id, alt_text}"}, status=400)
+        
+        results = await pdf_work.run(self._stage, pdf_id, temp_path, items)
+        tagged_count = sum(1 for result in results if result['success'])
+        return JsonResponse({
+            "success": tagged_count == len(results),
+            "tagged": tagged_count,
+            "failed": len(results) - tagged_count,
+            "results": results,
+        })
+
+    def _stage(self, pdf_id, temp_path, items):
+        session = document_sessions.get(pdf_id, temp_path)
+        with session.lock:
+            image_index = session.get_index('images', ImageIndex.build)
+        
+        results = [None] * len(items)
+        pending = []
+        for position, item in enumerate(items):
+            image_id = item.get('image_id') if isinstance(item, dict) else None
+            alt_text = item.get('alt_text') if isinstance(item, dict) else None
+            entry = image_index.get(image_id) if isinstance(image_id, int) else None
+            
+            if not isinstance(image_id, int):
+                results[position] = {"image_id": image_id, "success": False, "error": "image_id must be an integer"}
+            elif not alt_text:
+                results[position] = {"image_id": image_id, "success": False, "error": "alt_text is required"}
+            elif entry is None:
+                results[position] = {"image_id": image_id, "success": False, "error": "Image not found"}
+            else:
+                pending.append((position, {
+                    "image_id": image_id, "image_key": entry.key, "page_number": entry.page_number,
+                    "image_name": entry.name, "alt_text": alt_text,
+                }))
+        
+        if pending:
+            print(f"[DEBUG] Staging alt text for {len(pending)} image(s) in {temp_path} in one batch")
+            tagged = session.stage_alt_text([item for _, item in pending])
+            for (position, _), result in zip(pending, tagged):
+                results[position] = result
+        return results
+
 
-class DownloadView(View):
-    def get(self, request, pdf_id):
-        temp_path = cache.get(f"pdf_temp_path_{pdf_id}")
+class DownloadView(AsyncPDFView):
+    async def get(self, request, pdf_id):
+        document = await _get_document(pdf_id)
+        temp_path = document.path if document else None
         if not temp_path:
             return JsonResponse({"error": "PDF not found"}, status=404)
         
-        if not os.path.exists(temp_path):
+        if not await asyncio.to_thread(os.path.exists, temp_path):
             return JsonResponse({"error": "PDF file not found on disk"}, status=404)
         
-        original_filename = temp_path.split("/")[-1].rsplit("_", 1)[0] + ".pdf"
+        journal = EditJournal(temp_path)
+        if await asyncio.to_thread(journal.entries):
+            results = await pdf_work.run(document_sessions.flush, pdf_id, temp_path)
+            dropped = [result for result in results if result.get('image_missing')]
+            if dropped:
+                print(f"[ERROR] Dropped {len(dropped)} staged edit(s) for images no longer in {temp_path}: {dropped}")
+            failed = [result for result in results if not result['success'] and not result.get('image_missing')]
+            if failed:
+                print(f"[ERROR] {len(failed)} staged edit(s) could not be written to {temp_path}: {failed}")
+                # Failed edits stay in the journal for the next flush; the file without them is not handed out.
+                return JsonResponse({
+                    "error": f"{len(failed)} staged edit(s) could not be written to the PDF",
+                    "results": failed,
+                }, status=500)
         
-        response = FileResponse(open(temp_path, 'rb'), content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="{original_filename}"'
+        original_filename = document.filename
+        if not original_filename.lower().endswith(".pdf"):
+            original_filename += ".pdf"
         
+        # Every staged edit bumps the journal version and is flushed above, so the version identifies the bytes.
+        state = await asyncio.to_thread(journal.load)
+        response = await asyncio.to_thread(
+            ranged_file_response, request, temp_path, 'application/pdf', filename=original_filename,
+            as_attachment=True, version=state['version'],
+        )
+        patch_cache_control(response, private=True, no_cache=True)
         return response
 
 
 @method_decorator(csrf_exempt, name='dispatch')
-class CleanupView(View):
-    def post(self, request, pdf_id):
-        temp_path = cache.get(f"pdf_temp_path_{pdf_id}")
+class FlushView(AsyncPDFView):
+    async def post(self, request, pdf_id):
+        document = await _get_document(pdf_id)
+        temp_path = document.path if document else None
+        if not temp_path or not await asyncio.to_thread(os.path.exists, temp_path):
+            return JsonResponse({"error": "PDF not found"}, status=404)
+        
+        results = await pdf_work.run(document_sessions.flush, pdf_id, temp_path)
+        flushed = sum(1 for result in results if result['success'])
+        return JsonResponse({
+            "success": flushed == len(results),
+            "flushed": flushed,
+            "results": results,
+        })
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class CleanupView(AsyncPDFView):
+    async def post(self, request, pdf_id):
+        # Closing the session waits for any request still using it; none of that may stall the event loop.
+        await asyncio.to_thread(self._cleanup, pdf_id)
+        return JsonResponse({"success": True, "message": "Cleanup complete"})
+
+    def _cleanup(self, pdf_id):
+        document = get_document_registry().get(pdf_id)
+        temp_path = document.path if document else None
+        scope, cached_keys = _upload_scoped_keys(pdf_id, temp_path, document.content_hash) if temp_path else (None, [])
         
         if temp_path and os.path.exists(temp_path):
             try:
-                os.remove(temp_path)
+                # Only this upload's working copy goes; the blob stays while other uploads share it.
+                release_document(temp_path)
                 print(f"[DEBUG] Deleted temporary file: {temp_path}")
             except Exception as e:
                 print(f"[ERROR] Failed to delete temp file: {e}")
         
-        cache.delete(f"pdf_temp_path_{pdf_id}")
+        if temp_path:
+            EditJournal(temp_path).delete()
         
-        return JsonResponse({"success": True, "message": "Cleanup complete"})
-        
\ No newline at end of file
+        get_document_registry().delete(pdf_id)
+        ingest_queue.delete(pdf_id)
+        document_sessions.invalidate(pdf_id)
+        if scope is not None:
+            structure_indexes.invalidate(scope)
+        extraction_results.invalidate(*cached_keys)
@@ -1,6 +1,77 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class ServerConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'server'
+
+    def ready(self):
+        from server.accessibility.opener import pdf_opener
+        from server.accessibility.render_cache import rendered_images
+        from server.accessibility.result_cache import extraction_results
+        from server.accessibility.session import document_sessions
+        from server.accessibility.workers import default_memory_limit, extraction_workers
+        from server.executor import pdf_work
+        from server.ingest import ingest_queue
+        from server.responses import file_offload
+
+        options = getattr(settings, 'PDF_SESSION_CACHE', {})
+        document_sessions.configure(
+            max_entries=options.get('MAX_ENTRIES'),
+            max_bytes=options.get('MAX_BYTES'),
+        )
+
+        options = getattr(settings, 'RENDERED_IMAGE_CACHE', {})
+        rendered_images.configure(
+            location=options.get('LOCATION'),
+            max_bytes=options.get('MAX_BYTES'),
+        )
+
+        options = getattr(settings, 'EXTRACTION_RESULT_CACHE', {})
+        extraction_results.configure(
+            location=options.get('LOCATION'),
+            purge_interval=options.get('PURGE_INTERVAL_SECONDS'),
+        )
+
+        options = getattr(settings, 'PDF_WORK_POOL', {})
+        pdf_work.configure(
+            max_workers=options.get('MAX_WORKERS'),
+            max_queued=options.get('MAX_QUEUED'),
+        )
+
+        # Before the worker pool: workers copy the opener settings when they start.
+        options = getattr(settings, 'PDF_OPENER', {})
+        pdf_opener.configure(
+            access_mode=options.get('ACCESS_MODE'),
+            mmap_threshold=options.get('MMAP_THRESHOLD_BYTES'),
+            options=options.get('OPTIONS'),
+        )
+
+        options = getattr(settings, 'EXTRACTION_WORKERS', {})
+        processes = options.get('PROCESSES')
+        memory_limit = options.get('MEMORY_LIMIT_BYTES')
+        if memory_limit is None:
+            memory_limit = default_memory_limit(
+                extraction_workers.processes if processes is None else processes, options.get('WEB_PROCESSES', 1),
+            )
+        extraction_workers.configure(
+            processes=processes,
+            timeout=options.get('TIMEOUT'),
+            memory_limit=memory_limit,
+            max_jobs_per_worker=options.get('MAX_JOBS_PER_WORKER'),
+        )
+
+        options = getattr(settings, 'INGEST_QUEUE', {})
+        ingest_queue.configure(
+            location=options.get('LOCATION'),
+            workers=options.get('WORKERS'),
+            max_rendered_images=options.get('MAX_RENDERED_IMAGES'),
+        )
+
+        options = getattr(settings, 'FILE_OFFLOAD', {})
+        file_offload.configure(
+            header=options.get('HEADER'),
+            root=options.get('ROOT'),
+            prefix=options.get('PREFIX'),
+        )
@@ -0,0 +1,64 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class WorkPoolBusy(Exception):
+    pass
+
+
+class BlockingWorkPool:
+    # Threads rather than processes: the work runs against open pikepdf handles held by document sessions.
+    def __init__(self, max_workers=4, max_queued=32):
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self._executor = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def configure(self, max_workers=None, max_queued=None):
+        retired = None
+        with self._lock:
+            if max_workers is not None and max_workers != self.max_workers:
+                self.max_workers = max_workers
+                retired, self._executor = self._executor, None
+            if max_queued is not None:
+                self.max_queued = max_queued
+        if retired is not None:
+            retired.shutdown(wait=False)
+
+    async def run(self, func, *args, **kwargs):
+        with self._lock:
+            if self._in_flight >= self.max_workers + self.max_queued:
+                self.rejected += 1
+                raise WorkPoolBusy(f"{self._in_flight} PDF jobs already running or queued")
+            self._in_flight += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='pdf-work')
+            executor = self._executor
+
+        future = executor.submit(functools.partial(func, *args, **kwargs))
+        # Released when the job really finishes, not when a disconnected client stops awaiting it.
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'max_workers': self.max_workers,
+                'max_queued': self.max_queued,
+                'in_flight': self._in_flight,
+                'completed': self.completed,
+                'rejected': self.rejected,
+            }
+
+    def _release(self, future):
+        with self._lock:
+            self._in_flight -= 1
+            self.completed += 1
+
+
+pdf_work = BlockingWorkPool()
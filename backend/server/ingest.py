@@ -0,0 +1,316 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from server.accessibility.extractor import list_image_metadata
+from server.accessibility.images import ImageIndex
+from server.accessibility.journal import EditJournal
+from server.accessibility.result_cache import content_scope, extraction_results, make_cache_key
+from server.accessibility.session import document_sessions
+from server.accessibility.workers import (
+    WorkerJobError, WorkerPoolClosed, ingest_with_deadline, render_all_with_deadline, structure_with_deadline,
+)
+from server.sqlite import SQLiteDatabase
+
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class IngestError(Exception):
+    pass
+
+
+class StructureIndexCache:
+    """Structure indexes built by the worker pool, kept for the latest edit version of each content scope.
+
+    Scopes come from content_scope, so every upload of the same bytes shares the unedited index.
+    """
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, scope, edit_version):
+        with self._lock:
+            cached = self._indexes.get(scope)
+            if cached is None or cached[0] != edit_version:
+                return None
+            self._indexes.move_to_end(scope)
+            return cached[1]
+
+    def put(self, scope, edit_version, index):
+        with self._lock:
+            cached = self._indexes.get(scope)
+            if cached is not None and cached[0] > edit_version:
+                # A build that started before an edit finished after the rebuild that includes it.
+                return
+            self._indexes[scope] = (edit_version, index)
+            self._indexes.move_to_end(scope)
+            while len(self._indexes) > self.max_entries:
+                self._indexes.popitem(last=False)
+
+    def invalidate(self, scope):
+        with self._lock:
+            return self._indexes.pop(scope, None) is not None
+
+
+structure_indexes = StructureIndexCache()
+
+
+def metadata_json(result, image_count=None):
+    # DjangoJSONEncoder(default=str) matches the json.dumps(cls=DjangoJSONEncoder, default=str) the API always used.
+    extra = {'actual_image_count': image_count} if image_count is not None else None
+    return result.iter_json(DjangoJSONEncoder(default=str), extra)
+
+
+def _image_count(outcome):
+    return len(outcome.images) if outcome.images is not None else None
+
+
+def _store_image_list(outcome):
+    if outcome.images is not None:
+        extraction_results.put(
+            outcome.image_list_key, json.dumps({'images': outcome.images}), outcome.extraction.expires_at,
+        )
+
+
+def _store_structure_index(pdf_id, content_hash, outcome):
+    if outcome.structure_stats is not None:
+        structure_indexes.put(
+            content_scope(content_hash, outcome.edit_version, pdf_id), outcome.edit_version,
+            (outcome.extraction.structure, outcome.structure_stats),
+        )
+
+
+def store_ingest_result(pdf_id, content_hash, outcome):
+    """Cache what the pipeline produced, so later requests are answered without opening the document."""
+    result = outcome.extraction
+    if result.success:
+        extraction_results.put(result.cache_key, metadata_json(result, _image_count(outcome)), result.expires_at)
+        _store_image_list(outcome)
+        _store_structure_index(pdf_id, content_hash, outcome)
+
+
+def extract_metadata(pdf_id, pdf_path, filename, content_hash):
+    """Extract a document and return (result, chunks of its JSON); successful results are cached as they stream."""
+    outcome = ingest_with_deadline(pdf_path, filename, content_hash, pdf_id)
+    result = outcome.extraction
+    chunks = metadata_json(result, _image_count(outcome))
+    if result.success:
+        _store_image_list(outcome)
+        _store_structure_index(pdf_id, content_hash, outcome)
+        chunks = extraction_results.write_through(result.cache_key, chunks, result.expires_at)
+    return result, chunks
+
+
+def list_images(pdf_id, pdf_path):
+    session = document_sessions.get(pdf_id, pdf_path)
+    # Alt text is not part of the listing, so staged edits never make it stale.
+    return session.get_index(
+        'image_metadata',
+        lambda pdf: list_image_metadata(pdf_path, index=session.get_index('images', ImageIndex.build)),
+    )
+
+
+def structure_index(pdf_id, pdf_path, content_hash):
+    """The document's (table, stats); built under the worker pool's deadline and memory cap, then cached."""
+    edit_version = EditJournal(pdf_path).version
+    index = structure_indexes.get(content_scope(content_hash, edit_version, pdf_id), edit_version)
+    if index is None:
+        edit_version, table, stats = structure_with_deadline(pdf_path)
+        index = (table, stats)
+        structure_indexes.put(content_scope(content_hash, edit_version, pdf_id), edit_version, index)
+    return index
+
+
+def ingest_document(pdf_id, pdf_path, filename, report, content_hash=None, max_rendered_images=200):
+    content_hash = content_hash or pdf_id
+    report('extracting', 0.0)
+    if EditJournal(pdf_path).version == 0 and extraction_results.get(make_cache_key(content_hash)) is not None:
+        # The same bytes were ingested for an earlier upload. Its results are keyed on the content, and so are the
+        # images it rendered, so there is nothing left to do for this one.
+        return
+
+    # The upload only sniffed the file. One open in a worker validates, extracts and indexes its structure and
+    # images; a document that fails validation fails the job with the validation error, and the results of one
+    # that passes are cached for the views.
+    outcome = ingest_with_deadline(pdf_path, filename, content_hash, pdf_id)
+    if not outcome.extraction.success:
+        errors = outcome.extraction.errors
+        raise IngestError(errors[0] if errors else "Extraction failed")
+    store_ingest_result(pdf_id, content_hash, outcome)
+
+    report('rendering', 0.5)
+    try:
+        render_all_with_deadline(pdf_path, max_rendered_images)
+    except WorkerJobError as e:
+        # Whatever the batch rendered before it failed is already in the cache.
+        print(f"[ERROR] Prewarming images of {pdf_id} failed: {e}")
+
+
+class IngestQueue:
+    def __init__(self, location=None, workers=1, poll_interval=5, lease_seconds=600, max_attempts=3,
+                 max_rendered_images=200, runner=ingest_document):
+        self.location = location or '/tmp/a11ytagger/ingest.sqlite3'
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.max_rendered_images = max_rendered_images
+        self.runner = runner
+        self._db = None
+        self._threads = []
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+
+    def configure(self, location=None, workers=None, poll_interval=None, lease_seconds=None,
+                  max_attempts=None, max_rendered_images=None):
+        with self._lock:
+            if location is not None and location != self.location:
+                self.location = location
+                self._db = None
+            if workers is not None:
+                self.workers = workers
+            if poll_interval is not None:
+                self.poll_interval = poll_interval
+            if lease_seconds is not None:
+                self.lease_seconds = lease_seconds
+            if max_attempts is not None:
+                self.max_attempts = max_attempts
+            if max_rendered_images is not None:
+                self.max_rendered_images = max_rendered_images
+
+    def enqueue(self, pdf_id, path, filename, sha256=None):
+        now = time.time()
+        with self._database().transaction() as conn:
+            conn.execute(
+                "INSERT INTO ingest_jobs (pdf_id, path, filename, sha256, status, stage, progress, attempts, "
+                "created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, 0, 0, ?, ?)",
+                (pdf_id, path, filename, sha256, QUEUED, QUEUED, now, now),
+            )
+        self.start()
+        self._wakeup.set()
+        return self.status(pdf_id)
+
+    def status(self, pdf_id):
+        row = self._database().connection().execute(
+            "SELECT pdf_id, status, stage, progress, error, attempts, created_at, updated_at "
+            "FROM ingest_jobs WHERE pdf_id = ?",
+            (pdf_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        keys = ('pdf_id', 'status', 'stage', 'progress', 'error', 'attempts', 'created_at', 'updated_at')
+        return dict(zip(keys, row))
+
+    def delete(self, pdf_id):
+        with self._database().transaction() as conn:
+            conn.execute("DELETE FROM ingest_jobs WHERE pdf_id = ?", (pdf_id,))
+
+    def start(self):
+        with self._lock:
+            self._threads = [thread for thread in self._threads if thread.is_alive()]
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._work, name=f"ingest-{len(self._threads)}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def run_next(self):
+        job = self._claim()
+        if job is None:
+            return False
+
+        pdf_id, path, filename, sha256 = job
+
+        def report(stage, progress):
+            self._update(pdf_id, RUNNING, stage, progress)
+
+        try:
+            self.runner(
+                pdf_id, path, filename, report, content_hash=sha256, max_rendered_images=self.max_rendered_images,
+            )
+        except WorkerPoolClosed as e:
+            # The process is exiting, which says nothing about the document: the job goes back to the queue for the
+            # next process, and this worker stops draining.
+            print(f"[ERROR] Ingest of {pdf_id} interrupted by shutdown, requeued: {e}")
+            self._requeue(pdf_id)
+            return False
+        except Exception as e:
+            print(f"[ERROR] Ingest of {pdf_id} failed: {e}")
+            self._update(pdf_id, FAILED, FAILED, None, error=str(e))
+        else:
+            self._update(pdf_id, DONE, DONE, 1.0)
+        return True
+
+    def _work(self):
+        while True:
+            # Cleared before draining so an enqueue that lands mid-drain still wakes the next wait.
+            self._wakeup.clear()
+            try:
+                while self.run_next():
+                    pass
+            except Exception as e:
+                print(f"[ERROR] Ingest worker error: {e}")
+            # Polling also picks up jobs queued by other processes and jobs whose worker died mid-run.
+            self._wakeup.wait(self.poll_interval)
+
+    def _claim(self):
+        now = time.time()
+        with self._database().transaction() as conn:
+            conn.execute(
+                "UPDATE ingest_jobs SET status = ?, stage = ? WHERE status = ? AND updated_at < ?",
+                (QUEUED, QUEUED, RUNNING, now - self.lease_seconds),
+            )
+            conn.execute(
+                "UPDATE ingest_jobs SET status = ?, stage = ?, error = ? WHERE status = ? AND attempts >= ?",
+                (FAILED, FAILED, "Gave up after repeated attempts", QUEUED, self.max_attempts),
+            )
+            row = conn.execute(
+                "SELECT pdf_id, path, filename, sha256 FROM ingest_jobs WHERE status = ? ORDER BY created_at LIMIT 1",
+                (QUEUED,),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE ingest_jobs SET status = ?, stage = ?, attempts = attempts + 1, updated_at = ? WHERE pdf_id = ?",
+                (RUNNING, RUNNING, now, row[0]),
+            )
+        return row
+
+    def _requeue(self, pdf_id):
+        with self._database().transaction() as conn:
+            # The interrupted run does not count against max_attempts.
+            conn.execute(
+                "UPDATE ingest_jobs SET status = ?, stage = ?, progress = 0, attempts = MAX(attempts - 1, 0), "
+                "updated_at = ? WHERE pdf_id = ? AND status = ?",
+                (QUEUED, QUEUED, time.time(), pdf_id, RUNNING),
+            )
+
+    def _update(self, pdf_id, status, stage, progress, error=None):
+        with self._database().transaction() as conn:
+            conn.execute(
+                "UPDATE ingest_jobs SET status = ?, stage = ?, progress = COALESCE(?, progress), error = ?, "
+                "updated_at = ? WHERE pdf_id = ?",
+                (status, stage, progress, error, time.time(), pdf_id),
+            )
+
+    def _database(self):
+        with self._lock:
+            if self._db is None:
+                self._db = SQLiteDatabase(self.location, (
+                    "CREATE TABLE IF NOT EXISTS ingest_jobs ("
+                    "pdf_id TEXT PRIMARY KEY, path TEXT NOT NULL, filename TEXT NOT NULL, "
+                    "status TEXT NOT NULL, stage TEXT NOT NULL, progress REAL NOT NULL, error TEXT, "
+                    "attempts INTEGER NOT NULL, created_at REAL NOT NULL, updated_at REAL NOT NULL, sha256 TEXT)",
+                ), columns=[('ingest_jobs', 'sha256', 'TEXT')])
+            return self._db
+
+
+ingest_queue = IngestQueue()
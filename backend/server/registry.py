@@ -0,0 +1,140 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Optional
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from server.sqlite import SQLiteDatabase
+
+
+@dataclass
+class DocumentRecord:
+    pdf_id: str
+    path: str
+    filename: str
+    created_at: float
+    expires_at: float
+    # The upload's content hash, which cached results are keyed on; every upload of the same bytes has the same one.
+    sha256: Optional[str] = None
+
+    @property
+    def content_hash(self):
+        # Records stored before the hash was kept fall back to the document id, which nothing else shares.
+        return self.sha256 or self.pdf_id
+
+
+class BaseDocumentRegistry(ABC):
+    """Where each document id's working file lives; DOCUMENT_REGISTRY['BACKEND'] picks the implementation."""
+
+    def __init__(self, location=None, timeout=3600):
+        self.location = location
+        self.timeout = timeout
+
+    @abstractmethod
+    def get(self, pdf_id):
+        """The document's DocumentRecord, or None once it is unknown or expired."""
+
+    @abstractmethod
+    def set(self, pdf_id, path, filename, sha256=None):
+        """Store or replace the document's record and return it."""
+
+    @abstractmethod
+    def delete(self, pdf_id):
+        """Forget the document; deleting an unknown id is not an error."""
+
+
+class CacheDocumentRegistry(BaseDocumentRegistry):
+    # Only safe with a single worker process unless CACHES points at a shared backend.
+    def get(self, pdf_id):
+        from django.core.cache import cache
+
+        return cache.get(self._key(pdf_id))
+
+    def set(self, pdf_id, path, filename, sha256=None):
+        from django.core.cache import cache
+
+        now = time.time()
+        record = DocumentRecord(pdf_id, path, filename, now, now + self.timeout, sha256)
+        cache.set(self._key(pdf_id), record, timeout=self.timeout)
+        return record
+
+    def delete(self, pdf_id):
+        from django.core.cache import cache
+
+        cache.delete(self._key(pdf_id))
+
+    def _key(self, pdf_id):
+        return f"pdf_document_{pdf_id}"
+
+
+class SQLiteDocumentRegistry(BaseDocumentRegistry):
+    def __init__(self, location=None, timeout=3600):
+        super().__init__(location or '/tmp/a11ytagger/documents.sqlite3', timeout)
+        self._db = SQLiteDatabase(self.location, (
+            "CREATE TABLE IF NOT EXISTS documents ("
+            "pdf_id TEXT PRIMARY KEY, path TEXT NOT NULL, filename TEXT NOT NULL, "
+            "created_at REAL NOT NULL, expires_at REAL NOT NULL, sha256 TEXT)",
+        ), columns=[('documents', 'sha256', 'TEXT')])
+
+    def get(self, pdf_id):
+        now = time.time()
+        # A plain read takes no write lock; only the occasional expiry refresh below does.
+        row = self._db.connection().execute(
+            "SELECT pdf_id, path, filename, created_at, expires_at, sha256 FROM documents "
+            "WHERE pdf_id = ? AND expires_at > ?",
+            (pdf_id, now),
+        ).fetchone()
+        if row is None:
+            return None
+        record = DocumentRecord(*row)
+        if record.expires_at < now + self.timeout / 2:
+            # Sliding expiry, refreshed at most once per half timeout.
+            with self._db.transaction() as conn:
+                conn.execute(
+                    "UPDATE documents SET expires_at = ? WHERE pdf_id = ? AND expires_at > ?",
+                    (now + self.timeout, pdf_id, now),
+                )
+            record.expires_at = now + self.timeout
+        return record
+
+    def set(self, pdf_id, path, filename, sha256=None):
+        now = time.time()
+        with self._db.transaction() as conn:
+            conn.execute("DELETE FROM documents WHERE expires_at <= ?", (now,))
+            conn.execute(
+                "INSERT INTO documents (pdf_id, path, filename, created_at, expires_at, sha256) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(pdf_id) DO UPDATE SET path = excluded.path, filename = excluded.filename, "
+                "expires_at = excluded.expires_at, sha256 = excluded.sha256",
+                (pdf_id, path, filename, now, now + self.timeout, sha256),
+            )
+            row = conn.execute(
+                "SELECT pdf_id, path, filename, created_at, expires_at, sha256 FROM documents WHERE pdf_id = ?",
+                (pdf_id,),
+            ).fetchone()
+        return DocumentRecord(*row)
+
+    def delete(self, pdf_id):
+        with self._db.transaction() as conn:
+            conn.execute("DELETE FROM documents WHERE pdf_id = ?", (pdf_id,))
+
+    def purge_expired(self):
+        with self._db.transaction() as conn:
+            return conn.execute("DELETE FROM documents WHERE expires_at <= ?", (time.time(),)).rowcount
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_document_registry():
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            options = getattr(settings, 'DOCUMENT_REGISTRY', {})
+            backend = import_string(options.get('BACKEND', 'server.registry.SQLiteDocumentRegistry'))
+            _registry = backend(location=options.get('LOCATION'), timeout=options.get('TIMEOUT', 3600))
+        return _registry
@@ -0,0 +1,201 @@
+import asyncio
+import os
+
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+
+
+class AsyncFileResponse(StreamingHttpResponse):
+    # FileResponse iterates synchronously, which Django's ASGI handler can only serve by buffering the whole file.
+    block_size = 64 * 1024
+
+    def __init__(self, path, content_type, filename=None, as_attachment=False, offset=0, length=None, **kwargs):
+        # An already open file may be passed instead of a path, so headers can be derived from the same inode.
+        self.file = open(path, 'rb') if isinstance(path, (str, os.PathLike)) else path
+        super().__init__(self._chunks(), content_type=content_type, **kwargs)
+        self._resource_closers.append(self.file.close)
+        if length is None:
+            length = os.fstat(self.file.fileno()).st_size - offset
+        if offset:
+            self.file.seek(offset)
+        self.remaining = length
+        self['Content-Length'] = str(length)
+        if filename:
+            self['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+
+    async def _chunks(self):
+        while self.remaining > 0:
+            chunk = await asyncio.to_thread(self.file.read, min(self.block_size, self.remaining))
+            if not chunk:
+                break
+            self.remaining -= len(chunk)
+            yield chunk
+
+
+class FileOffload:
+    """Lets a fronting web server send file bodies itself (sendfile) via X-Accel-Redirect or X-Sendfile.
+
+    ASGI has no zero-copy path through Django, so this is the only way to avoid copying bytes through Python.
+    Disabled unless a header is configured; only files under root are offloaded.
+    """
+
+    def __init__(self, header=None, root=None, prefix=None):
+        self.header = header
+        self.root = root
+        self.prefix = prefix
+
+    def configure(self, header=None, root=None, prefix=None):
+        if header is not None:
+            self.header = header
+        if root is not None:
+            self.root = root
+        if prefix is not None:
+            self.prefix = prefix
+
+    def location(self, path):
+        if not self.header or not self.root:
+            return None
+        root = os.path.realpath(self.root)
+        path = os.path.realpath(path)
+        if os.path.commonpath([root, path]) != root:
+            return None
+        # X-Accel-Redirect wants an internal URI under a prefix; X-Sendfile wants the file system path.
+        if self.prefix:
+            return self.prefix.rstrip('/') + '/' + os.path.relpath(path, root)
+        return path
+
+
+file_offload = FileOffload()
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header, size):
+    """(offset, length) of a single 'bytes=' range, or None when the whole file should be sent instead.
+
+    Multiple ranges and malformed headers are answered with the full file, which RFC 9110 allows.
+    """
+    unit, _, spec = header.partition('=')
+    if unit.strip().lower() != 'bytes' or ',' in spec:
+        return None
+    first, dash, last = spec.strip().partition('-')
+    if not dash or not (first or last) or not (first.isdigit() or not first) or not (last.isdigit() or not last):
+        return None
+
+    if not first:
+        if int(last) == 0:
+            raise RangeNotSatisfiable()
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if last and int(last) < start:
+            return None
+    if start >= size:
+        raise RangeNotSatisfiable()
+    return start, end - start + 1
+
+
+def ranged_file_response(request, path, content_type, etag=None, last_modified=None, filename=None,
+                         as_attachment=False, version=None):
+    """Serve a file with ETag/Last-Modified validation and single-range (206) support.
+
+    Both validators default to ones derived from the file's size and mtime, with `version` (e.g. the
+    document's edit version) mixed into the ETag. When file_offload is configured, the body and any range
+    are left to the fronting web server.
+    """
+    file = open(path, 'rb')
+    try:
+        stat = os.fstat(file.fileno())
+        size = stat.st_size
+        if etag is None:
+            tag = f"{size:x}-{stat.st_mtime_ns:x}"
+            etag = quote_etag(tag if version is None else f"e{version}-{tag}")
+        if last_modified is None:
+            last_modified = int(stat.st_mtime)
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is not None:
+            file.close()
+            response['ETag'] = etag
+            response['Accept-Ranges'] = 'bytes'
+            return response
+
+        offload_location = file_offload.location(path)
+        if offload_location is not None:
+            file.close()
+            response = HttpResponse(content_type=content_type)
+            response[file_offload.header] = offload_location
+            if filename:
+                response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+            return response
+
+        byte_range = None
+        range_header = request.headers.get('Range')
+        if range_header and _if_range_matches(request.headers.get('If-Range'), etag, last_modified):
+            try:
+                byte_range = parse_range(range_header, size)
+            except RangeNotSatisfiable:
+                file.close()
+                response = HttpResponse(status=416)
+                response['Content-Range'] = f"bytes */{size}"
+                response['Accept-Ranges'] = 'bytes'
+                return response
+
+        if byte_range is None:
+            response = AsyncFileResponse(file, content_type, filename=filename, as_attachment=as_attachment)
+        else:
+            offset, length = byte_range
+            response = AsyncFileResponse(file, content_type, filename=filename, as_attachment=as_attachment,
+                                         offset=offset, length=length, status=206)
+            response['Content-Range'] = f"bytes {offset}-{offset + length - 1}/{size}"
+    except BaseException:
+        file.close()
+        raise
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def _if_range_matches(if_range, etag, last_modified):
+    # A stale If-Range means the client's partial copy is of an older file, so it gets the whole new one.
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+class AsyncIteratorResponse(StreamingHttpResponse):
+    # Like AsyncFileResponse, but for a synchronous iterator of text, drained in a thread a block at a time.
+    block_size = 64 * 1024
+
+    def __init__(self, iterator, **kwargs):
+        self.iterator = iter(iterator)
+        super().__init__(self._chunks(), **kwargs)
+        if hasattr(self.iterator, 'close'):
+            self._resource_closers.append(self.iterator.close)
+
+    def _next_block(self):
+        parts = []
+        size = 0
+        for part in self.iterator:
+            parts.append(part)
+            size += len(part)
+            if size >= self.block_size:
+                break
+        return ''.join(parts)
+
+    async def _chunks(self):
+        while True:
+            block = await asyncio.to_thread(self._next_block)
+            if not block:
+                break
+            yield block
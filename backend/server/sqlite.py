@@ -0,0 +1,55 @@
+import os
+import sqlite3
+import threading
+
+
+class SQLiteDatabase:
+    def __init__(self, location, schema, columns=()):
+        self.location = location
+        self.schema = schema
+        # (table, column, definition) added to tables created before the column existed.
+        self.columns = columns
+        self._local = threading.local()
+        self._schema_ready = False
+
+    def transaction(self):
+        return _ImmediateTransaction(self.connection())
+
+    def connection(self):
+        # sqlite3 connections must not cross threads or forked workers.
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        directory = os.path.dirname(self.location)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Default rollback journal rather than WAL: WAL needs shared memory, which network volumes shared by pods lack.
+        conn = sqlite3.connect(self.location, timeout=30, isolation_level=None)
+        if not self._schema_ready:
+            for statement in self.schema:
+                conn.execute(statement)
+            for table, column, definition in self.columns:
+                if column not in {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}:
+                    try:
+                        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+                    except sqlite3.OperationalError:
+                        # Another process added it first.
+                        pass
+            self._schema_ready = True
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+
+class _ImmediateTransaction:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
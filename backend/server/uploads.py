@@ -0,0 +1,311 @@
+import hashlib
+import json
+import os
+import secrets
+import shutil
+import tempfile
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+
+
+PDF_FIELD_NAME = 'pdf_file'
+PDF_MAGIC = b'%PDF-'
+# The PDF header may be preceded by junk, but must start within the first 1024 bytes.
+PDF_HEADER_WINDOW = 1024
+# Room for the multipart boundaries and part headers around the file itself.
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class UploadError(Exception):
+    pass
+
+
+@dataclass
+class SavedUpload:
+    pdf_id: str
+    path: str
+    sha256: str
+    size_bytes: int
+    existing: bool
+
+
+def new_document_id():
+    return secrets.token_hex(16)
+
+
+def blob_path_for(directory, sha256):
+    return os.path.join(directory, f"{sha256}.pdf")
+
+
+def document_path_for(directory, sha256, pdf_id):
+    # The content hash stays in the name so releasing a document can find the blob it was copied from.
+    return os.path.join(directory, f"{sha256}.{pdf_id}.pdf")
+
+
+class UploadDigest:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def update(self, chunk):
+        if self.size == 0 and PDF_MAGIC not in chunk[:PDF_HEADER_WINDOW]:
+            raise UploadError("Uploaded file is not a PDF")
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise UploadError(_limit_message(self.max_bytes))
+        self.sha256.update(chunk)
+
+    def hexdigest(self):
+        return self.sha256.hexdigest()
+
+
+def _limit_message(max_bytes):
+    return f"File exceeds the {max_bytes // 1024 // 1024}MB upload limit"
+
+
+def _upload_dir():
+    directory = getattr(settings, 'PDF_UPLOAD_DIR', tempfile.gettempdir())
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+def _max_upload_bytes():
+    return getattr(settings, 'PDF_UPLOAD_MAX_BYTES', 100 * 1024 * 1024)
+
+
+class StoredPDFUpload(UploadedFile):
+    def __init__(self, path, name, content_type, size, charset, sha256, content_type_extra=None):
+        super().__init__(open(path, 'rb'), name, content_type, size, charset, content_type_extra)
+        self.path = path
+        self.sha256 = sha256
+        self.moved = False
+
+    def temporary_file_path(self):
+        return self.path
+
+    def close(self):
+        try:
+            self.file.close()
+        finally:
+            # Uploads the view never claimed are staged files nobody else will delete.
+            if not self.moved and os.path.exists(self.path):
+                os.remove(self.path)
+
+
+class StreamingPDFUploadHandler(FileUploadHandler):
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.active = False
+        self.error = None
+        self.staged_path = None
+        self.staged_file = None
+        self.digest = None
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        self.active = field_name == PDF_FIELD_NAME
+        if not self.active:
+            return
+
+        fd, self.staged_path = tempfile.mkstemp(dir=_upload_dir(), prefix='.upload-', suffix='.pdf')
+        self.staged_file = os.fdopen(fd, 'wb')
+        self.digest = UploadDigest(_max_upload_bytes())
+
+    def receive_data_chunk(self, raw_data, start):
+        if not self.active:
+            return raw_data
+
+        try:
+            self.digest.update(raw_data)
+        except UploadError as e:
+            self.error = str(e)
+            self._discard()
+            raise StopUpload(connection_reset=False)
+
+        self.staged_file.write(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        if not self.active:
+            return None
+
+        self.active = False
+        self.staged_file.close()
+        if file_size == 0:
+            self.error = "Uploaded file is empty"
+            self._discard()
+            return None
+
+        return StoredPDFUpload(
+            self.staged_path,
+            self.file_name,
+            self.content_type,
+            file_size,
+            self.charset,
+            self.digest.hexdigest(),
+            self.content_type_extra,
+        )
+
+    def upload_interrupted(self):
+        if self.active:
+            self._discard()
+
+    def _discard(self):
+        self.active = False
+        if self.staged_file is not None:
+            self.staged_file.close()
+        if self.staged_path and os.path.exists(self.staged_path):
+            os.remove(self.staged_path)
+
+
+def get_upload_error(request):
+    for handler in request.upload_handlers:
+        if isinstance(handler, StreamingPDFUploadHandler) and handler.error:
+            return handler.error
+    return None
+
+
+class RequestBodyLimit:
+    """ASGI wrapper that refuses request bodies larger than an upload may be, before Django reads them.
+
+    Django's ASGI handler spools the whole body before any upload handler runs, so StreamingPDFUploadHandler
+    only sees an oversized upload once it has been received. Here a declared Content-Length over the limit is
+    answered with a 413 without reading the body, and a chunked body is cut off as soon as it passes the limit.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        max_bytes = _max_upload_bytes()
+        limit = max_bytes + MULTIPART_OVERHEAD
+        headers = dict(scope.get('headers') or ())
+        try:
+            declared = int(headers.get(b'content-length', b''))
+        except ValueError:
+            declared = None
+        if declared is not None and declared > limit:
+            return await self._reject(send, max_bytes)
+
+        received = 0
+        exceeded = False
+        started = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+            if exceeded:
+                return {'type': 'http.disconnect'}
+            message = await receive()
+            if message['type'] == 'http.request':
+                received += len(message.get('body', b''))
+                if received > limit:
+                    # Django treats a disconnect while reading the body as an aborted request and stops there.
+                    exceeded = True
+                    return {'type': 'http.disconnect'}
+            return message
+
+        async def tracked_send(message):
+            nonlocal started
+            if message['type'] == 'http.response.start':
+                started = True
+            await send(message)
+
+        await self.app(scope, limited_receive, tracked_send)
+        if exceeded and not started:
+            await self._reject(send, max_bytes)
+
+    @staticmethod
+    async def _reject(send, max_bytes):
+        body = json.dumps({"error": _limit_message(max_bytes)}).encode()
+        await send({
+            'type': 'http.response.start',
+            'status': 413,
+            'headers': [
+                (b'content-type', b'application/json'),
+                (b'content-length', str(len(body)).encode()),
+                (b'connection', b'close'),
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': body})
+
+
+def _link_or_copy(source, destination):
+    try:
+        os.link(source, destination)
+    except FileNotFoundError:
+        raise
+    except OSError:
+        # Filesystems without hard links get a real copy.
+        shutil.copyfile(source, destination)
+
+
+def _claim_blob(staged_path, directory, sha256):
+    """Give a new upload its own working copy of the stored bytes, storing them first if they are new.
+
+    The content-addressed blob is never written to. Working copies start as hard links to it, and every write
+    to a document replaces its file (see _save_over), so an edit detaches that document's copy and leaves the
+    blob and every other upload of the same bytes alone.
+    """
+    pdf_id = new_document_id()
+    blob = blob_path_for(directory, sha256)
+    destination = document_path_for(directory, sha256, pdf_id)
+    existing = True
+    try:
+        _link_or_copy(blob, destination)
+    except FileNotFoundError:
+        # New bytes, or the last document sharing the blob was released in the meantime.
+        existing = False
+        os.chmod(staged_path, 0o444)
+        os.replace(staged_path, blob)
+        _link_or_copy(blob, destination)
+    if os.path.exists(staged_path):
+        os.remove(staged_path)
+    return pdf_id, destination, existing
+
+
+def release_document(path):
+    """Delete a document's working copy, and the blob it came from once no other document shares it."""
+    name = os.path.basename(path)
+    blob = os.path.join(os.path.dirname(path), f"{name.split('.', 1)[0]}.pdf")
+    if os.path.exists(path):
+        os.remove(path)
+    try:
+        if blob != path and os.stat(blob).st_nlink == 1:
+            os.remove(blob)
+    except FileNotFoundError:
+        pass
+
+
+def save_upload(uploaded_file, directory):
+    os.makedirs(directory, exist_ok=True)
+    if isinstance(uploaded_file, StoredPDFUpload):
+        uploaded_file.file.close()
+        pdf_id, path, existing = _claim_blob(uploaded_file.path, directory, uploaded_file.sha256)
+        uploaded_file.path = path
+        uploaded_file.moved = True
+        return SavedUpload(pdf_id, path, uploaded_file.sha256, uploaded_file.size, existing)
+
+    # Uploads parsed by Django's default handlers are still streamed chunk by chunk.
+    digest = UploadDigest(_max_upload_bytes())
+    fd, staged_path = tempfile.mkstemp(dir=directory, prefix='.upload-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in uploaded_file.chunks():
+                digest.update(chunk)
+                f.write(chunk)
+        if digest.size == 0:
+            raise UploadError("Uploaded file is empty")
+        pdf_id, path, existing = _claim_blob(staged_path, directory, digest.hexdigest())
+    except Exception:
+        if os.path.exists(staged_path):
+            os.remove(staged_path)
+        raise
+
+    return SavedUpload(pdf_id, path, digest.hexdigest(), digest.size, existing)
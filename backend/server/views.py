@@ -1,10 +1,12 @@
-import base64
 import os
+from django.conf import settings
 from django.shortcuts import render, redirect
 from django.views import View
-from django.core.cache import cache
 
-from server.accessibility.validators import validate_pdf_file
+from server.accessibility.validators import new_validation_result, sniff_pdf
+from server.ingest import ingest_queue
+from server.registry import get_document_registry
+from server.uploads import UploadError, get_upload_error, release_document, save_upload
 
 
 def hello_world(request):
@@ -17,43 +19,45 @@ class PDFUploadView(View):
 
     def post(self, request):
         pdf_file = request.FILES.get("pdf_file")
+        upload_error = get_upload_error(request)
+        if upload_error:
+            return render(request, "server/upload.html", {"error": upload_error})
         if not pdf_file:
             return render(request, "server/upload.html", {"error": "No file uploaded"})
 
-        pdf_data = pdf_file.read()
-        pdf_id = base64.urlsafe_b64encode(pdf_file.name.encode()).decode()[:16]
+        try:
+            saved = save_upload(pdf_file, settings.PDF_UPLOAD_DIR)
+        except UploadError as e:
+            return render(request, "server/upload.html", {"error": str(e)})
 
-        temp_path = f"/tmp/{pdf_file.name}_{pdf_id}"
-        with open(temp_path, "wb") as f:
-            f.write(pdf_data)
-        
-        cache.set(f"pdf_temp_path_{pdf_id}", temp_path, timeout=3600)
+        pdf_id = saved.pdf_id
+        temp_path = saved.path
+        registry = get_document_registry()
+        registry.set(pdf_id, temp_path, pdf_file.name, saved.sha256)
 
-        validation = validate_pdf_file(temp_path)
+        # Opening the file is left to the queued ingest job, which runs in a worker process.
+        validation = sniff_pdf(temp_path, new_validation_result(temp_path))
         if not validation.can_proceed:
-            os.remove(temp_path)
+            release_document(temp_path)
+            registry.delete(pdf_id)
             return render(request, "server/upload.html", {
                 "error": validation.errors[0] if validation.errors else "Invalid PDF",
                 "warnings": validation.warnings
             })
 
+        ingest_queue.enqueue(pdf_id, temp_path, pdf_file.name, saved.sha256)
         return redirect("pdf_viewer", pdf_id=pdf_id)
 
 
 class PDFViewerView(View):
     def get(self, request, pdf_id):
-        temp_path = cache.get(f"pdf_temp_path_{pdf_id}")
+        document = get_document_registry().get(pdf_id)
+        temp_path = document.path if document else None
         if not temp_path or not os.path.exists(temp_path):
             return redirect("pdf_upload")
 
-        with open(temp_path, "rb") as f:
-            pdf_data = f.read()
-        
-        pdf_base64 = base64.b64encode(pdf_data).decode()
-        pdf_data_url = f"data:application/pdf;base64,{pdf_base64}"
-
         return render(request, "server/viewer.html", {
-            "pdf_data_url": pdf_data_url,
+            "pdf_url": f"/api/{pdf_id}/file/",
             "pdf_id": pdf_id
         })
 
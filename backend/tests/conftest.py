@@ -0,0 +1,52 @@
+import os
+
+import django
+import pikepdf
+import pytest
+
+# The API views read the project's settings; the plain unit tests do not mind them being loaded.
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "a11ytagger.settings")
+django.setup()
+
+from server.registry import SQLiteDocumentRegistry  # noqa: E402
+
+
+@pytest.fixture
+def document_registry(tmp_path, monkeypatch):
+    registry = SQLiteDocumentRegistry(location=str(tmp_path / "documents.sqlite3"))
+    monkeypatch.setattr("server.api.views.get_document_registry", lambda: registry)
+    return registry
+
+
+def _gray_image(pdf, data=b"\x00", width=1):
+    image = pikepdf.Stream(pdf, data)
+    image.Subtype = pikepdf.Name.Image
+    image.Width = width
+    image.Height = 1
+    image.BitsPerComponent = 8
+    image.ColorSpace = pikepdf.Name.DeviceGray
+    return pdf.make_indirect(image)
+
+
+@pytest.fixture
+def gray_image():
+    """gray_image(pdf, data=b"\\x00", width=1): a one-row DeviceGray image XObject holding `data` as its pixels."""
+    return _gray_image
+
+
+@pytest.fixture
+def write_image_pdf():
+    """write_image_pdf(path, pages=((b"\\x00",),)): saves a PDF with one page per entry and returns its size.
+
+    Each entry lists the pixels of that page's images, named /Im0, /Im1, ... in its resources; an empty entry is a blank page.
+    """
+    def write(path, pages=((b"\x00",),)):
+        pdf = pikepdf.Pdf.new()
+        for images in pages:
+            page = pdf.add_blank_page()
+            if images:
+                xobjects = pikepdf.Dictionary({f"/Im{i}": _gray_image(pdf, data) for i, data in enumerate(images)})
+                page.Resources = pikepdf.Dictionary(XObject=xobjects)
+        pdf.save(path)
+        return os.path.getsize(path)
+    return write
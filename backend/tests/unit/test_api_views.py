@@ -0,0 +1,280 @@
+import asyncio
+import json
+
+import pikepdf
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import AsyncRequestFactory, override_settings
+
+import server.api.views as views_mod
+import server.ingest as ingest_mod
+from server.accessibility.journal import EditJournal
+from server.accessibility.session import DocumentSessionCache
+from server.accessibility.workers import extraction_workers
+from server.api.views import (
+    DownloadView, ImageBatchTagView, ImageListView, IngestStatusView, PDFFileView, PDFUploadView,
+    StructureSummaryView, StructureView,
+)
+from server.ingest import IngestQueue, StructureIndexCache
+from server.responses import file_offload
+
+
+def _get(view, path, headers=None, **kwargs):
+    request = AsyncRequestFactory().get(path, headers=headers)
+    return asyncio.run(view.as_view()(request, **kwargs))
+
+
+def _post(view, path, data, **kwargs):
+    request = AsyncRequestFactory().post(path, data=json.dumps(data), content_type="application/json")
+    return asyncio.run(view.as_view()(request, **kwargs))
+
+
+def _body(response):
+    if not response.streaming:
+        return response.content
+
+    async def read():
+        return b"".join([chunk async for chunk in response.streaming_content])
+
+    return asyncio.run(read())
+
+
+@pytest.fixture
+def stored_pdf(document_registry, tmp_path):
+    path = tmp_path / "doc.pdf"
+    path.write_bytes(b"%PDF-1.4\n" + bytes(range(256)) * 4)
+    document_registry.set("abc", str(path), "report")
+    return path
+
+
+def test_image_list_is_404_once_the_file_is_gone(document_registry, tmp_path):
+    document_registry.set("abc", str(tmp_path / "gone.pdf"), "gone.pdf")
+
+    response = _get(ImageListView, "/api/abc/images/", pdf_id="abc")
+
+    assert response.status_code == 404
+
+
+@pytest.mark.parametrize("view, path", [(PDFFileView, "/api/abc/file/"), (DownloadView, "/api/abc/download/")])
+def test_pdf_endpoints_revalidate_and_serve_ranges(stored_pdf, view, path):
+    raw = stored_pdf.read_bytes()
+
+    full = _get(view, path, pdf_id="abc")
+    assert full.status_code == 200 and _body(full) == raw
+    etag = full["ETag"]
+    assert full["Accept-Ranges"] == "bytes" and "no-cache" in full["Cache-Control"]
+
+    assert _get(view, path, headers={"If-None-Match": etag}, pdf_id="abc").status_code == 304
+
+    partial = _get(view, path, headers={"Range": "bytes=10-19"}, pdf_id="abc")
+    assert partial.status_code == 206 and partial["Content-Range"] == f"bytes 10-19/{len(raw)}"
+    assert _body(partial) == raw[10:20]
+
+    unsatisfiable = _get(view, path, headers={"Range": f"bytes={len(raw)}-"}, pdf_id="abc")
+    assert unsatisfiable.status_code == 416 and unsatisfiable["Content-Range"] == f"bytes */{len(raw)}"
+
+    # A range conditioned on a representation the client no longer has gets the whole, current file.
+    stale = _get(view, path, headers={"Range": "bytes=0-3", "If-Range": '"stale"'}, pdf_id="abc")
+    assert stale.status_code == 200 and _body(stale) == raw
+
+
+@pytest.mark.parametrize("header, prefix, expected", [
+    ("X-Accel-Redirect", "/protected/", "/protected/doc.pdf"),
+    ("X-Sendfile", None, None),
+])
+def test_pdf_endpoints_hand_the_body_to_the_web_server(stored_pdf, monkeypatch, header, prefix, expected):
+    monkeypatch.setattr(file_offload, "header", header)
+    monkeypatch.setattr(file_offload, "root", str(stored_pdf.parent))
+    monkeypatch.setattr(file_offload, "prefix", prefix)
+
+    for view, path in ((PDFFileView, "/api/abc/file/"), (DownloadView, "/api/abc/download/")):
+        response = _get(view, path, pdf_id="abc")
+        assert response.status_code == 200 and response.content == b""
+        assert response[header] == (expected or str(stored_pdf))
+        assert response["ETag"]
+    assert response["Content-Disposition"] == 'attachment; filename="report.pdf"'
+
+
+def test_download_refuses_to_serve_a_file_missing_staged_edits(stored_pdf, monkeypatch):
+    EditJournal(str(stored_pdf)).record([{"image_id": 0, "image_key": "p1-5-0", "alt_text": "Chart"}])
+    monkeypatch.setattr(
+        views_mod.document_sessions, "flush",
+        lambda pdf_id, path: [{"image_id": 0, "success": False, "error": "PdfError: unable to find trailer"}],
+    )
+
+    response = _get(DownloadView, "/api/abc/download/", pdf_id="abc")
+
+    assert response.status_code == 500
+    assert "could not be written" in json.loads(response.content)["error"]
+
+
+def test_download_drops_staged_edits_for_images_that_are_gone(document_registry, tmp_path, monkeypatch,
+                                                              write_image_pdf):
+    path = str(tmp_path / "doc.pdf")
+    write_image_pdf(path)
+    document_registry.set("abc", path, "doc.pdf")
+    monkeypatch.setattr(views_mod, "document_sessions", DocumentSessionCache())
+    EditJournal(path).record([
+        {"image_id": 0, "page_number": 1, "image_name": "/Im0", "alt_text": "Chart"},
+        {"image_id": 1, "page_number": 1, "image_name": "/Im1", "alt_text": "Removed"},
+    ])
+
+    response = _get(DownloadView, "/api/abc/download/", pdf_id="abc")
+
+    assert response.status_code == 200
+    assert EditJournal(path).entries() == []
+    with pikepdf.Pdf.open(path) as pdf:
+        assert [str(figure.Alt) for figure in pdf.Root.StructTreeRoot.K] == ["Chart"]
+
+
+def test_batch_tagging_reports_each_item_on_its_own(document_registry, tmp_path, monkeypatch, write_image_pdf):
+    path = str(tmp_path / "doc.pdf")
+    write_image_pdf(path, [[b"\x00", b"\xff"]])
+    document_registry.set("abc", path, "doc.pdf")
+    monkeypatch.setattr(views_mod, "document_sessions", DocumentSessionCache())
+
+    response = _post(ImageBatchTagView, "/api/abc/images/tag/", {"items": [
+        {"image_id": 0, "alt_text": "Chart"},
+        {"image_id": "1", "alt_text": "Logo"},
+        {"image_id": 1},
+        {"image_id": 9, "alt_text": "Missing"},
+        "not an item",
+    ]}, pdf_id="abc")
+
+    body = json.loads(response.content)
+    assert response.status_code == 200
+    assert (body["success"], body["tagged"], body["failed"]) == (False, 1, 4)
+    assert body["results"][0]["success"] is True
+    assert [result.get("error") for result in body["results"][1:]] == [
+        "image_id must be an integer", "alt_text is required", "Image not found", "image_id must be an integer",
+    ]
+    # Only the valid item is staged.
+    assert [entry["alt_text"] for entry in EditJournal(path).entries()] == ["Chart"]
+
+    assert _post(ImageBatchTagView, "/api/abc/images/tag/", {"items": []}, pdf_id="abc").status_code == 400
+
+
+def test_ingest_status_follows_the_queued_job(document_registry, tmp_path, monkeypatch):
+    assert _get(IngestStatusView, "/api/abc/status/", pdf_id="abc").status_code == 404
+
+    mid_run = []
+
+    def runner(pdf_id, path, filename, report, content_hash, max_rendered_images):
+        report("rendering", 0.5)
+        mid_run.append(json.loads(_get(IngestStatusView, "/api/abc/status/", pdf_id="abc").content))
+
+    queue = IngestQueue(location=str(tmp_path / "ingest.sqlite3"), runner=runner)
+    queue.start = lambda: None
+    monkeypatch.setattr(views_mod, "ingest_queue", queue)
+    document_registry.set("abc", str(tmp_path / "doc.pdf"), "doc.pdf")
+
+    status = json.loads(_get(IngestStatusView, "/api/abc/status/", pdf_id="abc").content)
+    assert status == {"pdf_id": "abc", "status": "not_queued", "ready": False}
+
+    queue.enqueue("abc", str(tmp_path / "doc.pdf"), "doc.pdf")
+    queue.run_next()
+    assert [(s["status"], s["stage"], s["progress"], s["ready"]) for s in mid_run] == [("running", "rendering", 0.5, False)]
+
+    status = json.loads(_get(IngestStatusView, "/api/abc/status/", pdf_id="abc").content)
+    assert (status["status"], status["progress"], status["ready"]) == ("done", 1.0, True)
+
+
+@pytest.fixture
+def tagged_document(document_registry, tmp_path, monkeypatch):
+    """A Document element holding H1, P, Figure (with alt text), Figure and P, registered as "abc"."""
+    pdf = pikepdf.new()
+    page = pdf.add_blank_page().obj
+    root = pdf.make_indirect(pikepdf.Dictionary(Type=pikepdf.Name.StructTreeRoot))
+    doc = pdf.make_indirect(pikepdf.Dictionary(Type=pikepdf.Name.StructElem, S=pikepdf.Name.Document, P=root))
+    doc.K = pikepdf.Array([
+        pdf.make_indirect(pikepdf.Dictionary(Type=pikepdf.Name.StructElem, S=pikepdf.Name(name), P=doc, Pg=page, **extra))
+        for name, extra in [
+            ("/H1", {}), ("/P", {}), ("/Figure", {"Alt": pikepdf.String("Chart")}), ("/Figure", {}), ("/P", {}),
+        ]
+    ])
+    root.K = pikepdf.Array([doc])
+    pdf.Root.StructTreeRoot = root
+    path = str(tmp_path / "tagged.pdf")
+    pdf.save(path)
+
+    document_registry.set("abc", path, "tagged.pdf")
+    monkeypatch.setattr(extraction_workers, "processes", 0)
+    monkeypatch.setattr(ingest_mod, "structure_indexes", StructureIndexCache())
+    return path
+
+
+def _structure(query=""):
+    return _get(StructureView, f"/api/abc/structure/{query}", pdf_id="abc")
+
+
+def test_structure_is_served_a_page_of_children_at_a_time(tagged_document):
+    body = json.loads(_structure().content)
+    assert body["element_count"] == 6
+    top = body["node"]
+    assert (top["id"], top["element_type"], top["child_count"], top["next_cursor"]) == (0, "/Document", 5, None)
+    assert [child["id"] for child in top["children"]] == [1, 2, 3, 4, 5]
+
+    page = json.loads(_structure("?limit=2&cursor=1").content)["node"]
+    assert [child["id"] for child in page["children"]] == [2, 3] and page["next_cursor"] == 3
+    assert "children" not in json.loads(_structure("?depth=0").content)["node"]
+
+    figure = json.loads(_structure("?node=3").content)["node"]
+    assert (figure["element_type"], figure["alt_text"], figure["parent_id"]) == ("/Figure", "Chart", 0)
+    assert json.loads(_structure("?reading_order=4").content)["node"]["id"] == 3
+
+
+@pytest.mark.parametrize("query, status", [
+    ("?limit=0", 400), ("?depth=deep", 400), ("?cursor=-1", 400),
+    ("?node=99", 404), ("?node=-1", 404), ("?reading_order=99", 404),
+])
+def test_structure_rejects_bad_parameters_and_unknown_elements(tagged_document, query, status):
+    response = _structure(query)
+    assert response.status_code == status and "error" in json.loads(response.content)
+
+
+def test_structure_summary_counts_types_and_figures(tagged_document):
+    body = json.loads(_get(StructureSummaryView, "/api/abc/structure/summary/", pdf_id="abc").content)
+
+    assert body == {
+        "pdf_id": "abc",
+        "has_structure_tree": True,
+        "element_count": 6,
+        "root_id": 0,
+        "structure_type_counts": {"/Document": 1, "/H1": 1, "/P": 2, "/Figure": 2},
+        "structure_types_found": ["/Document", "/Figure", "/H1", "/P"],
+        "max_heading_level": 1,
+        "total_images": 2,
+        "images_with_alt_text": 1,
+        "images_without_alt_text": 1,
+    }
+
+
+def test_untagged_documents_have_no_structure_to_serve(document_registry, tmp_path, monkeypatch, write_image_pdf):
+    path = str(tmp_path / "doc.pdf")
+    write_image_pdf(path, [[]])
+    document_registry.set("abc", path, "doc.pdf")
+    monkeypatch.setattr(extraction_workers, "processes", 0)
+    monkeypatch.setattr(ingest_mod, "structure_indexes", StructureIndexCache())
+
+    assert _structure().status_code == 404
+    summary = json.loads(_get(StructureSummaryView, "/api/abc/structure/summary/", pdf_id="abc").content)
+    assert (summary["has_structure_tree"], summary["element_count"], summary["root_id"]) == (False, 0, None)
+
+
+def test_upload_only_sniffs_and_leaves_the_open_to_the_queued_job(document_registry, tmp_path, monkeypatch):
+    queued = []
+    monkeypatch.setattr(views_mod.ingest_queue, "enqueue", lambda *job: queued.append(job))
+    monkeypatch.setattr(pikepdf.Pdf, "open", lambda *a, **kw: pytest.fail("the web process opened the PDF"))
+
+    def upload(content):
+        request = AsyncRequestFactory().post("/api/upload/", {"pdf_file": SimpleUploadedFile("doc.pdf", content)})
+        with override_settings(PDF_UPLOAD_DIR=str(tmp_path / "uploads")):
+            return asyncio.run(PDFUploadView.as_view()(request))
+
+    response = upload(b"%PDF-1.7\nunparsable, but that is for the ingest job to find")
+    assert response.status_code == 201
+    pdf_id = json.loads(response.content)["pdf_id"]
+    assert [job[0] for job in queued] == [pdf_id] and document_registry.get(pdf_id) is not None
+
+    rejected = upload(b"PK\x03\x04 not a pdf")
+    assert rejected.status_code == 400 and len(queued) == 1
@@ -0,0 +1,150 @@
+import pikepdf
+import pytest
+
+from server.accessibility.content import ContentIndex
+from server.accessibility.extractor import apply_alt_text, build_structure_index
+
+
+@pytest.fixture
+def tagged_pdf(gray_image):
+    """Three pages; page 2 draws a marked image and an unmarked one, page 3 an image referenced by an OBJR."""
+    pdf = pikepdf.new()
+    for _ in range(3):
+        pdf.add_blank_page()
+    marked, unmarked, referenced = gray_image(pdf), gray_image(pdf), gray_image(pdf)
+    root = pdf.make_indirect(pikepdf.Dictionary(Type=pikepdf.Name.StructTreeRoot))
+    doc = pdf.make_indirect(pikepdf.Dictionary(Type=pikepdf.Name.StructElem, S=pikepdf.Name.Document, P=root))
+    # No /Pg: the page only follows from the parent tree.
+    figure = pdf.make_indirect(pikepdf.Dictionary(
+        Type=pikepdf.Name.StructElem, S=pikepdf.Name.Figure, P=doc, Alt=pikepdf.String("Chart"), K=0,
+    ))
+    para = pdf.make_indirect(pikepdf.Dictionary(
+        Type=pikepdf.Name.StructElem, S=pikepdf.Name.P, P=doc, Pg=pdf.pages[1].obj, K=1,
+    ))
+    linked = pdf.make_indirect(pikepdf.Dictionary(
+        Type=pikepdf.Name.StructElem, S=pikepdf.Name.Figure, P=doc, Pg=pdf.pages[2].obj,
+        K=pikepdf.Dictionary(Type=pikepdf.Name.OBJR, Obj=referenced, Pg=pdf.pages[2].obj),
+    ))
+    doc.K = pikepdf.Array([figure, para, linked])
+    root.K = pikepdf.Array([doc])
+
+    page = pdf.pages[1]
+    page.Resources = pikepdf.Dictionary(
+        XObject=pikepdf.Dictionary(Im0=marked, Im1=unmarked),
+        Properties=pikepdf.Dictionary(Fig=pikepdf.Dictionary(MCID=0)),
+    )
+    page.Contents = pdf.make_stream(
+        b"/Figure /Fig BDC q 10 0 0 10 0 0 cm /Im0 Do Q EMC "
+        b"/P <</MCID 1>> BDC /Span BMC /Im1 Do EMC EMC /Im1 Do"
+    )
+    page.obj.StructParents = 0
+    pdf.pages[2].Resources = pikepdf.Dictionary(XObject=pikepdf.Dictionary(Im0=referenced))
+    pdf.pages[2].Contents = pdf.make_stream(b"/Im0 Do")
+    referenced.StructParent = 1
+    root.ParentTree = pikepdf.Dictionary(Nums=pikepdf.Array([0, pikepdf.Array([figure, para]), 1, linked]))
+    pdf.Root.StructTreeRoot = root
+    return pdf, (figure, para, linked), (marked, unmarked, referenced)
+
+
+def test_links_elements_pages_and_images_both_ways(tagged_pdf):
+    pdf, (figure, para, linked), (marked, unmarked, referenced) = tagged_pdf
+    index = ContentIndex.build(pdf)
+
+    marked_key = f"p2-{marked.objgen[0]}-0"
+    unmarked_key = f"p2-{unmarked.objgen[0]}-0"
+    referenced_key = f"p3-{referenced.objgen[0]}-0"
+    assert index.page_of(figure) == 2 and index.page_of(para) == 2 and index.page_of(linked) == 3
+    assert index.images_of(figure) == [marked_key]
+    # Nested marked content without an MCID belongs to the enclosing sequence that has one.
+    assert index.images_of(para) == [unmarked_key]
+    assert index.images_of(linked) == [referenced_key]
+    assert index.elements_of(marked_key) == [figure.objgen]
+    assert index.elements_of(referenced_key) == [linked.objgen]
+
+
+def test_structure_index_reports_figure_pages_and_images(tagged_pdf):
+    pdf, _, (marked, _, referenced) = tagged_pdf
+    _, accumulator = build_structure_index(pdf)
+
+    assert [(image.page_number, image.image_key) for image in accumulator.images] == [
+        (2, f"p2-{marked.objgen[0]}-0"),
+        (3, f"p3-{referenced.objgen[0]}-0"),
+    ]
+
+
+def test_documents_without_a_parent_tree_still_index():
+    pdf = pikepdf.new()
+    pdf.add_blank_page()
+    index = ContentIndex.build(pdf)
+    assert index.element_pages == {} and index.elements_by_image == {}
+
+
+def test_alt_text_updates_the_linked_figure_in_place(tagged_pdf):
+    pdf, (figure, _, _), (marked, _, _) = tagged_pdf
+    key = f"p2-{marked.objgen[0]}-0"
+
+    for alt_text in ("A bar chart", "Sales by quarter"):
+        results = apply_alt_text(pdf, [{"image_id": 0, "image_key": key, "alt_text": alt_text}])
+        assert results[0]["success"] is True
+
+    assert str(figure.Alt) == "Sales by quarter"
+    assert len(pdf.Root.StructTreeRoot.K[0].K) == 3
+
+
+def test_new_figures_go_under_the_section_and_are_found_again(tagged_pdf):
+    pdf, _, (_, unmarked, _) = tagged_pdf
+    key = f"p2-{unmarked.objgen[0]}-0"
+    index = ContentIndex.build(pdf)
+
+    apply_alt_text(pdf, [{"image_id": 1, "image_key": key, "alt_text": "Logo"}], index)
+    apply_alt_text(pdf, [{"image_id": 1, "image_key": key, "alt_text": "Company logo"}], index)
+
+    doc = pdf.Root.StructTreeRoot.K[0]
+    # The image sits in the paragraph's marked content; the figure is filed beside it, in the paragraph's section.
+    assert len(doc.K) == 4
+    added = doc.K[3]
+    assert added.S == pikepdf.Name.Figure and str(added.Alt) == "Company logo"
+    assert added.P.objgen == doc.objgen and added.Pg.objgen == pdf.pages[1].obj.objgen
+    assert added.K.Type == pikepdf.Name.OBJR and added.K.Obj.objgen == unmarked.objgen
+
+    # A fresh index finds the figure through the image's /StructParent entry in the parent tree.
+    assert added.objgen in ContentIndex.build(pdf).elements_of(key)
+
+
+def test_an_image_taken_from_another_element_leaves_no_stale_reference(tagged_pdf):
+    pdf, (_, _, linked), (_, _, referenced) = tagged_pdf
+    # The image is filed under a paragraph rather than a figure, so tagging it adds a figure.
+    linked.S = pikepdf.Name.P
+    key = f"p3-{referenced.objgen[0]}-0"
+
+    apply_alt_text(pdf, [{"image_id": 2, "image_key": key, "alt_text": "Map"}])
+
+    added = pdf.Root.StructTreeRoot.K[0].K[3]
+    assert str(added.Alt) == "Map" and int(referenced.StructParent) == 1
+    parents = pikepdf.NumberTree(pdf.Root.StructTreeRoot.ParentTree)
+    assert parents[1].objgen == added.objgen
+    # The paragraph no longer claims the image it lost, so the image has one parent element.
+    assert "/K" not in linked
+    assert ContentIndex.build(pdf).elements_of(key) == [added.objgen]
+
+
+def test_a_figure_already_registered_for_the_image_is_reused(tagged_pdf):
+    pdf, _, (_, unmarked, _) = tagged_pdf
+    key = f"p2-{unmarked.objgen[0]}-0"
+    index = ContentIndex.build(pdf)
+
+    # Tagged after the index was built, so only the parent tree knows about this figure.
+    doc = pdf.Root.StructTreeRoot.K[0]
+    figure = pdf.make_indirect(pikepdf.Dictionary(
+        Type=pikepdf.Name.StructElem, S=pikepdf.Name.Figure, P=doc, Pg=pdf.pages[1].obj,
+        K=pikepdf.Dictionary(Type=pikepdf.Name.OBJR, Obj=unmarked, Pg=pdf.pages[1].obj),
+    ))
+    doc.K.append(figure)
+    unmarked.StructParent = 2
+    pikepdf.NumberTree(pdf.Root.StructTreeRoot.ParentTree)[2] = figure
+
+    results = apply_alt_text(pdf, [{"image_id": 1, "image_key": key, "alt_text": "Logo"}], index)
+
+    assert results[0]["success"] is True
+    assert len(doc.K) == 4 and str(figure.Alt) == "Logo"
+    assert index.elements_of(key)[-1] == figure.objgen
@@ -0,0 +1,35 @@
+import asyncio
+import threading
+
+import pytest
+
+from server.executor import BlockingWorkPool, WorkPoolBusy
+
+
+def test_run_returns_result_and_propagates_errors():
+    pool = BlockingWorkPool(max_workers=2, max_queued=0)
+
+    async def main():
+        assert await pool.run(lambda a, b=0: a + b, 1, b=2) == 3
+        with pytest.raises(ZeroDivisionError):
+            await pool.run(lambda: 1 / 0)
+
+    asyncio.run(main())
+    assert pool.stats()['in_flight'] == 0
+    assert pool.completed == 2
+
+
+def test_rejects_work_beyond_workers_plus_queue():
+    pool = BlockingWorkPool(max_workers=1, max_queued=1)
+    release = threading.Event()
+
+    async def main():
+        running = [asyncio.ensure_future(pool.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(WorkPoolBusy):
+            await pool.run(release.wait)
+        release.set()
+        return await asyncio.gather(*running)
+
+    assert asyncio.run(main()) == [True, True]
+    assert pool.rejected == 1
@@ -1,9 +1,14 @@
+import pikepdf
+
 from server.accessibility.extractor import (
+    TraversalPolicy,
+    TraversalStats,
+    build_structure_table,
     traverse_element,
     extract_structure_tree,
     extract_images_from_tree,
 )
-from server.accessibility.models import StructureElement
+from server.accessibility.models import StructureAccumulator, StructureElement
 
 
 class FakeElem:
@@ -46,3 +51,60 @@ def test_extract_images_from_tree_finds_figures():
     img = images[0]
     assert img.has_alt_text is True
     assert img.alt_text == "an alt"
+
+
+def _chain_pdf(length):
+    pdf = pikepdf.new()
+    elements = [pdf.make_indirect(pikepdf.Dictionary(S=pikepdf.Name("/Div"))) for _ in range(length)]
+    for parent, child in zip(elements, elements[1:]):
+        parent.K = pikepdf.Array([child])
+    root = pdf.make_indirect(pikepdf.Dictionary(Type=pikepdf.Name.StructTreeRoot, K=pikepdf.Array([elements[0]])))
+    return pdf, root, elements
+
+
+def _depth(element):
+    depth = 0
+    while element.children:
+        element = element.children[0]
+        depth += 1
+    return depth
+
+
+def test_structure_tree_from_real_pdf_arrays_and_cycles():
+    pdf, root, elements = _chain_pdf(3)
+    # /K pointing back at an ancestor and at the root would loop forever without the visited set.
+    elements[-1].K = pikepdf.Array([elements[0], root])
+
+    stats = TraversalStats()
+    tree = extract_structure_tree(pdf, root, stats=stats)
+    assert tree.element_type == "/Div"
+    assert _depth(tree) == 2
+    assert stats.elements == 3 and stats.revisits == 2
+
+
+def test_deep_structure_tree_is_flattened_or_truncated_by_policy():
+    pdf, root, _ = _chain_pdf(5000)
+
+    stats = TraversalStats()
+    tree = extract_structure_tree(pdf, root, TraversalPolicy(max_depth=10), stats)
+    assert _depth(tree) == 11
+    assert stats.elements == 5000 and stats.flattened == 5000 - 12
+
+    stats = TraversalStats()
+    tree = extract_structure_tree(pdf, root, TraversalPolicy(max_depth=10, on_max_depth='truncate'), stats)
+    assert _depth(tree) == 10
+    assert stats.elements == 11 and stats.truncated == 1
+
+
+def test_build_structure_table_collects_stats_in_the_same_pass():
+    pdf = pikepdf.new()
+    figure = pdf.make_indirect(pikepdf.Dictionary(S=pikepdf.Name.Figure, Alt=pikepdf.String("Logo")))
+    heading = pdf.make_indirect(pikepdf.Dictionary(S=pikepdf.Name.H3))
+    root = pdf.make_indirect(pikepdf.Dictionary(Type=pikepdf.Name.StructTreeRoot, K=pikepdf.Array([heading, figure])))
+
+    acc = StructureAccumulator()
+    table = build_structure_table(root, accumulator=acc)
+    assert len(table) == 2
+    assert acc.type_counts == {"/H3": 1, "/Figure": 1, "Root": 1}
+    assert acc.max_heading_level == 3
+    assert [image.alt_text for image in acc.images] == ["Logo"]
@@ -36,9 +36,10 @@ def test_extract_all_images_and_get_image_by_id(monkeypatch, tmp_path):
     # Fake raw image object
     class RawImg:
         Subtype = "/Image"
+        objgen = (5, 0)
 
-    # Fake page with images mapping
-    page = SimpleNamespace(images={"Im1": RawImg()})
+    # Fake page whose resources name one image
+    page = SimpleNamespace(obj={"/Resources": {"/XObject": {"Im1": RawImg()}}})
 
     class FakePdf:
         def __init__(self):
@@ -57,17 +58,22 @@ def test_extract_all_images_and_get_image_by_id(monkeypatch, tmp_path):
     assert img["width"] == 10
     assert img["height"] == 20
 
-    # get_image_by_id uses extract_all_images internally; monkeypatch to reuse
-    monkeypatch.setattr(extractor, "extract_all_images", lambda path: images)
+    # get_image_by_id decodes only the requested image, addressed by id or stable key
+    decoded = []
+    monkeypatch.setattr(extractor, "render_image", lambda obj: decoded.append(obj) or {"data": b"PNGDATA"})
     found = extractor.get_image_by_id("dummy.pdf", 0)
     assert found is not None and found["id"] == 0
+    assert found["key"] == "p1-5-0"
+    assert len(decoded) == 1
+    assert extractor.get_image_by_id("dummy.pdf", "p1-5-0")["id"] == 0
+    assert extractor.get_image_by_id("dummy.pdf", 1) is None
 
 
 def test_tag_image_with_alt_text_image_not_found(monkeypatch):
     # Fake pdf with no images
     class FakePdf:
         def __init__(self):
-            self.pages = [SimpleNamespace(images={})]
+            self.pages = [SimpleNamespace(obj={"/Resources": {}})]
 
         def close(self):
             pass
@@ -127,3 +133,86 @@ def test_extract_accessibility_info_corrupt_pdf(monkeypatch, tmp_path):
     assert res.errors
     assert any("unexpected" in e.lower() or "error" in e.lower() or "corrupt" in e.lower() for e in res.errors)
 
+
+def test_list_image_metadata_reads_dictionaries_without_decoding(monkeypatch):
+    class RawImg(dict):
+        Subtype = "/Image"
+        objgen = (7, 0)
+
+    class FailingPdfImage:
+        def __init__(self, raw):
+            raise AssertionError("image pixels must not be decoded")
+
+    jpeg = RawImg({"/Width": 640, "/Height": 480, "/Filter": "/DCTDecode", "/BitsPerComponent": 8, "/ColorSpace": "/DeviceRGB"})
+    mask = RawImg({"/Width": 10, "/Height": 5, "/Filter": ["/FlateDecode", "/DCTDecode"], "/ColorSpace": ["/ICCBased", object()]})
+
+    class FakePdf:
+        def __init__(self):
+            self.pages = [
+                SimpleNamespace(obj={"/Resources": {"/XObject": {"Im1": jpeg}}}),
+                SimpleNamespace(obj={"/Resources": {"/XObject": {"Im2": mask}}}),
+            ]
+
+        def close(self):
+            pass
+
+    monkeypatch.setattr(extractor.pikepdf.Pdf, "open", lambda p: FakePdf(), raising=False)
+    monkeypatch.setattr(extractor.pikepdf, "PdfImage", FailingPdfImage, raising=False)
+
+    images = extractor.list_image_metadata("dummy.pdf")
+    assert [img["id"] for img in images] == [0, 1]
+    assert images[0]["width"] == 640 and images[0]["height"] == 480
+    assert images[0]["filter"] == ["DCTDecode"]
+    assert images[0]["color_space"] == "DeviceRGB"
+    assert images[1]["page_number"] == 2
+    assert images[1]["filter"] == ["FlateDecode", "DCTDecode"]
+    assert images[1]["bits_per_component"] is None
+    assert images[1]["color_space"] == "ICCBased"
+
+
+def test_tag_images_with_alt_text_opens_and_saves_once(monkeypatch, tmp_path, write_image_pdf):
+    path = str(tmp_path / "doc.pdf")
+    write_image_pdf(path, [[b"\x00"] * 3])
+
+    real_open = extractor.pikepdf.Pdf.open
+    real_save = extractor.pikepdf.Pdf.save
+    calls = {"open": 0, "save": 0}
+
+    def counting_open(*args, **kwargs):
+        calls["open"] += 1
+        return real_open(*args, **kwargs)
+
+    def counting_save(self, *args, **kwargs):
+        calls["save"] += 1
+        return real_save(self, *args, **kwargs)
+
+    monkeypatch.setattr(extractor.pikepdf.Pdf, "open", counting_open)
+    monkeypatch.setattr(extractor.pikepdf.Pdf, "save", counting_save)
+
+    results = extractor.tag_images_with_alt_text(path, [
+        {"image_id": 0, "alt_text": "first"},
+        {"image_id": 7, "alt_text": "missing"},
+        {"image_id": 2, "alt_text": "third"},
+    ])
+
+    assert [r["success"] for r in results] == [True, False, True]
+    assert results[1]["error"] == "Image not found"
+    assert calls == {"open": 1, "save": 1}
+
+    with real_open(path) as pdf:
+        figures = pdf.Root.StructTreeRoot.K
+        assert [str(f.Alt) for f in figures] == ["first", "third"]
+
+
+def test_retagging_an_image_keeps_a_single_figure(tmp_path, write_image_pdf):
+    path = str(tmp_path / "doc.pdf")
+    write_image_pdf(path, [[b"\x00"] * 2])
+
+    for alt_text in ("draft", "final"):
+        results = extractor.tag_images_with_alt_text(path, [{"image_id": 1, "alt_text": alt_text}])
+        assert results[0]["success"] is True
+
+    with extractor.pikepdf.Pdf.open(path) as pdf:
+        figures = pdf.Root.StructTreeRoot.K
+        assert [str(f.Alt) for f in figures] == ["final"]
+        assert figures[0].K.Obj.objgen == pdf.pages[0].Resources.XObject.Im1.objgen
@@ -0,0 +1,42 @@
+from types import SimpleNamespace
+
+import pytest
+
+from server.accessibility.images import ImageIndex, make_image_key, parse_image_key
+
+
+class RawImg:
+    def __init__(self, objgen, subtype="/Image"):
+        self.objgen = objgen
+        self.Subtype = subtype
+
+
+def test_image_key_round_trip():
+    key = make_image_key(3, (42, 1))
+    assert key == "p3-42-1"
+    assert parse_image_key(key) == (3, (42, 1))
+
+    with pytest.raises(ValueError):
+        parse_image_key("42-1")
+
+
+def _page(xobjects):
+    return SimpleNamespace(obj={"/Resources": {"/XObject": xobjects}})
+
+
+def test_image_index_assigns_sequential_ids_and_stable_keys():
+    shared = RawImg((10, 0))
+    pdf = SimpleNamespace(pages=[
+        _page({"/Im0": shared, "/Fm0": RawImg((11, 0), subtype="/Form")}),
+        _page({"/Im0": shared, "/Im1": RawImg((12, 0))}),
+        SimpleNamespace(obj={}),
+    ])
+
+    index = ImageIndex.build(pdf)
+
+    assert len(index) == 3
+    assert [entry.key for entry in index] == ["p1-10-0", "p2-10-0", "p2-12-0"]
+    assert index.get(2).objgen == (12, 0)
+    assert index.get("p2-10-0").id == 1
+    assert index.get(3) is None
+    assert index.get("p9-1-0") is None
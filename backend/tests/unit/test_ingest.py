@@ -0,0 +1,150 @@
+import pytest
+
+import server.ingest as ingest_mod
+from server.accessibility.journal import EditJournal
+from server.accessibility.render_cache import rendered_images
+from server.accessibility.result_cache import extraction_results
+from server.accessibility.workers import WorkerPoolClosed, extraction_workers, structure_with_deadline
+from server.ingest import (
+    DONE, FAILED, QUEUED, RUNNING, IngestError, IngestQueue, StructureIndexCache, ingest_document, structure_index,
+)
+
+
+def _queue(tmp_path, runner, **kwargs):
+    queue = IngestQueue(location=str(tmp_path / "ingest.sqlite3"), runner=runner, **kwargs)
+    # Jobs are driven with run_next() in these tests rather than by background threads.
+    queue.start = lambda: None
+    return queue
+
+
+def test_job_runs_once_and_reports_progress(tmp_path):
+    seen = []
+
+    def runner(pdf_id, path, filename, report, content_hash, max_rendered_images):
+        report('extracting', 0.25)
+        seen.append((pdf_id, path, filename, content_hash, queue.status(pdf_id)['stage']))
+
+    queue = _queue(tmp_path, runner)
+    assert queue.enqueue("abc", "/tmp/abc.pdf", "report.pdf", "f00d")['status'] == QUEUED
+
+    assert queue.run_next() is True
+    assert queue.run_next() is False
+    assert seen == [("abc", "/tmp/abc.pdf", "report.pdf", "f00d", "extracting")]
+    status = queue.status("abc")
+    assert status['status'] == DONE and status['progress'] == 1.0
+
+
+def test_failed_jobs_record_the_error(tmp_path):
+    def runner(pdf_id, path, filename, report, content_hash, max_rendered_images):
+        raise ValueError("broken xref")
+
+    queue = _queue(tmp_path, runner)
+    queue.enqueue("abc", "/tmp/abc.pdf", "report.pdf")
+    queue.run_next()
+    status = queue.status("abc")
+    assert (status['status'], status['error']) == (FAILED, "broken xref")
+
+
+def test_jobs_interrupted_by_shutdown_go_back_to_the_queue(tmp_path):
+    def runner(pdf_id, path, filename, report, content_hash, max_rendered_images):
+        raise WorkerPoolClosed("Worker pool is shut down")
+
+    queue = _queue(tmp_path, runner, max_attempts=1)
+    queue.enqueue("abc", "/tmp/abc.pdf", "report.pdf")
+
+    # The worker stops draining instead of claiming the job again in a process that is exiting.
+    assert queue.run_next() is False
+    status = queue.status("abc")
+    assert (status['status'], status['attempts'], status['error']) == (QUEUED, 0, None)
+    # Shutdowns do not use up the job's attempts.
+    assert queue._claim() is not None
+
+
+def test_jobs_abandoned_by_a_dead_worker_are_retried(tmp_path):
+    queue = _queue(tmp_path, lambda *args, **kwargs: None, lease_seconds=-1, max_attempts=2)
+    queue.enqueue("abc", "/tmp/abc.pdf", "report.pdf")
+    assert queue._claim() is not None
+    assert queue.status("abc")['status'] == RUNNING
+
+    # The lease has already expired, so the next claim takes the job back.
+    assert queue._claim() is not None
+    assert queue.status("abc")['attempts'] == 2
+    assert queue._claim() is None
+    assert queue.status("abc")['status'] == FAILED
+
+
+def test_structure_index_is_built_by_the_worker_pool_once_per_edit_version(tmp_path, monkeypatch, write_image_pdf):
+    path = str(tmp_path / "doc.pdf")
+    write_image_pdf(path, [[]])
+
+    builds = []
+    monkeypatch.setattr(extraction_workers, "processes", 0)
+    monkeypatch.setattr(ingest_mod, "structure_indexes", StructureIndexCache())
+    monkeypatch.setattr(ingest_mod, "structure_with_deadline", lambda p: builds.append(p) or structure_with_deadline(p))
+
+    table, stats = structure_index("abc", path, "f00d")
+    assert table is None and stats.images == []
+    assert structure_index("abc", path, "f00d") == (table, stats)
+    # Another upload of the same bytes shares the unedited index.
+    assert structure_index("def", path, "f00d") == (table, stats)
+    assert len(builds) == 1
+
+    # A staged edit bumps the journal version, which the cached index no longer matches.
+    EditJournal(path).record([{"image_id": 0, "image_key": "p1-9-0", "alt_text": "Chart"}])
+    structure_index("abc", path, "f00d")
+    assert len(builds) == 2
+
+
+def test_structure_index_cache_keeps_the_newest_version_and_evicts_the_oldest_document():
+    cache = StructureIndexCache(max_entries=2)
+    cache.put("a", 2, "a2")
+    cache.put("a", 1, "a1")
+    assert cache.get("a", 2) == "a2" and cache.get("a", 1) is None
+
+    cache.put("b", 0, "b0")
+    cache.get("a", 2)
+    cache.put("c", 0, "c0")
+    assert cache.get("b", 0) is None and cache.get("a", 2) == "a2"
+    assert cache.invalidate("a") and cache.get("a", 2) is None
+
+
+def test_ingest_job_caches_the_structure_index_from_its_extraction(tmp_path, monkeypatch, write_image_pdf):
+    path = str(tmp_path / "doc.pdf")
+    write_image_pdf(path, [[]])
+
+    monkeypatch.setattr(extraction_workers, "processes", 0)
+    monkeypatch.setattr(ingest_mod, "structure_indexes", StructureIndexCache())
+    monkeypatch.setattr(ingest_mod, "structure_with_deadline", lambda p: pytest.fail("structure was rebuilt"))
+    monkeypatch.setattr(extraction_results, "location", str(tmp_path / "results"))
+    monkeypatch.setattr(rendered_images, "location", str(tmp_path / "renders"))
+    stages = []
+
+    ingest_document("abc", path, "doc.pdf", lambda stage, progress: stages.append(stage), content_hash="f00d")
+
+    assert stages == ["extracting", "rendering"]
+    table, stats = structure_index("abc", path, "f00d")
+    assert table is None and stats.type_counts == {}
+
+
+def test_ingest_job_skips_documents_whose_bytes_were_already_ingested(tmp_path, monkeypatch, write_image_pdf):
+    path = str(tmp_path / "doc.pdf")
+    write_image_pdf(path, [[]])
+    monkeypatch.setattr(extraction_workers, "processes", 0)
+    monkeypatch.setattr(extraction_results, "location", str(tmp_path / "results"))
+    monkeypatch.setattr(rendered_images, "location", str(tmp_path / "renders"))
+    ingest_document("abc", path, "doc.pdf", lambda stage, progress: None, content_hash="f00d")
+
+    monkeypatch.setattr(ingest_mod, "ingest_with_deadline", lambda *args: pytest.fail("document was extracted again"))
+    stages = []
+    ingest_document("def", path, "doc.pdf", lambda stage, progress: stages.append(stage), content_hash="f00d")
+    assert stages == ["extracting"]
+
+
+def test_ingest_job_rejects_documents_that_fail_validation(tmp_path, monkeypatch):
+    # Passes the upload's byte-level sniff; only opening it shows it is unusable.
+    path = tmp_path / "doc.pdf"
+    path.write_bytes(b"%PDF-1.7\nnot really a pdf")
+    monkeypatch.setattr(extraction_workers, "processes", 0)
+
+    with pytest.raises(IngestError, match="(?i)pdf"):
+        ingest_document("abc", str(path), "doc.pdf", lambda stage, progress: None)
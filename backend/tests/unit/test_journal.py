@@ -0,0 +1,126 @@
+import os
+
+import pikepdf
+
+from server.accessibility.extractor import _find_image_by_key
+from server.accessibility.images import ImageIndex
+from server.accessibility.journal import EditJournal
+from server.accessibility.session import DocumentSessionCache
+
+
+def test_record_coalesces_per_image_and_keeps_version_monotonic(tmp_path):
+    journal = EditJournal(str(tmp_path / "doc.pdf"))
+    assert journal.load() == {"version": 0, "entries": []}
+
+    journal.record([{"image_key": "p1-5-0", "image_id": 0, "alt_text": "old"}])
+    journal.record([
+        {"image_key": "p1-5-0", "image_id": 0, "alt_text": "new"},
+        {"image_key": "p2-6-0", "image_id": 1, "alt_text": "other"},
+    ])
+
+    state = journal.load()
+    assert state["version"] == 3
+    assert [(e["image_key"], e["alt_text"]) for e in state["entries"]] == [("p1-5-0", "new"), ("p2-6-0", "other")]
+
+
+def test_entries_name_images_by_page_and_resource_name_when_they_can(tmp_path):
+    journal = EditJournal(str(tmp_path / "doc.pdf"))
+    journal.record([{"image_key": "p2-8-0", "page_number": 2, "image_name": "/Im0", "alt_text": "old"}])
+    # The same image after a save renumbered its object.
+    journal.record([{"image_key": "p2-11-0", "page_number": 2, "image_name": "/Im0", "alt_text": "new"}])
+
+    assert journal.entries() == [{
+        "op": "set_figure_alt", "image_id": None, "alt_text": "new", "recorded_at": journal.entries()[0]["recorded_at"],
+        "page_number": 2, "image_name": "/Im0",
+    }]
+
+
+def test_flush_clears_applied_entries_and_keeps_failures(tmp_path):
+    journal = EditJournal(str(tmp_path / "doc.pdf"))
+    journal.record([
+        {"image_key": "p1-5-0", "alt_text": "ok"},
+        {"image_key": "p1-6-0", "alt_text": "fails"},
+    ])
+
+    seen = []
+
+    def write(entries):
+        seen.extend(entries)
+        return [{"success": e["alt_text"] == "ok"} for e in entries]
+
+    journal.flush(write)
+
+    assert len(seen) == 2
+    assert [e["image_key"] for e in journal.entries()] == ["p1-6-0"]
+    assert journal.version == 2
+
+    journal.delete()
+    assert not os.path.exists(journal.path)
+
+
+def test_flush_drops_entries_whose_image_is_gone(tmp_path):
+    journal = EditJournal(str(tmp_path / "doc.pdf"))
+    journal.record([{"image_key": "p1-5-0", "alt_text": "gone"}])
+
+    results = journal.flush(lambda entries: [{"success": False, "error": "Image not found", "image_missing": True}])
+
+    assert results[0]["image_missing"] and journal.entries() == []
+
+
+def test_staged_edits_are_replayed_in_memory_and_written_on_flush(tmp_path, write_image_pdf):
+    path = str(tmp_path / "doc.pdf")
+    write_image_pdf(path)
+    original = open(path, "rb").read()
+    cache = DocumentSessionCache()
+
+    session = cache.get("doc", path)
+    key = session.get_index("images", ImageIndex.build).get(0).key
+    results = session.stage_alt_text([{"image_id": 0, "image_key": key, "alt_text": "a chart"}])
+
+    assert results[0]["success"] is True
+    assert open(path, "rb").read() == original
+    assert str(session.pdf.Root.StructTreeRoot.K[0].Alt) == "a chart"
+
+    cache.clear()
+    reopened = cache.get("doc", path)
+    assert reopened.edit_version == 1
+    assert str(reopened.pdf.Root.StructTreeRoot.K[0].Alt) == "a chart"
+
+    flushed = cache.flush("doc", path)
+    assert [r["success"] for r in flushed] == [True]
+    assert EditJournal(path).entries() == []
+    with pikepdf.Pdf.open(path) as pdf:
+        assert str(pdf.Root.StructTreeRoot.K[0].Alt) == "a chart"
+    assert len(cache.get("doc", path).pdf.Root.StructTreeRoot.K) == 1
+
+
+def test_edits_staged_before_a_flush_still_find_their_image_after_it(tmp_path, write_image_pdf):
+    path = str(tmp_path / "doc.pdf")
+    write_image_pdf(path, [[b"\x00"], [b"\x01"]])
+    cache = DocumentSessionCache()
+    session = cache.get("doc", path)
+    first, second = session.get_index("images", ImageIndex.build)
+
+    session.stage_alt_text([{"image_id": 0, "image_key": first.key, "page_number": 1, "image_name": "/Im0",
+                             "alt_text": "first"}])
+    cache.flush("doc", path)
+
+    # Resolved against the file as it was before the flush, which renumbered every object after the new figure.
+    EditJournal(path).record([{"image_id": 1, "image_key": second.key, "page_number": 2, "image_name": "/Im0",
+                               "alt_text": "second"}])
+    with pikepdf.Pdf.open(path) as pdf:
+        assert _find_image_by_key(pdf, second.key) == (None, None)
+
+    assert [r["success"] for r in cache.flush("doc", path)] == [True]
+    with pikepdf.Pdf.open(path) as pdf:
+        figures = {str(figure.Alt): figure.Pg.objgen for figure in pdf.Root.StructTreeRoot.K}
+        assert figures == {"first": pdf.pages[0].objgen, "second": pdf.pages[1].objgen}
+
+
+def test_image_keys_only_match_images_on_their_page(tmp_path, write_image_pdf):
+    path = str(tmp_path / "doc.pdf")
+    write_image_pdf(path, [[b"\x00"], [b"\x01"]])
+    with pikepdf.Pdf.open(path) as pdf:
+        first, second = ImageIndex.build(pdf)
+        assert _find_image_by_key(pdf, second.key)[0].objgen == second.objgen
+        assert _find_image_by_key(pdf, f"p1-{second.objgen[0]}-{second.objgen[1]}") == (None, None)
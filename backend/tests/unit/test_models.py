@@ -4,6 +4,7 @@ from server.accessibility.models import (
     ImageReference,
     StructureElement,
     ExtractionResult,
+    StructureAccumulator,
 )
 
 
@@ -36,3 +37,15 @@ def test_extraction_result_computes_image_counts_and_structure():
     assert er.images_without_alt_text == 1
     assert "H1" in er.structure_types_found and "H2" in er.structure_types_found
     assert er.max_heading_level == 2
+
+
+def test_structure_accumulator_counts_types_headings_and_figures():
+    acc = StructureAccumulator()
+    for element_type, alt in [("/Document", None), ("/H2", None), ("/P", None), ("/P", None),
+                              ("/Figure", "A chart"), ("Figure", "  ")]:
+        acc.add(element_type, alt)
+
+    assert acc.type_counts == {"/Document": 1, "/H2": 1, "/P": 2, "/Figure": 1, "Figure": 1}
+    assert acc.max_heading_level == 2
+    assert len(acc.images) == 2 and acc.images_with_alt_text == 1
+    assert acc.types_found() == ["/Document", "/Figure", "/H2", "/P", "Figure"]
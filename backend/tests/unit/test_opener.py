@@ -0,0 +1,38 @@
+import pikepdf
+import pytest
+
+from server.accessibility.opener import PDFOpener
+
+
+def test_access_mode_follows_file_size_and_opens_are_counted(tmp_path, monkeypatch, write_image_pdf):
+    path = str(tmp_path / "doc.pdf")
+    size = write_image_pdf(path, [[]])
+    modes = []
+    real_open = pikepdf.Pdf.open
+    monkeypatch.setattr(pikepdf.Pdf, "open", lambda p, **kw: modes.append(kw.get("access_mode")) or real_open(p, **kw))
+
+    opener = PDFOpener(mmap_threshold=size + 1)
+    with opener.open(path) as pdf:
+        assert len(pdf.pages) == 1
+    opener.configure(mmap_threshold=size)
+    with opener.open(path) as pdf:
+        assert len(pdf.pages) == 1
+
+    assert modes == [None, pikepdf.AccessMode.mmap]
+    stats = opener.stats()
+    assert stats["stream"]["opens"] == 1 and stats["stream"]["bytes"] == size
+    assert stats["mmap"]["opens"] == 1 and stats["mmap"]["bytes"] == size
+
+
+def test_forced_mode_and_failed_opens(tmp_path):
+    path = tmp_path / "bad.pdf"
+    path.write_bytes(b"not a pdf at all")
+
+    opener = PDFOpener(access_mode="mmap", mmap_threshold=1 << 40)
+    assert opener.mode_for(0) == "mmap"
+    with pytest.raises(pikepdf.PdfError):
+        opener.open(str(path))
+    assert opener.stats()["mmap"]["failures"] == 1
+
+    with pytest.raises(ValueError):
+        opener.configure(access_mode="heap")
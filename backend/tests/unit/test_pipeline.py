@@ -0,0 +1,40 @@
+import pikepdf
+
+from server.accessibility.pipeline import run_ingest_pipeline
+
+
+def test_pipeline_validates_extracts_and_indexes_from_one_open(tmp_path, monkeypatch, write_image_pdf):
+    path = tmp_path / "doc.pdf"
+    write_image_pdf(path, [[]])
+
+    opens = []
+    real_open = pikepdf.Pdf.open
+    monkeypatch.setattr(pikepdf.Pdf, "open", lambda *a, **kw: opens.append(a) or real_open(*a, **kw))
+    stages = []
+    # Worker processes pickle each report, so the test snapshots them too.
+    outcome = run_ingest_pipeline(
+        str(path), "doc.pdf", "abc",
+        progress=lambda partial: stages.append((partial.validation.can_proceed, partial.extraction.success)),
+    )
+
+    assert len(opens) == 1
+    assert outcome.validation.can_proceed and outcome.validation.is_valid_pdf
+    assert outcome.extraction.success and outcome.extraction.page_count == 1
+    assert outcome.images == []
+    assert outcome.image_list_key.startswith("abc-")
+    # The structure index comes from the same pass: no tree here, so no table, but statistics all the same.
+    assert outcome.extraction.structure is None and outcome.structure_stats.images == []
+    assert outcome.edit_version == 0
+    # Validation is reported before extraction starts.
+    assert stages[0] == (True, False)
+
+
+def test_pipeline_rejects_documents_that_do_not_open(tmp_path):
+    path = tmp_path / "bad.pdf"
+    path.write_bytes(b"not a pdf at all")
+
+    outcome = run_ingest_pipeline(str(path), "bad.pdf", "abc")
+    assert not outcome.validation.can_proceed
+    assert not outcome.extraction.success
+    assert outcome.extraction.errors == outcome.validation.errors
+    assert outcome.images is None
@@ -0,0 +1,67 @@
+import time
+
+import pytest
+
+from server.registry import BaseDocumentRegistry, SQLiteDocumentRegistry
+
+
+def test_set_get_delete(tmp_path):
+    registry = SQLiteDocumentRegistry(location=str(tmp_path / "documents.sqlite3"))
+
+    assert registry.get("abc") is None
+    registry.set("abc", "/tmp/abc.pdf", "report.pdf", "f00d")
+    record = registry.get("abc")
+    assert (record.pdf_id, record.path, record.filename, record.content_hash) == (
+        "abc", "/tmp/abc.pdf", "report.pdf", "f00d",
+    )
+
+    registry.delete("abc")
+    assert registry.get("abc") is None
+
+
+def test_records_are_shared_between_instances(tmp_path):
+    location = str(tmp_path / "documents.sqlite3")
+    writer = SQLiteDocumentRegistry(location=location)
+    reader = SQLiteDocumentRegistry(location=location)
+
+    writer.set("abc", "/tmp/abc.pdf", "report.pdf")
+    assert reader.get("abc").path == "/tmp/abc.pdf"
+    reader.delete("abc")
+    assert writer.get("abc") is None
+
+
+def test_expired_records_are_hidden_and_reads_extend_ttl(tmp_path, monkeypatch):
+    registry = SQLiteDocumentRegistry(location=str(tmp_path / "documents.sqlite3"), timeout=100)
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now)
+    registry.set("abc", "/tmp/abc.pdf", "report.pdf")
+
+    # Before the half-life a read does not take the write lock at all.
+    real_transaction = registry._db.transaction
+    monkeypatch.setattr(registry._db, "transaction", lambda: pytest.fail("read took a write transaction"))
+    monkeypatch.setattr(time, "time", lambda: now + 10)
+    assert registry.get("abc").expires_at == now + 100
+    monkeypatch.setattr(registry._db, "transaction", real_transaction)
+
+    # Past the half-life a read slides the expiry forward.
+    monkeypatch.setattr(time, "time", lambda: now + 60)
+    assert registry.get("abc").expires_at == now + 160
+
+    monkeypatch.setattr(time, "time", lambda: now + 170)
+    assert registry.get("abc") is None
+    assert registry.purge_expired() == 1
+
+
+def test_records_without_a_hash_fall_back_to_their_id(tmp_path):
+    registry = SQLiteDocumentRegistry(location=str(tmp_path / "documents.sqlite3"))
+    registry.set("abc", "/tmp/abc.pdf", "report.pdf")
+    assert registry.get("abc").content_hash == "abc"
+
+
+def test_backends_must_implement_the_whole_interface():
+    class GetOnly(BaseDocumentRegistry):
+        def get(self, pdf_id):
+            return None
+
+    with pytest.raises(TypeError):
+        GetOnly()
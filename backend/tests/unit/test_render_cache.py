@@ -0,0 +1,58 @@
+import os
+
+import pikepdf
+
+from server.accessibility.render_cache import RenderedImageCache, image_content_hash
+
+
+def test_image_content_hash_tracks_pixels_and_decode_parameters(gray_image):
+    pdf = pikepdf.Pdf.new()
+    a = gray_image(pdf, b"\x00\xff", width=2)
+    same = gray_image(pdf, b"\x00\xff", width=2)
+    other_pixels = gray_image(pdf, b"\xff\x00", width=2)
+    other_shape = gray_image(pdf, b"\x00\xff")
+
+    same.Metadata = pikepdf.Dictionary()
+
+    assert image_content_hash(a) == image_content_hash(same)
+    assert image_content_hash(a) != image_content_hash(other_pixels)
+    assert image_content_hash(a) != image_content_hash(other_shape)
+
+
+def test_put_get_and_lru_eviction(tmp_path):
+    cache = RenderedImageCache(location=str(tmp_path), max_bytes=10)
+
+    assert cache.get("aaa") is None
+    cache.put("aaa", b"1234")
+    cache.put("bbb", b"1234")
+    assert cache.get("aaa") == b"1234"
+
+    cache.put("ccc", b"1234")
+
+    assert cache.get("bbb") is None
+    assert cache.get("aaa") == b"1234"
+    assert cache.get("ccc") == b"1234"
+    assert sorted(os.listdir(tmp_path)) == ["aaa.png", "ccc.png"]
+
+
+def test_existing_entries_are_loaded_from_disk(tmp_path):
+    RenderedImageCache(location=str(tmp_path)).put("aaa", b"12345678", "png")
+
+    cache = RenderedImageCache(location=str(tmp_path), max_bytes=10)
+    cache.put("bbb", b"12345678", "png")
+
+    assert os.listdir(tmp_path) == ["bbb.png"]
+    assert cache.stats()["total_bytes"] == 8
+
+
+def test_budget_covers_the_directory_across_processes(tmp_path):
+    # Two caches on one directory stand in for two worker processes.
+    first = RenderedImageCache(location=str(tmp_path), max_bytes=10)
+    second = RenderedImageCache(location=str(tmp_path), max_bytes=10)
+
+    first.put("aaa", b"1234")
+    second.put("bbb", b"1234")
+    first.put("ccc", b"1234")
+
+    assert sorted(os.listdir(tmp_path)) == ["bbb.png", "ccc.png"]
+    assert second.get("aaa") is None and second.get("bbb") == b"1234"
@@ -0,0 +1,31 @@
+import pytest
+
+from server.responses import FileOffload, RangeNotSatisfiable, parse_range
+
+
+def test_parse_range_handles_closed_open_and_suffix_ranges():
+    assert parse_range("bytes=0-99", 1000) == (0, 100)
+    assert parse_range("bytes=900-", 1000) == (900, 100)
+    assert parse_range("bytes=990-5000", 1000) == (990, 10)
+    assert parse_range("bytes=-100", 1000) == (900, 100)
+    assert parse_range("bytes=-5000", 1000) == (0, 1000)
+
+
+def test_parse_range_falls_back_to_full_file_or_rejects():
+    for header in ("items=0-1", "bytes=0-1,5-6", "bytes=abc", "bytes=5-1", "bytes=-"):
+        assert parse_range(header, 1000) is None
+    for header in ("bytes=1000-", "bytes=-0"):
+        with pytest.raises(RangeNotSatisfiable):
+            parse_range(header, 1000)
+
+
+def test_file_offload_only_covers_files_under_its_root(tmp_path):
+    inside = tmp_path / "uploads" / "abc.pdf"
+    outside = tmp_path / "elsewhere.pdf"
+
+    assert FileOffload(root=str(tmp_path / "uploads")).location(str(inside)) is None
+    sendfile = FileOffload(header="X-Sendfile", root=str(tmp_path / "uploads"))
+    assert sendfile.location(str(inside)) == str(inside)
+    assert sendfile.location(str(outside)) is None
+    accel = FileOffload(header="X-Accel-Redirect", root=str(tmp_path / "uploads"), prefix="/protected/")
+    assert accel.location(str(inside)) == "/protected/abc.pdf"
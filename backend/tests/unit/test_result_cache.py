@@ -0,0 +1,76 @@
+import os
+from datetime import datetime, timedelta
+
+from server.accessibility.extractor import EXTRACTOR_VERSION
+from server.accessibility.result_cache import ExtractionResultCache, make_cache_key
+
+
+def test_cache_key_includes_extractor_and_edit_version():
+    assert make_cache_key("abc", 3) == f"abc-x{EXTRACTOR_VERSION}-e3"
+    assert make_cache_key("abc", 3) != make_cache_key("abc", 4)
+
+
+def test_edited_versions_are_scoped_to_their_upload():
+    # Unedited results are shared by every upload of the same bytes; edits are per upload.
+    assert make_cache_key("f00d", 0, "abc") == make_cache_key("f00d", 0, "def")
+    assert make_cache_key("f00d", 2, "abc") != make_cache_key("f00d", 2, "def")
+
+
+def test_put_get_and_ttl_from_expires_at(tmp_path):
+    cache = ExtractionResultCache(location=str(tmp_path))
+    key = make_cache_key("abc")
+
+    assert cache.get(key) is None
+
+    cache.put(key, '{"success": true}', datetime.now() + timedelta(hours=1))
+    path = cache.get(key)
+    assert path is not None
+    with open(path) as f:
+        assert f.read() == '{"success": true}'
+
+    cache.put(make_cache_key("old"), "{}", datetime.now() - timedelta(seconds=1))
+    assert cache.get(make_cache_key("old")) is None
+    assert sorted(os.listdir(tmp_path)) == [f"{key}.json"]
+    assert cache.hits == 1 and cache.misses == 2
+
+
+def test_invalidate_removes_the_named_entries(tmp_path):
+    cache = ExtractionResultCache(location=str(tmp_path))
+    later = datetime.now() + timedelta(hours=1)
+    cache.put(make_cache_key("abc", 0), "{}", later)
+    cache.put(make_cache_key("abc", 1), "{}", later)
+    cache.put(make_cache_key("xyz", 0), "{}", later)
+
+    assert cache.invalidate(make_cache_key("abc", 0), make_cache_key("abc", 1), make_cache_key("abc", 2)) == 2
+    assert cache.get(make_cache_key("xyz", 0)) is not None
+
+
+def test_expired_entries_are_swept_at_most_once_per_interval(tmp_path, monkeypatch):
+    cache = ExtractionResultCache(location=str(tmp_path), purge_interval=60)
+    sweeps = []
+    real_purge = cache.purge_expired
+    monkeypatch.setattr(cache, "purge_expired", lambda: sweeps.append(1) or real_purge())
+
+    cache.put(make_cache_key("abc"), "{}", datetime.now() + timedelta(hours=1))
+    cache.put(make_cache_key("old"), "{}", datetime.now() - timedelta(seconds=1))
+
+    assert len(sweeps) == 1
+    assert sorted(os.listdir(tmp_path)) == sorted([f"{make_cache_key('old')}.json", f"{make_cache_key('abc')}.json"])
+    cache._next_purge = 0.0
+    cache.put(make_cache_key("xyz"), "{}", datetime.now() + timedelta(hours=1))
+    assert len(sweeps) == 2 and f"{make_cache_key('old')}.json" not in os.listdir(tmp_path)
+
+
+def test_write_through_publishes_only_complete_entries(tmp_path):
+    cache = ExtractionResultCache(location=str(tmp_path))
+    later = datetime.now() + timedelta(hours=1)
+
+    chunks = cache.write_through(make_cache_key("abc"), iter(['{"a": ', '1}']), later)
+    assert next(chunks) == '{"a": '
+    chunks.close()
+    assert cache.get(make_cache_key("abc")) is None
+    assert os.listdir(tmp_path) == []
+
+    assert "".join(cache.write_through(make_cache_key("abc"), iter(['{"a": ', '1}']), later)) == '{"a": 1}'
+    with open(cache.get(make_cache_key("abc"))) as f:
+        assert f.read() == '{"a": 1}'
@@ -0,0 +1,83 @@
+import os
+
+import server.accessibility.session as session_mod
+from server.accessibility.session import DocumentSessionCache
+
+
+class FakePdf:
+    def __init__(self, path):
+        self.path = path
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def _make_pdf(tmp_path, name, size=10):
+    f = tmp_path / name
+    f.write_bytes(b"x" * size)
+    return str(f)
+
+
+def test_get_reuses_open_handle_and_counts_hits(monkeypatch, tmp_path):
+    opened = []
+
+    def fake_open(path):
+        opened.append(path)
+        return FakePdf(path)
+
+    monkeypatch.setattr(session_mod.pdf_opener, "open", fake_open)
+    path = _make_pdf(tmp_path, "a.pdf")
+    cache = DocumentSessionCache()
+
+    first = cache.get("a", path)
+    second = cache.get("a", path)
+
+    assert first is second
+    assert opened == [path]
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+
+def test_lru_eviction_by_entries_and_bytes(monkeypatch, tmp_path):
+    monkeypatch.setattr(session_mod.pdf_opener, "open", FakePdf)
+    a = _make_pdf(tmp_path, "a.pdf", size=40)
+    b = _make_pdf(tmp_path, "b.pdf", size=40)
+    c = _make_pdf(tmp_path, "c.pdf", size=40)
+
+    cache = DocumentSessionCache(max_entries=2, max_bytes=1000)
+    sa = cache.get("a", a)
+    cache.get("b", b)
+    cache.get("a", a)
+    cache.get("c", c)
+
+    assert "a" in cache and "c" in cache and "b" not in cache
+    assert sa.pdf.closed is False
+
+    cache.configure(max_bytes=50)
+    assert len(cache) == 1 and "c" in cache
+    assert sa.pdf.closed is True
+    assert cache.stats()["evictions"] == 2
+
+
+def test_invalidate_and_stale_file_reopen(monkeypatch, tmp_path):
+    monkeypatch.setattr(session_mod.pdf_opener, "open", FakePdf)
+    path = _make_pdf(tmp_path, "a.pdf")
+    cache = DocumentSessionCache()
+
+    first = cache.get("a", path)
+    assert cache.invalidate("a") is True
+    assert first.pdf.closed is True
+    assert cache.invalidate("a") is False
+
+    second = cache.get("a", path)
+    with open(path, "ab") as f:
+        f.write(b"more")
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+    third = cache.get("a", path)
+    assert third is not second
+    assert second.pdf.closed is True
+    assert cache.stats()["invalidations"] == 1
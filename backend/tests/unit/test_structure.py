@@ -0,0 +1,120 @@
+import json
+import pickle
+from dataclasses import asdict
+from datetime import datetime
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from server.accessibility.models import ExtractionResult
+from server.accessibility.structure import StringTable, StructureTable
+
+
+def _table():
+    table = StructureTable()
+    sect = table.append("Sect", 0, -1, 1)
+    table.append("H1", 1, sect, 2, title="Intro")
+    table.append("Figure", 1, sect, 3, alt_text="A chart")
+    table.append("P", 0, -1, 4, lang="en")
+    return table.finish()
+
+
+def test_views_expose_the_structure_element_api():
+    table = _table()
+    root = table.root
+
+    assert (root.element_type, root.depth, root.reading_order_index) == ("Root", 0, 0)
+    sect, paragraph = root.children
+    assert [child.element_type for child in sect.children] == ["H1", "Figure"]
+    assert sect.children[1].alt_text == "A chart"
+    assert sect.children[1].parent_type == "Sect"
+    assert paragraph.lang == "en" and paragraph.alt_text is None
+    assert table.unique_types() == ["Figure", "H1", "P", "Root", "Sect"]
+
+
+def test_to_dict_matches_asdict_of_materialised_tree():
+    table = _table()
+    assert table.to_dict() == asdict(table.to_element())
+    assert table.to_dict()["children"][0]["children"][0]["title"] == "Intro"
+
+
+def test_string_table_deduplicates_and_survives_pickling():
+    strings = StringTable()
+    first = strings.add("Figure")
+    assert strings.add("Figure") == first
+    assert strings.add(None) == -1
+
+    copy = pickle.loads(pickle.dumps(strings))
+    assert copy.get(first) == "Figure"
+    assert copy.add("Figure") == first
+    assert copy.get(copy.add("P")) == "P"
+
+
+def test_extraction_result_serialises_structure_table():
+    table = _table()
+    result = ExtractionResult(
+        pdf_filename="doc.pdf",
+        extraction_timestamp=datetime.now(),
+        cache_key="k",
+        expires_at=datetime.now(),
+        page_count=1,
+        file_size_bytes=10,
+        pdf_version="1.7",
+        success=True,
+        has_structure_tree=True,
+        is_tagged=True,
+        structure=table,
+    )
+
+    assert result.structure_tree.element_type == "Root"
+    data = result.to_dict()
+    assert "structure" not in data
+    assert data["structure_tree"] == asdict(table.to_element())
+
+
+def test_iter_json_streams_the_same_document_as_to_dict():
+    table = _table()
+    result = ExtractionResult(
+        pdf_filename="doc.pdf",
+        extraction_timestamp=datetime.now(),
+        cache_key="k",
+        expires_at=datetime.now(),
+        page_count=1,
+        file_size_bytes=10,
+        pdf_version="1.7",
+        success=True,
+        has_structure_tree=True,
+        is_tagged=True,
+        structure=table,
+    )
+
+    expected = dict(result.to_dict(), actual_image_count=1)
+    chunks = list(result.iter_json(DjangoJSONEncoder(default=str), {"actual_image_count": 1}))
+    assert len(chunks) > len(table)
+    assert "".join(chunks) == json.dumps(expected, cls=DjangoJSONEncoder, default=str)
+    assert "".join(table.iter_json(json.dumps, index=0)) == json.dumps(table.to_dict(0))
+
+
+def test_subtree_pages_children_and_limits_depth():
+    table = StructureTable()
+    doc = table.append("Document", 0, -1, 1)
+    for i in range(5):
+        sect = table.append("Sect", 1, doc, len(table) + 1)
+        table.append("P", 2, sect, len(table) + 1)
+    table.finish()
+
+    node = table.subtree(doc, depth=1, limit=2)
+    assert node["child_count"] == 5 and node["parent_id"] is None
+    assert [child["id"] for child in node["children"]] == [1, 3]
+    assert node["next_cursor"] == 2
+    assert "children" not in node["children"][0] and node["children"][0]["child_count"] == 1
+
+    node = table.subtree(doc, depth=2, limit=2, offset=4)
+    assert [child["id"] for child in node["children"]] == [9]
+    assert node["next_cursor"] is None
+    assert node["children"][0]["children"][0]["element_type"] == "P"
+
+    node = table.subtree(doc, depth=2, limit=100, max_nodes=4)
+    assert len(node["children"]) == 3 and node["next_cursor"] == 3
+    assert all("children" not in child for child in node["children"])
+    assert table.find_reading_order(4) == 3
+    assert table.find_reading_order(0) is None and table.find_reading_order(len(table) + 1) is None
@@ -0,0 +1,120 @@
+import asyncio
+import hashlib
+import json
+import os
+
+import pytest
+from django.conf import settings
+
+if not settings.configured:
+    settings.configure()
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from server.uploads import (
+    MULTIPART_OVERHEAD, RequestBodyLimit, UploadDigest, UploadError, blob_path_for, release_document, save_upload,
+)
+
+
+def test_upload_digest_hashes_incrementally_and_enforces_limits():
+    digest = UploadDigest(max_bytes=20)
+    digest.update(b"junk%PDF-1.7\n")
+    digest.update(b"1234567")
+    assert digest.size == 20
+
+    assert digest.hexdigest() == hashlib.sha256(b"junk%PDF-1.7\n1234567").hexdigest()
+
+    with pytest.raises(UploadError, match="upload limit"):
+        digest.update(b"x")
+
+    with pytest.raises(UploadError, match="not a PDF"):
+        UploadDigest(max_bytes=20).update(b"PK\x03\x04")
+
+
+def test_save_upload_gives_each_upload_its_own_copy_of_a_shared_blob(tmp_path):
+    content = b"%PDF-1.4\n" + b"0" * 100
+    sha256 = hashlib.sha256(content).hexdigest()
+    blob = blob_path_for(str(tmp_path), sha256)
+
+    saved = save_upload(SimpleUploadedFile("doc.pdf", content), str(tmp_path))
+
+    assert saved.sha256 == sha256
+    assert saved.size_bytes == 109
+    assert saved.existing is False
+    assert saved.path != blob and os.path.samefile(saved.path, blob)
+
+    again = save_upload(SimpleUploadedFile("renamed.pdf", content), str(tmp_path))
+
+    assert again.existing is True
+    assert again.pdf_id != saved.pdf_id and again.path != saved.path
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(
+        [f"{sha256}.pdf", f"{sha256}.{saved.pdf_id}.pdf", f"{sha256}.{again.pdf_id}.pdf"]
+    )
+
+    # Writes replace a document's file, which detaches it from the blob and the other upload.
+    replacement = tmp_path / "edited.tmp"
+    replacement.write_bytes(content + b"% edited\n")
+    os.replace(replacement, saved.path)
+    assert open(again.path, "rb").read() == content and open(blob, "rb").read() == content
+
+    release_document(saved.path)
+    assert os.path.exists(blob) and os.path.exists(again.path)
+    release_document(again.path)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_save_upload_rejects_non_pdf_and_leaves_nothing_behind(tmp_path):
+    upload = SimpleUploadedFile("doc.pdf", b"not a pdf")
+
+    with pytest.raises(UploadError):
+        save_upload(upload, str(tmp_path))
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def _call(app, headers, chunks):
+    messages = [
+        {"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1} for i, chunk in enumerate(chunks)
+    ]
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "POST", "path": "/api/upload/", "headers": headers}
+    asyncio.run(RequestBodyLimit(app)(scope, receive, send))
+    return sent, messages
+
+
+async def _django_like_app(scope, receive, send):
+    # Reads the whole body first, as Django's ASGI handler does, and gives up on a disconnect.
+    body = b""
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            break
+    await send({"type": "http.response.start", "status": 201, "headers": []})
+    await send({"type": "http.response.body", "body": str(len(body)).encode()})
+
+
+def test_request_body_limit_refuses_oversized_bodies_before_they_are_read(monkeypatch):
+    monkeypatch.setattr(settings, "PDF_UPLOAD_MAX_BYTES", 1024, raising=False)
+    limit = 1024 + MULTIPART_OVERHEAD
+
+    sent, unread = _call(_django_like_app, [(b"content-length", str(limit + 1).encode())], [b"x" * 10])
+    assert sent[0]["status"] == 413 and "upload limit" in json.loads(sent[1]["body"])["error"]
+    assert len(unread) == 1
+
+    # Without a Content-Length the body is cut off once it passes the limit.
+    sent, unread = _call(_django_like_app, [], [b"x" * limit, b"x", b"never read"])
+    assert [m["status"] for m in sent if m["type"] == "http.response.start"] == [413]
+    assert len(unread) == 1
+
+    sent, _ = _call(_django_like_app, [(b"content-length", b"2")], [b"ok"])
+    assert sent[0]["status"] == 201 and sent[1]["body"] == b"2"
@@ -28,10 +28,13 @@ if importlib.util.find_spec("pikepdf") is None:
 import os
 import server.accessibility.validators as validators
 
+# Passes the byte-level sniffing, so these tests reach the (faked) pikepdf open.
+PDF_BYTES = b"%PDF-1.7\n1 0 obj\n<< >>\nendobj\ntrailer\n<< /Size 2 /Root 1 0 R >>\nstartxref\n9\n%%EOF\n"
+
 
 def test_validate_pdf_file_small_valid(monkeypatch, tmp_path):
     f = tmp_path / "small.pdf"
-    f.write_bytes(b"pdf")
+    f.write_bytes(PDF_BYTES)
 
     # small size
     monkeypatch.setattr(validators.os.path, "getsize", lambda p: 1024)
@@ -52,7 +55,7 @@ def test_validate_pdf_file_small_valid(monkeypatch, tmp_path):
 
 def test_validate_pdf_file_large_warns(monkeypatch, tmp_path):
     f = tmp_path / "large.pdf"
-    f.write_bytes(b"x")
+    f.write_bytes(PDF_BYTES)
 
     # 12 MB -> warning
     monkeypatch.setattr(validators.os.path, "getsize", lambda p: 12 * 1024 * 1024)
@@ -73,7 +76,7 @@ def test_validate_pdf_file_large_warns(monkeypatch, tmp_path):
 
 def test_validate_pdf_file_password_error(monkeypatch, tmp_path):
     f = tmp_path / "pw.pdf"
-    f.write_bytes(b"x")
+    f.write_bytes(PDF_BYTES)
 
     monkeypatch.setattr(validators.os.path, "getsize", lambda p: 1024)
 
@@ -90,7 +93,7 @@ def test_validate_pdf_file_password_error(monkeypatch, tmp_path):
 
 def test_validate_pdf_file_invalid_pdf(monkeypatch, tmp_path):
     f = tmp_path / "bad.pdf"
-    f.write_bytes(b"x")
+    f.write_bytes(PDF_BYTES)
 
     monkeypatch.setattr(validators.os.path, "getsize", lambda p: 1024)
 
@@ -2,10 +2,13 @@ import types
 
 import server.accessibility.validators as validators
 
+# Passes the byte-level sniffing, so these tests reach the (faked) pikepdf open.
+PDF_BYTES = b"%PDF-1.7\n1 0 obj\n<< >>\nendobj\ntrailer\n<< /Size 2 /Root 1 0 R >>\nstartxref\n9\n%%EOF\n"
+
 
 def test_validate_pdf_file_pdf_object_is_encrypted(monkeypatch, tmp_path):
     f = tmp_path / "enc.pdf"
-    f.write_bytes(b"x")
+    f.write_bytes(PDF_BYTES)
 
     # small size
     monkeypatch.setattr(validators.os.path, "getsize", lambda p: 1024)
@@ -27,7 +30,7 @@ def test_validate_pdf_file_pdf_object_is_encrypted(monkeypatch, tmp_path):
 
 def test_validate_pdf_file_very_large_warns(monkeypatch, tmp_path):
     f = tmp_path / "huge.pdf"
-    f.write_bytes(b"x")
+    f.write_bytes(PDF_BYTES)
 
     # 60 MB -> both warnings
     monkeypatch.setattr(validators.os.path, "getsize", lambda p: 60 * 1024 * 1024)
@@ -54,3 +57,28 @@ def test_validate_pdf_file_rejects_non_pdf_extension(tmp_path):
     assert res.can_proceed is False
     assert res.status == validators.ValidationStatus.INVALID.value
     assert any("pdf" in e.lower() for e in res.errors)
+
+
+def test_sniffing_rejects_garbage_and_encrypted_files_before_parsing(monkeypatch, tmp_path):
+    def fail_open(*args, **kwargs):
+        raise AssertionError("sniffing should have rejected the file")
+
+    monkeypatch.setattr(validators.pikepdf.Pdf, "open", fail_open, raising=False)
+
+    zipped = tmp_path / "archive.pdf"
+    zipped.write_bytes(b"PK\x03\x04" + b"\x00" * 4096)
+    res = validators.validate_pdf_file(str(zipped))
+    assert res.status == validators.ValidationStatus.INVALID.value and not res.can_proceed
+
+    encrypted = tmp_path / "enc.pdf"
+    encrypted.write_bytes(PDF_BYTES.replace(b"/Root 1 0 R", b"/Root 1 0 R /Encrypt 5 0 R"))
+    res = validators.validate_pdf_file(str(encrypted))
+    assert res.is_encrypted and res.status == validators.ValidationStatus.ENCRYPTED.value
+    assert res.pdf_version == "1.7"
+
+    # PDF 1.5+ files keep the trailer in the cross-reference stream that startxref points at.
+    body = b"%PDF-1.5\n"
+    xref = b"3 0 obj\n<< /Type /XRef /Size 4 /Encrypt 2 0 R /Length 0 >>\nstream\n\nendstream\nendobj\n"
+    xref_stream = tmp_path / "xref.pdf"
+    xref_stream.write_bytes(body + xref + b"startxref\n%d\n%%%%EOF\n" % len(body))
+    assert validators.validate_pdf_file(str(xref_stream)).is_encrypted
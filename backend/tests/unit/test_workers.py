@@ -0,0 +1,124 @@
+import multiprocessing
+import os
+import threading
+import time
+
+import pikepdf
+import pytest
+
+from server.accessibility.render_cache import rendered_images
+from server.accessibility.workers import (
+    ExtractionWorkerPool, WorkerJobError, WorkerPoolClosed, extraction_workers, ingest_with_deadline,
+    render_all_with_deadline,
+)
+
+
+def _echo(value, progress=None):
+    return value
+
+
+def _slow(seconds, progress=None):
+    progress("started")
+    time.sleep(seconds)
+    return "finished"
+
+
+def _greedy(progress=None):
+    return len(bytearray(512 * 1024 * 1024))
+
+
+def test_jobs_run_in_reused_worker_processes():
+    pool = ExtractionWorkerPool(processes=1, timeout=10)
+    try:
+        assert pool.run(_echo, 1) == 1
+        assert pool.run(_echo, 2) == 2
+        assert pool.stats()['recycled'] == 0
+    finally:
+        pool.configure(processes=0)
+
+
+def test_deadline_kills_worker_and_keeps_last_progress():
+    pool = ExtractionWorkerPool(processes=1, timeout=0.5)
+    try:
+        with pytest.raises(WorkerJobError) as excinfo:
+            pool.run(_slow, 30)
+        assert excinfo.value.timed_out
+        assert excinfo.value.partial == "started"
+        assert pool.stats()['timeouts'] == 1 and pool.stats()['recycled'] == 1
+        # A fresh worker replaces the killed one.
+        assert pool.run(_echo, "ok") == "ok"
+    finally:
+        pool.configure(processes=0)
+
+
+def test_memory_limit_fails_the_job_not_the_server():
+    pool = ExtractionWorkerPool(processes=1, timeout=10, memory_limit=256 * 1024 * 1024)
+    try:
+        with pytest.raises(WorkerJobError, match="MemoryError"):
+            pool.run(_greedy)
+        assert pool.stats()['failures'] == 1 and pool.stats()['timeouts'] == 0
+    finally:
+        pool.configure(processes=0)
+
+
+def test_shutdown_stops_workers_and_refuses_new_jobs():
+    pool = ExtractionWorkerPool(processes=1, timeout=10)
+    assert pool.run(_echo, 1) == 1
+    worker = pool._idle[0]
+
+    pool.shutdown()
+    assert not worker.process.is_alive()
+    with pytest.raises(WorkerPoolClosed, match="shut down"):
+        pool.run(_echo, 2)
+
+
+def test_jobs_cut_off_by_shutdown_are_not_reported_as_failures():
+    pool = ExtractionWorkerPool(processes=1, timeout=30)
+    errors = []
+    job = threading.Thread(target=lambda: errors.append(pytest.raises(WorkerJobError, pool.run, _slow, 30)))
+    job.start()
+    while not pool.stats()['busy'] or not multiprocessing.active_children():
+        time.sleep(0.01)
+
+    pool.shutdown()
+    # What multiprocessing's exit handler does to the children still running.
+    for child in multiprocessing.active_children():
+        child.kill()
+    job.join(10)
+
+    assert errors[0].type is WorkerPoolClosed and pool.stats()['failures'] == 0
+
+
+def test_timed_out_extraction_returns_partial_result(tmp_path, monkeypatch):
+    pdf_path = tmp_path / "doc.pdf"
+    pdf_path.write_bytes(b"%PDF-1.7\n")
+
+    def timed_out(*args, **kwargs):
+        raise WorkerJobError("Job exceeded its deadline", timed_out=True)
+
+    monkeypatch.setattr(extraction_workers, "run", timed_out)
+    outcome = ingest_with_deadline(str(pdf_path), "doc.pdf", "abc")
+    result = outcome.extraction
+
+    assert result.timed_out and not result.success
+    assert outcome.images is None
+    assert result.cache_key.startswith("abc-")
+    assert "deadline" in result.errors[0]
+    # Killed before the document was opened, so it cannot count as validated.
+    assert not outcome.validation.can_proceed
+
+
+def test_document_renders_are_batched_into_one_open(tmp_path, monkeypatch, write_image_pdf):
+    pdf_path = str(tmp_path / "doc.pdf")
+    write_image_pdf(pdf_path, [[b"\x00"], [b"\xff"], [b"\x80"]])
+
+    opens = []
+    real_open = pikepdf.Pdf.open
+    monkeypatch.setattr(pikepdf.Pdf, "open", lambda *a, **kw: opens.append(a) or real_open(*a, **kw))
+    monkeypatch.setattr(extraction_workers, "processes", 0)
+    monkeypatch.setattr(rendered_images, "location", str(tmp_path / "renders"))
+
+    assert render_all_with_deadline(pdf_path, 2) == 2
+    assert len(opens) == 1 and len(os.listdir(tmp_path / "renders")) == 2
+    # Images already in the cache are not rendered again.
+    assert render_all_with_deadline(pdf_path, 3) == 1
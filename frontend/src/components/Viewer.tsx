@@ -4,7 +4,7 @@ import { SidebarProvider, Sidebar, SidebarContent, SidebarHeader, SidebarTrigger
 import { MetadataTool, ImageTaggerTool, DownloadTool } from 'src/components/tools'
 
 interface PDFDataResponse {
-  pdf_data_url: string
+  pdf_url: string
   pdf_id: string
   error?: string
 }
@@ -77,8 +77,8 @@ export function Viewer() {
         window.pdfjsLib.GlobalWorkerOptions.workerSrc = 
           'https://cdnjs.cloudflare.com/ajax/libs/pdf.js/3.11.174/pdf.worker.min.js'
 
-        // Load and render PDF
-        const pdf = await window.pdfjsLib.getDocument(data.pdf_data_url).promise
+        // Load and render PDF; pdf.js fetches the file with range requests rather than all at once
+        const pdf = await window.pdfjsLib.getDocument({ url: data.pdf_url }).promise
         const container = containerRef.current
         
         if (!container) {